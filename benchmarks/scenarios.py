@@ -0,0 +1,140 @@
+import random
+
+from stateman import heuristics
+from stateman.graph import StateGraph
+from stateman.node import StateNode
+from stateman.utils import (
+    ValidationError, global_state_interners, global_transition_functions, global_transition_tables,
+    global_validation_functions,
+)
+
+
+class Scenario(object):
+    """A synthetic reconciliation problem: every node counts its way up from step 0 to step `states - 1`,
+    moving up to `fanout` steps at a time. Some of the topology's edges get a validation that the child can't
+    be further along than its parent, so parents have to go first
+
+    Attributes:
+        name (str): unique name, which baselines are stored under
+        topology (str): 'chain', 'star' or 'tree'
+        nodes (int): number of nodes, besides the root every graph has
+        states (int): states each node goes through
+        fanout (int): transitions out of each state
+        validation_density (float): share of edges that get a validation
+        strategy (str): which of `stateman.search.search_strategies` plans it
+        heuristic (str): name of what in `stateman.heuristics` guides it, None for the graph's own
+        seed (int): picks which edges get validations
+        classes (List[type]): node and graph classes `build` registered things on, until `unregister`
+    """
+    topologies = ('chain', 'star', 'tree')
+
+    def __init__(self, name, topology, nodes, states, fanout=1, validation_density=0.5, strategy='a_star',
+                 heuristic=None, seed=0):
+        assert topology in self.topologies
+        self.name = name
+        self.topology = topology
+        self.nodes = nodes
+        self.states = states
+        self.fanout = fanout
+        self.validation_density = validation_density
+        self.strategy = strategy
+        self.heuristic = heuristic
+        self.seed = seed
+        self.classes = []
+
+    def search_options(self):
+        """Dict: what to pass `take_shortest_path_to` besides the graphs"""
+        search_options = {'strategy': self.strategy}
+        if self.heuristic is not None:
+            search_options['heuristic'] = getattr(heuristics, self.heuristic)
+
+        return search_options
+
+    def edges(self):
+        """List[Tuple[int, int]]: (parent, child) node indexes"""
+        if self.topology == 'chain':
+            return [(index - 1, index) for index in range(1, self.nodes)]
+        if self.topology == 'star':
+            return [(0, index) for index in range(1, self.nodes)]
+
+        return [((index - 1) // 2, index) for index in range(1, self.nodes)]
+
+    def build(self):
+        """Registers transitions and validations on classes of its own, and builds the graphs. Every build gets
+        new classes, so nothing a search worked out carries over to the next one. `unregister` them when done
+
+        Returns:
+            Tuple[StateGraph, StateGraph]: where we start, and where we want to be
+        """
+        class BenchmarkNode(StateNode):
+            state = {'step': 0}
+
+        class BenchmarkGraph(StateGraph):
+            pass
+
+        self.classes += [BenchmarkNode, BenchmarkGraph]
+
+        last_step = self.states - 1
+        for step in range(last_step):
+            for to_step in range(step + 1, min(step + self.fanout, last_step) + 1):
+                BenchmarkNode.register_transition(from_={'step': step}, to={'step': to_step})(_advance)
+
+        paths = [f'/{self.topology}/{index}' for index in range(self.nodes)]
+        edges = [(paths[parent], paths[child]) for parent, child in self.edges()]
+        rng = random.Random(self.seed)
+        for parent_path, child_path in edges:
+            if rng.random() < self.validation_density:
+                BenchmarkGraph.register_validation(
+                    _parent_goes_first(parent_path, child_path), reads=[parent_path, child_path]
+                )
+
+        def build_graph(step):
+            state_graph = BenchmarkGraph()
+            state_graph.add_nodes([BenchmarkNode.create(node_path, step=step) for node_path in paths])
+            state_graph.add_edges(edges)
+            return state_graph
+
+        return build_graph(0), build_graph(last_step)
+
+    def unregister(self):
+        """Takes what `build` registered out of the registries again, like the tests' `clean_transitions`"""
+        for cls in self.classes:
+            for registry in (
+                global_transition_functions, global_validation_functions, global_state_interners,
+                global_transition_tables,
+            ):
+                registry.pop(cls, None)
+
+        self.classes = []
+
+
+def _advance(node):
+    pass
+
+
+def _parent_goes_first(parent_path, child_path):
+    def validate(graph):
+        if graph.nodes[child_path].state['step'] > graph.nodes[parent_path].state['step']:
+            raise ValidationError(f"{child_path} can't be ahead of {parent_path}")
+
+    validate.__qualname__ = f'parent_goes_first({parent_path}, {child_path})'
+    return validate
+
+
+SCENARIOS = [
+    Scenario('etl', 'star', nodes=3, states=2, validation_density=1.0),
+    Scenario('chain-8x4', 'chain', nodes=8, states=4, validation_density=1.0),
+    Scenario('chain-24x3', 'chain', nodes=24, states=3, validation_density=0.25),
+    Scenario('star-16x3', 'star', nodes=16, states=3, validation_density=0.5),
+    Scenario('tree-15x4-fanout2', 'tree', nodes=15, states=4, fanout=2, validation_density=0.5),
+    Scenario('tree-31x3', 'tree', nodes=31, states=3, validation_density=0.1),
+    Scenario('chain-8x4-bidirectional', 'chain', nodes=8, states=4, validation_density=1.0,
+             strategy='bidirectional'),
+    # weaker heuristics leave the search more to do
+    Scenario('star-6x3-mismatch', 'star', nodes=6, states=3, validation_density=0.5, heuristic='mismatch_count'),
+    Scenario('chain-5x3-fanout2-zero', 'chain', nodes=5, states=3, fanout=2, heuristic='zero'),
+    Scenario('tree-7x3-max', 'tree', nodes=7, states=3, heuristic='max_node_distance'),
+    # and without noticing transpositions, memory-bounded searches have even more
+    Scenario('star-4x3-mismatch-ida', 'star', nodes=4, states=3, heuristic='mismatch_count', strategy='ida_star'),
+    Scenario('star-4x3-mismatch-sma', 'star', nodes=4, states=3, heuristic='mismatch_count', strategy='sma_star'),
+]
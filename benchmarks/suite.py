@@ -0,0 +1,110 @@
+import json
+import os
+import time
+
+from benchmarks.scenarios import SCENARIOS
+from stateman.stats import SearchStats
+
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+
+def run_scenario(scenario, repeat=3):
+    """Plans a scenario `repeat` times from scratch, then once more tracing memory, unregistering what each
+    run registered after it
+
+    Args:
+        scenario (Scenario): what to plan
+        repeat (int): runs to take the fastest of
+
+    Returns:
+        Dict: 'plan_length', 'expanded' states, fastest 'seconds' and 'peak_memory' in bytes
+    """
+    seconds = []
+    for _ in range(repeat):
+        current, desired = scenario.build()
+        stats = SearchStats()
+        try:
+            started = time.perf_counter()
+            plan = current.take_shortest_path_to(desired, dry_run=True, stats=stats, **scenario.search_options())
+            seconds.append(time.perf_counter() - started)
+        finally:
+            scenario.unregister()
+
+    current, desired = scenario.build()
+    memory_stats = SearchStats(trace_memory=True)
+    try:
+        current.take_shortest_path_to(desired, dry_run=True, stats=memory_stats, **scenario.search_options())
+    finally:
+        scenario.unregister()
+
+    return {
+        'plan_length': len(plan),
+        'expanded': stats.expanded,
+        'seconds': min(seconds),
+        'peak_memory': memory_stats.peak_memory,
+    }
+
+
+def run_suite(scenarios=None, repeat=3):
+    """Dict[str, Dict]: scenario name -> what `run_scenario` measured"""
+    return {scenario.name: run_scenario(scenario, repeat) for scenario in (scenarios or SCENARIOS)}
+
+
+def load_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as baselines_file:
+        return json.load(baselines_file)
+
+
+def save_baselines(results, path=BASELINES_PATH):
+    with open(path, 'w') as baselines_file:
+        json.dump(results, baselines_file, indent=2, sort_keys=True)
+        baselines_file.write('\n')
+
+
+def find_regressions(results, baselines, time_tolerance=2.0, memory_tolerance=1.5):
+    """Compares results to baselines. Plan lengths and expansions don't depend on the machine, so any change
+    to the first and any increase of the second is a regression. Times and memory get some slack
+
+    Args:
+        results (Dict[str, Dict]): from `run_suite`
+        baselines (Dict[str, Dict]): from `load_baselines`
+        time_tolerance (float): how many times slower than the baseline is still fine (default: 2.0)
+        memory_tolerance (float): how many times more memory than the baseline is still fine (default: 1.5)
+
+    Returns:
+        List[str]: what regressed, empty if nothing did
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+
+        if result['plan_length'] != baseline['plan_length']:
+            regressions.append(f"{name}: plan length {result['plan_length']}, was {baseline['plan_length']}")
+        if result['expanded'] > baseline['expanded']:
+            regressions.append(f"{name}: expanded {result['expanded']} states, was {baseline['expanded']}")
+        if result['seconds'] > baseline['seconds'] * time_tolerance:
+            regressions.append(f"{name}: took {result['seconds']:.4f}s, was {baseline['seconds']:.4f}s")
+        if result['peak_memory'] > baseline['peak_memory'] * memory_tolerance:
+            regressions.append(f"{name}: peaked at {result['peak_memory']} bytes, was {baseline['peak_memory']}")
+
+    return regressions
+
+
+def format_results(results, baselines=None):
+    """str: a table of results, next to baselines if there are any"""
+    baselines = baselines or {}
+    lines = [f"{'scenario':<28}{'plan':>6}{'expanded':>10}{'seconds':>10}{'baseline':>10}{'peak KiB':>10}"]
+    for name, result in results.items():
+        baseline = baselines.get(name, {}).get('seconds')
+        lines.append(
+            f"{name:<28}{result['plan_length']:>6}{result['expanded']:>10}{result['seconds']:>10.4f}"
+            f"{baseline if baseline is not None else float('nan'):>10.4f}{result['peak_memory'] / 1024:>10.1f}"
+        )
+
+    return '\n'.join(lines)
@@ -1,5 +1,7 @@
 import click
 
+from benchmarks import suite
+from benchmarks.scenarios import SCENARIOS
 from examples import demo
 
 
@@ -14,5 +16,48 @@ def run_demo():
     demo.run_demo()
 
 
+def _pick_scenarios(names):
+    unknown = set(names) - {scenario.name for scenario in SCENARIOS}
+    if unknown:
+        raise click.BadParameter(f"no such scenarios: {', '.join(sorted(unknown))}", param_hint='--scenario')
+
+    return [scenario for scenario in SCENARIOS if not names or scenario.name in names]
+
+
+@cli.command()
+@click.option('--scenario', '-s', 'names', multiple=True, help='only run these scenarios')
+@click.option('--repeat', default=3, help='runs per scenario to take the fastest of')
+@click.option('--save', is_flag=True, help='store the results as the new baselines')
+def run_benchmarks(names, repeat, save):
+    """Plans synthetic scenarios of different sizes and shapes, next to the stored baselines"""
+    baselines = suite.load_baselines()
+    results = suite.run_suite(_pick_scenarios(names), repeat)
+    click.echo(suite.format_results(results, baselines))
+
+    if save:
+        suite.save_baselines({**baselines, **results})
+        click.echo(f'saved baselines to {suite.BASELINES_PATH}')
+
+
+@cli.command()
+@click.option('--scenario', '-s', 'names', multiple=True, help='only check these scenarios')
+@click.option('--repeat', default=3, help='runs per scenario to take the fastest of')
+@click.option('--time-tolerance', default=2.0, help='how many times slower than the baseline is still fine')
+@click.option('--memory-tolerance', default=1.5, help='how many times more memory than the baseline is still fine')
+def check_benchmarks(names, repeat, time_tolerance, memory_tolerance):
+    """Fails if any scenario plans differently, expands more states, or is slower or bigger than its baseline"""
+    baselines = suite.load_baselines()
+    results = suite.run_suite(_pick_scenarios(names), repeat)
+    click.echo(suite.format_results(results, baselines))
+
+    regressions = suite.find_regressions(results, baselines, time_tolerance, memory_tolerance)
+    for regression in regressions:
+        click.echo(f'REGRESSION {regression}', err=True)
+    if regressions:
+        raise SystemExit(1)
+
+    click.echo('no regressions')
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,165 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from stateman.goal import Goal
+from stateman.utils import export_registry, import_registry, registered_classes
+
+
+# how to search, and the graphs of the batch for forked workers that inherit them, set up by `_init_worker`
+_worker_pairs = None
+_worker_search = None
+
+
+def reconcile_fleet(
+        pairs,
+        dry_run=False,
+        strategy='a_star',
+        decompose=False,
+        max_workers=None,
+        plan_cache=None,
+        processes=None,
+        mp_context=None,
+        chunk_size=None,
+        **search_options
+):
+    """`StateGraph.take_shortest_path_to` for lots of graphs at once, each towards its own desired state graph.
+    Searching is what takes the time, so the searches run at the same time in worker processes, and each graph's
+    results are yielded as soon as its plan comes back and has run
+
+    Work that doesn't depend on the graph is only done once:
+        - graphs in the same state going to the same place with the same classes (pipelines deployed from the
+          same template, say) share one search
+        - plans in plan_cache are reused, checking them first, and new plans go in it
+        - `TransitionTable`s and validation memos are kept per class and per validation, so every graph a worker
+          plans shares them. Graphs of the same classes get sent to the same worker together, and forked workers
+          start out with whatever the parent worked out already
+
+    Forked workers inherit the batch and the registries. Workers started any other way get sent the graphs and
+    rebuild the registries with `stateman.utils.import_registry`, so then graphs, search options, classes,
+    transitions and validations all have to be picklable, see `stateman.utils.export_registry`
+
+    Args:
+        pairs (Iterable[Tuple[StateGraph, Union[StateGraph, Goal]]]): (current, expected) graphs
+        dry_run (bool): if we should execute associated functions (default: False)
+        strategy (str): which of `stateman.search.search_strategies` finds the transitions (default: 'a_star')
+        decompose (bool): search each graph's `independent_clusters` on their own (default: False)
+        max_workers (int): run each plan in layers, see `StateGraph.take_shortest_path_to` (default: None)
+        plan_cache (PlanCache): reuse plans from here, and put new ones in it (default: None)
+        processes (int): number of worker processes (default: None, one per CPU)
+        mp_context (str): multiprocessing start method, 'fork', 'spawn' or 'forkserver' (default: None, the
+            platform's default)
+        chunk_size (int): most searches to send a worker at a time (default: None, enough for about 4 chunks
+            per worker)
+        search_options: passed along to every search, like `heuristic`. Searches run in other processes, so
+            `stats` can't count them and is left out
+
+    Yields:
+        Tuple[int, List[Dict]]: position of a graph in pairs, and its results, in whatever order they're done.
+            A search that raises raises here
+    """
+    pairs = list(pairs)
+    search_options.pop('stats', None)
+    # graphs that can share a search -> their positions in pairs
+    groups = {}
+    for index, (current_state_graph, expected_state_graph) in enumerate(pairs):
+        groups.setdefault(
+            _search_key(current_state_graph, expected_state_graph, strategy, decompose, search_options, index), []
+        ).append(index)
+
+    def take(indexes, transitions):
+        for index in indexes:
+            yield index, pairs[index][0]._take_transitions(transitions, dry_run, max_workers)
+
+    pending = []
+    for key, indexes in groups.items():
+        current_state_graph, expected_state_graph = pairs[indexes[0]]
+        plan_context = key[0]
+        transitions = None
+        if plan_cache is not None and plan_context is not None:
+            transitions = current_state_graph._cached_plan(plan_cache, plan_context, expected_state_graph)
+        if transitions is not None:
+            yield from take(indexes, transitions)
+        else:
+            pending.append((key, indexes))
+
+    if not pending:
+        return
+
+    processes = processes or os.cpu_count()
+    chunk_size = chunk_size or math.ceil(len(pending) / (4 * processes))
+    # keeping graphs of the same classes together keeps them on the same worker
+    pending.sort(key=lambda group: group[0][1])
+    chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+
+    context = multiprocessing.get_context(mp_context)
+    forked = context.get_start_method() == 'fork'
+    initargs = (
+        pairs if forked else None,
+        (strategy, decompose, search_options),
+        None if forked else export_registry(registered_classes(
+            state_graph for pair in pairs for state_graph in pair if not isinstance(state_graph, Goal)
+        )),
+    )
+    with ProcessPoolExecutor(processes, mp_context=context, initializer=_init_worker, initargs=initargs) as executor:
+        futures = {
+            executor.submit(_search, [
+                (indexes[0], None if forked else pairs[indexes[0]]) for _, indexes in chunk
+            ]): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            for (key, indexes), transitions in zip(futures[future], future.result()):
+                current_state_graph, expected_state_graph = pairs[indexes[0]]
+                if plan_cache is not None and key[0] is not None:
+                    current_state_graph._remember_plan(plan_cache, key[0], expected_state_graph, transitions)
+
+                yield from take(indexes, transitions)
+
+
+def _search_key(current_state_graph, expected_state_graph, strategy, decompose, search_options, index):
+    """(plan context, node classes, start fingerprint) that graphs sharing a search have in common. Fingerprints
+    leave out node classes, which other graphs' nodes at the same paths might not have. Graphs whose plans can't be
+    shared get their position in the batch instead of a start fingerprint"""
+    context = current_state_graph._plan_context(expected_state_graph, strategy, decompose, search_options)
+    classes = tuple(
+        f'{cls.__module__}.{cls.__qualname__}'
+        for cls in [current_state_graph.__class__] + [
+            current_state_graph.nodes[node_path].__class__ for node_path in current_state_graph.node_order()
+        ]
+    )
+    if context is None:
+        return None, classes, index
+
+    return context, classes, current_state_graph.fingerprint()
+
+
+def _init_worker(pairs, search, registry):
+    global _worker_pairs, _worker_search
+    if registry is not None:
+        import_registry(registry)
+
+    _worker_pairs = pairs
+    _worker_search = search
+
+
+def _search(chunk):
+    """Runs in the workers, see `reconcile_fleet`
+
+    Args:
+        chunk (List[Tuple[int, Tuple]]): position of each graph to search in the batch, along with the graphs
+            unless the worker inherited them
+
+    Returns:
+        List[List[Tuple[str, Tuple, Tuple]]]: plan for each of them
+    """
+    strategy, decompose, search_options = _worker_search
+    plans = []
+    for index, pair in chunk:
+        current_state_graph, expected_state_graph = pair or _worker_pairs[index]
+        plans.append(current_state_graph._find_transitions(
+            expected_state_graph, strategy, decompose, **search_options
+        ))
+
+    return plans
@@ -0,0 +1,151 @@
+import fnmatch
+
+from stateman.utils import get_transition_table, global_state_interners
+
+
+class Goal(object):
+    """Where we want to be, as constraints on just some keys of some nodes' states. It goes wherever a desired
+    state graph does, like `StateGraph.take_shortest_path_to`, and searches stop at the first state that
+    satisfies it. Other nodes and keys can be anything
+
+    Constraints are {node path or fnmatch pattern: {key: wanted}}, where wanted is a value, a set or frozenset of
+    values any of which will do, or a callable taking the value and saying whether it will do. Keys a node doesn't
+    have count as None, but every path or pattern has to match a node. Say everything under /extract has to end up in the west, and /transform mustn't be broken:
+
+        Goal({'/extract/*': {'location': 'America/West'}, '/transform': {'status': lambda status: status != 'broken'}})
+
+    Attributes:
+        constraints (Dict[str, Dict[str, object]]): node path or pattern -> key -> what will do
+        node_paths (FrozenSet[str]): only constrain these nodes, None for any of them (default: None)
+    """
+
+    def __init__(self, constraints, node_paths=None):
+        self.constraints = {
+            pattern: {key: _freeze(wanted) for key, wanted in wanted_state.items()}
+            for pattern, wanted_state in constraints.items()
+        }
+        self.node_paths = frozenset(node_paths) if node_paths is not None else None
+        # node order -> constrained nodes, and (class, state mask, node constraints) -> whether they're satisfied
+        self._bindings = {}
+        self._accepted = {}
+
+    def snapshot(self):
+        """Goals don't change, so searches can use us as is"""
+        return self
+
+    def fingerprint(self):
+        """Tuple: hashable key for what we want, so plans made for it can be cached"""
+        return (
+            self.__class__,
+            tuple(sorted(
+                (pattern, tuple(sorted(wanted_state.items(), key=lambda item: item[0])))
+                for pattern, wanted_state in self.constraints.items()
+            )),
+            self.node_paths,
+        )
+
+    def subgraph(self, node_paths):
+        """Goal: just what we want of some nodes, for searching them on their own like `StateGraph.subgraph`"""
+        node_paths = frozenset(node_paths)
+        if self.node_paths is not None:
+            node_paths &= self.node_paths
+
+        # constraints on the other nodes are someone else's
+        constraints = {
+            pattern: wanted_state
+            for pattern, wanted_state in self.constraints.items()
+            if any(fnmatch.fnmatchcase(node_path, pattern) for node_path in node_paths)
+        }
+        return self.__class__(constraints, node_paths)
+
+    def bind(self, state_graph):
+        """Works out which of a graph's nodes we constrain, once per node order
+
+        Returns:
+            List[Tuple[int, str, type, Tuple[Tuple[str, object]]]]: (position in `state_vector`, node path, node
+                class, (key, wanted) constraints)
+
+        Raises:
+            ValueError: if a constraint's path or pattern doesn't match any node we can constrain, like a
+                desired state graph with nodes the graph doesn't have
+        """
+        node_order = state_graph.node_order()
+        if node_order not in self._bindings:
+            bound = []
+            unmatched = set(self.constraints)
+            for index, node_path in enumerate(node_order):
+                if self.node_paths is not None and node_path not in self.node_paths:
+                    continue
+
+                node_constraints = []
+                for pattern, wanted_state in self.constraints.items():
+                    if fnmatch.fnmatchcase(node_path, pattern):
+                        unmatched.discard(pattern)
+                        node_constraints.extend(wanted_state.items())
+                if node_constraints:
+                    bound.append((index, node_path, state_graph.nodes[node_path].__class__, tuple(node_constraints)))
+
+            if unmatched:
+                raise ValueError(f"Goal constraints don't match any node: {', '.join(sorted(unmatched))}")
+
+            self._bindings[node_order] = bound
+
+        return self._bindings[node_order]
+
+    def accepts(self, node_cls, state_mask, node_constraints):
+        """bool: if a node state satisfies the constraints `bind` found for it, worked out once per state"""
+        accepted_key = (node_cls, state_mask, node_constraints)
+        if accepted_key not in self._accepted:
+            state = global_state_interners[node_cls].unmask(state_mask)
+            self._accepted[accepted_key] = all(_will_do(state.get(key), wanted) for key, wanted in node_constraints)
+
+        return self._accepted[accepted_key]
+
+    def is_satisfied_by(self, state_graph):
+        """bool: if every node we constrain is in a state that will do. Each node's answer is only worked out
+        once per state, so this costs a lookup per constrained node"""
+        state_vector = state_graph.state_vector()
+        return all(
+            self.accepts(node_cls, state_vector[index], node_constraints)
+            for index, _, node_cls, node_constraints in self.bind(state_graph)
+        )
+
+    def unsatisfied(self, state_graph):
+        """List[str]: paths of the nodes we constrain that aren't in a state that will do"""
+        state_vector = state_graph.state_vector()
+        return [
+            node_path
+            for index, node_path, node_cls, node_constraints in self.bind(state_graph)
+            if not self.accepts(node_cls, state_vector[index], node_constraints)
+        ]
+
+    def constrained_keys(self, state_graph):
+        """Dict[str, Set[str]]: node path -> keys we constrain, for nodes we constrain any of"""
+        return {
+            node_path: {key for key, _ in node_constraints}
+            for _, node_path, _, node_constraints in self.bind(state_graph)
+        }
+
+    def node_distances(self, state_graph):
+        """Yields the fewest transitions each node we constrain needs on its own to get to a state that will do,
+        ignoring validations. See `TransitionTable.distance_to`"""
+        state_vector = state_graph.state_vector()
+        for index, _, node_cls, node_constraints in self.bind(state_graph):
+            state_mask = state_vector[index]
+            if not self.accepts(node_cls, state_mask, node_constraints):
+                yield get_transition_table(node_cls).distance_to(
+                    state_mask, lambda mask: self.accepts(node_cls, mask, node_constraints), node_constraints
+                )
+
+
+def _freeze(wanted):
+    return frozenset(wanted) if isinstance(wanted, set) else wanted
+
+
+def _will_do(value, wanted):
+    if isinstance(wanted, frozenset):
+        return value in wanted
+    if callable(wanted):
+        return bool(wanted(value))
+
+    return value == wanted
@@ -1,207 +1,1108 @@
-import heapq
+import asyncio
+import copy
+import fnmatch
+import inspect
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 
 import networkx as nx
 
+from stateman import heuristics
+from stateman.goal import Goal
 from stateman.node import StateNode
-from stateman.utils import Validatable, ValidationError, global_validation_functions, global_transition_functions
+from stateman.search import search_strategies, unpruned_search_strategies, _decomposed_valid_state_transitions
+from stateman.stats import current_search_stats, run_validation
+from stateman.utils import (
+    Validatable, ValidationError, ValidationMemo, global_state_interners, global_transition_functions,
+    get_registry_version, run_coroutine, run_with_event_loop
+)
 
 
-class PriorityItem(object):
-    def __init__(self, priority=0, item=None):
-        self.priority = priority
-        self.item = item
+class NodeMap(Mapping):
+    """Read-only path -> StateNode mapping for graphs built during a search. Each map only stores the one node
+    that changed from its parent map and looks everything else up through the parent, so building a neighbor
+    is O(1). That node can be given as its class and state mask instead, and is only built when it's first looked
+    up. Every `max_depth` levels the chain is flattened back into a dict to keep lookups cheap
 
-    def __lt__(self, other):
-        return self.priority < other.priority
+    Attributes:
+        max_depth (int): how many changes can be chained before flattening
+    """
+    max_depth = 32
+
+    def __init__(self, parent, path=None, node=None, node_state=None):
+        """
+        Args:
+            parent (Mapping[str, StateNode]): nodes to start from
+            path (str): path of the node that changed (default: None, nothing did)
+            node (StateNode): what it changed to
+            node_state (Tuple[type, int]): or the class and state mask to build that from (default: None)
+        """
+        self._node_state = node_state
+        if isinstance(parent, NodeMap) and parent._depth < self.max_depth:
+            self._nodes = None
+            self._parent = parent
+            self._path = path
+            self._node = node
+            self._depth = parent._depth + 1
+        else:
+            self._nodes = dict(parent)
+            if path is not None:
+                self._path = path
+                self._nodes[path] = node if node is not None else self._build_node()
+            self._parent = None
+            self._depth = 0
+
+    def _build_node(self):
+        node_cls, state_mask = self._node_state
+        return node_cls.create(self._path, **global_state_interners[node_cls].unmask(state_mask))
 
+    def __getitem__(self, path):
+        nodes = self
+        while nodes._nodes is None:
+            if nodes._path == path:
+                if nodes._node is None:
+                    nodes._node = nodes._build_node()
+                return nodes._node
+            nodes = nodes._parent
 
-def _a_star_heuristic(state_graph_from, state_graph_to):
-    """Since we're working with a state_graph, we'd need to ensure the distances between all nodes is taken into account"""
-    dist = 0
-    for node_path in state_graph_from.nodes.keys():
-        node_state_from = tuple(sorted(state_graph_from.nodes[node_path].state.items()))
-        node_state_to = tuple(sorted(state_graph_to.nodes[node_path].state.items()))
-        dist += [(pair in node_state_to) for pair in node_state_from].count(True)
+        return nodes._nodes[path]
 
-    return dist
+    def _base(self):
+        nodes = self
+        while nodes._nodes is None:
+            nodes = nodes._parent
+        return nodes
 
+    def __iter__(self):
+        return iter(self._base()._nodes)
 
-def _a_star_valid_state_transitions(
-        current_state_graph,
-        desired_state_graph,
-        max_iterations=1000000
-):
-    """This function uses an A* graph search algorithm to find the minimal set of transitions to a particular
-    state
+    def __len__(self):
+        return len(self._base()._nodes)
 
-    shamelessly copied from: https://www.redblobgames.com/pathfinding/a-star/implementation.html#python-astar
+    def __contains__(self, path):
+        return path in self._base()._nodes
 
-    Args:
-        current_state_graph (StateGraph): where we are
-        desired_state (StateGraph): where we want to be
-        max_iterations (int): maximum iterations through the graph to try
 
-    Yields:
-        List[Tuple[str, Tuple[str, str]]: list of (node_path, (..transition_to_make..))
+class ReadTrackingNodeMap(Mapping):
+    """Path -> StateNode mapping that writes down which nodes get looked up through it, so we know which nodes
+    a validation read without it having to say
+
+    Attributes:
+        reads (Set[str]): paths looked up so far
     """
-    frontier = []  # priority queue of (priority, state) tuples
-    heapq.heappush(frontier, PriorityItem(0, current_state_graph))
-
-    came_from = {}
-    cost_so_far = {}
-    came_from[current_state_graph] = None
-    cost_so_far[current_state_graph] = 0
-
-    iterations = 0
-    while len(frontier) > 0:
-        iterations += 1
-        if iterations == max_iterations:
-            raise Exception(f"Reached maximum number of iterations when exploring states: {max_iterations}")
-
-        current = heapq.heappop(frontier).item
-
-        # if we reached our goal, leggo
-        if current.has_same_state(desired_state_graph):
-            last_state = current
-            transitions = []
-            while came_from[last_state] is not None:
-                prev, transition = came_from[last_state]
-                last_state = prev
-                transitions.append(transition)
-
-            return list(reversed(transitions))
-
-        # keep doing the a-star dance
-        neighbors = current.get_transitions_and_neighbors()
-        for transition, neighbor in neighbors.items():
-            new_cost = cost_so_far[current] + 1
-            if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
-                cost_so_far[neighbor] = new_cost
-                priority = new_cost + _a_star_heuristic(neighbor, desired_state_graph)
-                heapq.heappush(frontier, PriorityItem(priority, neighbor))
-                came_from[neighbor] = (current, transition)
-
-    return []
+
+    def __init__(self, nodes):
+        self._nodes = nodes
+        self.reads = set()
+
+    def __getitem__(self, path):
+        self.reads.add(path)
+        return self._nodes[path]
+
+    def __iter__(self):
+        return iter(self._nodes)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, path):
+        # which paths there are doesn't depend on anyone's state
+        return path in self._nodes
 
 
 class StateGraph(Validatable):
     """This contains a graph of StateNodes
 
     Attributes:
-        graph (DiGraph): a directed graph of StateNodes that depend on each other
-        nodes (Dict[str, StateNode]): path -> nodes mappings for quick lookup
+        heuristic (Callable[[StateGraph, StateGraph], int]): how searches from graphs of this class guess the
+            number of transitions left, see `stateman.heuristics`
+        topology (DiGraph): a directed graph of node paths that depend on each other. Graphs made by
+            `get_transitions_and_neighbors` share one frozen copy of it, and copy it again if they're changed
+        nodes (Mapping[str, StateNode]): path -> nodes mappings for quick lookup. This is a `NodeMap` for
+            graphs made by `get_transitions_and_neighbors`
     """
+    heuristic = staticmethod(heuristics.sum_node_distances)
 
-    def __init__(self, graph=None, nodes=None):
-        if not graph:
-            graph = nx.DiGraph()
-        self.graph = graph
+    def __init__(self, graph=None, nodes=None, topology=None):
+        if topology is None:
+            topology = nx.DiGraph()
+            if graph:
+                topology.add_nodes_from(node.path_string for node in graph.nodes())
+                topology.add_edges_from((left.path_string, right.path_string) for left, right in graph.edges())
+        self.topology = topology
+        self._graph = graph
+        self._state_vector = None
+        self._validation_functions = None
+        self._validation_cache = None
+        self._validation_parent = None
+        self._relevant_transitions = None
+        self._progress = None
 
         if not nodes:
             nodes = {}
             nodes['/'] = StateNode(path='/', name='root')
-            self.graph.add_node(nodes['/'])
+            self.topology.add_node('/')
+            self._graph = None
         self.nodes = nodes
 
+    @property
+    def graph(self):
+        """DiGraph: a directed graph of StateNodes that depend on each other. This is built from the topology
+        the first time it's asked for, so search states that never look at it don't pay for it"""
+        if self._graph is None:
+            graph = nx.DiGraph()
+            graph.add_nodes_from(self.nodes[node_path] for node_path in self.topology.nodes())
+            graph.add_edges_from((self.nodes[left], self.nodes[right]) for left, right in self.topology.edges())
+            self._graph = graph
+
+        return self._graph
+
+    def get_validation_functions(self):
+        """List[Callable]: validations `is_valid` runs on us, which for a `subgraph` are just the ones that
+        look at its nodes"""
+        if self._validation_functions is not None:
+            return self._validation_functions
+
+        return super().get_validation_functions()
+
+    def validation_error(self):
+        """Runs validations until one raises a ValidationError. Search states made by `_with_node` only re-run
+        the validations that read the node that changed, and take the other outcomes from the graph they came from
+
+        Returns:
+            ValidationError: the first one raised, or None if all validations passed
+        """
+        for error, _ in self._validation_outcomes():
+            if error is not None:
+                return error
+
+        return None
+
+    def _validation_outcomes(self):
+        """Tuple[Tuple[ValidationError, FrozenSet[str]]]: for each of `get_validation_functions`, the
+        ValidationError it raised (or None) and the node paths it read. Search states keep theirs"""
+        validation_functions = tuple(self.get_validation_functions())
+        if self._validation_cache is not None and self._validation_cache[0] == validation_functions:
+            return self._validation_cache[1]
+
+        previous_outcomes, changed_path = None, None
+        if self._validation_parent is not None:
+            parent, changed_path = self._validation_parent
+            if parent._validation_cache is not None and parent._validation_cache[0] == validation_functions:
+                previous_outcomes = parent._validation_cache[1]
+
+        return self._run_validations(validation_functions, previous_outcomes, changed_path)
+
+    def _run_validations(self, validation_functions, previous_outcomes=None, changed_path=None):
+        """Runs validations, skipping the ones that didn't read `changed_path` if we know what they came back
+        with before it changed. Validations registered with `reads` read their `validation_footprint`, the rest
+        run on a copy of us that tracks which nodes they look up. Validations with a `memo` check it for the
+        states of those nodes first
+
+        Returns:
+            Tuple[Tuple[ValidationError, FrozenSet[str]]]: see `_validation_outcomes`
+        """
+        tracker = None
+        outcomes = []
+        for index, validation_func in enumerate(validation_functions):
+            if previous_outcomes is not None and changed_path not in previous_outcomes[index][1]:
+                outcomes.append(previous_outcomes[index])
+                continue
+
+            footprint = self._validation_reads(validation_func)
+            memo = getattr(validation_func, 'memo', None)
+            if memo is not None:
+                outcome = memo.lookup(
+                    (read_paths, self._project(read_paths))
+                    for read_paths in ([tuple(sorted(footprint))] if footprint is not None else memo.read_sets)
+                )
+                if outcome is not ValidationMemo.missing:
+                    outcomes.append(outcome)
+                    continue
+
+            if footprint is None:
+                if tracker is None:
+                    tracker = self.__class__(topology=self.topology, nodes=ReadTrackingNodeMap(self.nodes))
+                    tracker._validation_functions = self._validation_functions
+                tracker.nodes.reads.clear()
+                # validations reading through `graph` have to build it again, or we wouldn't see what they read
+                tracker._graph = None
+
+            try:
+                run_validation(validation_func, self if footprint is not None else tracker)
+                error = None
+            except ValidationError as e:
+                error = e
+
+            outcome = (error, footprint if footprint is not None else frozenset(tracker.nodes.reads))
+            outcomes.append(outcome)
+            if memo is not None:
+                read_paths = tuple(sorted(outcome[1]))
+                memo.store((read_paths, self._project(read_paths)), outcome, read_paths)
+
+        outcomes = tuple(outcomes)
+        if isinstance(self.nodes, NodeMap):
+            # search states can't change, so these stay right. we don't need whoever we came from anymore either
+            self._validation_cache = (validation_functions, outcomes)
+            self._validation_parent = None
+
+        return outcomes
+
+    def _project(self, node_paths):
+        """Tuple: class and state mask of each of node_paths, (None, None) for ones we don't have"""
+        projection = []
+        for node_path in node_paths:
+            node = self.nodes.get(node_path)
+            projection.append((node.__class__, node.state_mask) if node is not None else (None, None))
+
+        return tuple(projection)
+
+    def _validation_reads(self, validation_func):
+        """`validation_footprint`, worked out once per frozen topology"""
+        cache = self._topology_cache().setdefault('validation_footprints', {})
+        if validation_func not in cache:
+            footprint = self.validation_footprint(validation_func)
+            cache[validation_func] = frozenset(footprint) if footprint is not None else None
+
+        return cache[validation_func]
+
+    def validation_footprint(self, validation_func):
+        """Works out which of our nodes a validation looks at, from the `reads` it was registered with
+
+        Args:
+            validation_func (Callable): a validation registered with `register_validation`
+
+        Returns:
+            Set[str]: node paths, or None if the validation could look at any of them
+        """
+        reads = getattr(validation_func, 'reads', None)
+        if reads is None:
+            return None
+
+        return {
+            node_path
+            for node_path in self.nodes
+            if any(fnmatch.fnmatchcase(node_path, pattern) for pattern in reads)
+        }
+
+    def independent_clusters(self):
+        """Splits our nodes into groups that no validation looks across. Every transition only changes one node,
+        so each group can get to its desired state without caring about what the others are doing
+
+        Returns:
+            List[Tuple[str]]: groups of node paths, in `node_order`
+        """
+        node_order = self.node_order()
+        cluster_of = {node_path: node_path for node_path in node_order}
+
+        def find(node_path):
+            while cluster_of[node_path] != node_path:
+                cluster_of[node_path] = cluster_of[cluster_of[node_path]]
+                node_path = cluster_of[node_path]
+            return node_path
+
+        for validation_func in self.get_validation_functions():
+            footprint = self.validation_footprint(validation_func)
+            if footprint is None:
+                return [node_order]
+
+            footprint = sorted(footprint)
+            for node_path in footprint[1:]:
+                cluster_of[find(node_path)] = find(footprint[0])
+
+        clusters = {}
+        for node_path in node_order:
+            clusters.setdefault(find(node_path), []).append(node_path)
+
+        return [tuple(cluster) for cluster in clusters.values()]
+
+    def subgraph(self, node_paths):
+        """Gets a graph of the same class with just some of our nodes, the edges between them, and the validations
+        that look at them. Validations that don't look at any node at all go along with every subgraph
+
+        Args:
+            node_paths (Iterable[str]): nodes to keep, which shouldn't share validations with the rest
+
+        Returns:
+            StateGraph: with the same nodes (not copies) as us
+        """
+        node_paths = set(node_paths)
+        topology = nx.DiGraph()
+        topology.add_nodes_from(node_path for node_path in self.topology.nodes() if node_path in node_paths)
+        topology.add_edges_from(self.topology.subgraph(node_paths).edges())
+
+        subgraph = self.__class__(
+            topology=topology,
+            nodes={node_path: self.nodes[node_path] for node_path in topology.nodes()}
+        )
+        subgraph._validation_functions = []
+        for validation_func in self.get_validation_functions():
+            footprint = self.validation_footprint(validation_func)
+            if footprint is None or footprint <= node_paths:
+                subgraph._validation_functions.append(validation_func)
+
+        if self._relevant_transitions is not None:
+            subgraph._relevant_transitions = {
+                node_path: self._relevant_transitions[node_path] for node_path in topology.nodes()
+            }
+
+        return subgraph
+
+    def relevant_transitions(self, desired_state_graph):
+        """Works out which transitions could be part of a shortest plan from us to desired_state_graph. Nodes
+        only have to move if they aren't where they should be, or if a validation looks at both them and a node
+        that has to. Of a moving node's transitions, only those changing a key that matters can help: keys of
+        its state here or there, keys that transitions that help look at, and keys they set that then have to go
+        again. Nodes validations look at can't be told apart by key, so all of their transitions can help
+
+        Taking any other transition on the way leaves a plan that still works without it, so it can't be in a
+        shortest one. That's as long as validations only look at the nodes they were registered as reading
+
+        Args:
+            desired_state_graph (Union[StateGraph, Goal]): where we want to be
+
+        Returns:
+            Dict[str, FrozenSet[Tuple[Tuple, Tuple]]]: node path -> (from_state, to_state) of its transitions
+                that could help, empty for nodes that don't have to move, and None for nodes where they all could
+        """
+        footprints = [self.validation_footprint(func) for func in self.get_validation_functions()]
+        if isinstance(desired_state_graph, Goal):
+            moving = set(desired_state_graph.unsatisfied(self))
+            wanted_keys = desired_state_graph.constrained_keys(self)
+        else:
+            moving = {
+                node_path for node_path in self.nodes
+                if self.nodes[node_path].state != desired_state_graph.nodes[node_path].state
+            }
+            wanted_keys = {node_path: set(desired_state_graph.nodes[node_path].state) for node_path in moving}
+        if None in footprints:
+            validated = set(self.nodes)
+            if moving:
+                moving = set(self.nodes)
+        else:
+            validated = set().union(*footprints)
+            grew = True
+            while grew:
+                grew = False
+                for footprint in footprints:
+                    if footprint & moving and not footprint <= moving:
+                        moving |= footprint
+                        grew = True
+
+        relevant = {}
+        for node_path in self.nodes:
+            node = self.nodes[node_path]
+            transitions = {
+                (from_state, to_state)
+                for from_state, to_states in global_transition_functions.get(node.__class__, {}).items()
+                for to_state in to_states
+            }
+            if node_path not in moving:
+                relevant[node_path] = frozenset()
+                continue
+            if node_path in validated or node.get_validation_functions():
+                relevant[node_path] = None
+                continue
+
+            keys = set(node.state) | wanted_keys.get(node_path, set())
+            helping = set()
+            grew = True
+            while grew:
+                grew = False
+                for from_state, to_state in transitions - helping:
+                    if any(key in keys for key, _ in to_state):
+                        helping.add((from_state, to_state))
+                        keys.update(key for key, _ in from_state)
+                        keys.update(key for key, value in to_state if value is not None)
+                        grew = True
+
+            relevant[node_path] = frozenset(helping) if helping != transitions else None
+
+        return relevant
+
+    def _make_mutable(self):
+        """Copies whatever we share with other graphs before we change it"""
+        if nx.is_frozen(self.topology):
+            self.topology = nx.DiGraph(self.topology)
+            self.topology.graph.pop('cache', None)
+        if not isinstance(self.nodes, dict):
+            self.nodes = dict(self.nodes)
+        self._graph = None
+        self._state_vector = None
+        self._validation_cache = None
+        self._validation_parent = None
+        self._relevant_transitions = None
+        self._progress = None
+
+    def _topology_cache(self):
+        """Things that only depend on the topology, like the order of nodes in a state vector, are worked out
+        once per frozen topology and kept on it. Topologies that can still change get a throwaway dict"""
+        if not nx.is_frozen(self.topology):
+            return {}
+
+        return self.topology.graph.setdefault('cache', {})
+
+    def node_order(self):
+        """Tuple[str]: node paths in the order their states are kept in `state_vector`"""
+        return self._node_layout()[0]
+
+    def _node_layout(self):
+        """(node_order, node_path -> position in node_order)"""
+        cache = self._topology_cache()
+        if 'node_layout' not in cache:
+            node_order = tuple(sorted(self.nodes))
+            cache['node_layout'] = node_order, {node_path: index for index, node_path in enumerate(node_order)}
+
+        return cache['node_layout']
+
+    def state_vector(self):
+        """Packs the state of every node into one tuple of ints, indexed like `node_order`. Each int is the node's
+        `state_mask`, so comparing or hashing graph states never has to look at the state dicts. Search states
+        can't change, so theirs is only worked out once
+
+        Returns:
+            Tuple[int]: node state masks
+        """
+        if self._state_vector is not None:
+            return self._state_vector
+
+        state_vector = tuple(self.nodes[node_path].state_mask for node_path in self.node_order())
+        if isinstance(self.nodes, NodeMap):
+            self._state_vector = state_vector
+
+        return state_vector
+
     def add_nodes(self, nodes):
+        self._make_mutable()
         for node in nodes:
             assert isinstance(node, StateNode)
             assert node.path_string not in self.nodes
 
             self.nodes[node.path_string] = node
-            self.graph.add_node(node)
+            self.topology.add_node(node.path_string)
 
     def add_edges(self, edges):
+        self._make_mutable()
         for left, right in edges:
-            self.graph.add_edge(self.nodes[left], self.nodes[right])
+            assert left in self.nodes and right in self.nodes
+            self.topology.add_edge(left, right)
+
+    def snapshot(self):
+        """Gets a copy of this graph to search from, which shares a frozen topology and a `NodeMap` with its
+        neighbors. Graphs made by `get_transitions_and_neighbors` already are one
+
+        Returns:
+            StateGraph: of the same class, in the same state
+        """
+        if nx.is_frozen(self.topology) and isinstance(self.nodes, NodeMap):
+            return self
+
+        snapshot = self.__class__(topology=nx.freeze(nx.DiGraph(self.topology)), nodes=NodeMap(self.nodes))
+        snapshot._validation_functions = self._validation_functions
+        return snapshot
+
+    def _with_node(self, node_path, node):
+        """Builds the graph that's this search state with one node swapped out
+
+        Args:
+            node_path (str): path of the node to swap
+            node (StateNode): node to put in its place
+
+        Returns:
+            StateGraph: sharing our topology and nodes
+        """
+        return self._with_node_state(node_path, node.__class__, node.state_mask, node)
+
+    def _with_node_state(self, node_path, node_cls, state_mask, node=None):
+        """`_with_node`, where the new node doesn't have to be built until someone looks at it
+
+        Args:
+            node_path (str): path of the node to swap
+            node_cls (type): class of the node to put in its place
+            state_mask (int): its state, packed by the class's StateInterner
+            node (StateNode): the node, if it's already been built (default: None)
+
+        Returns:
+            StateGraph: sharing our topology and nodes
+        """
+        nodes = NodeMap(self.nodes, node_path, node, node_state=(node_cls, state_mask))
+        new_graph = self.__class__(topology=self.topology, nodes=nodes)
+        new_graph._validation_functions = self._validation_functions
+        new_graph._relevant_transitions = self._relevant_transitions
+        if isinstance(self.nodes, NodeMap):
+            new_graph._validation_parent = (self, node_path)
+
+        # it only differs from us by one node, so its state vector is ours with one int swapped
+        state_vector = self.state_vector()
+        index = self._node_layout()[1][node_path]
+        new_graph._state_vector = state_vector[:index] + (state_mask,) + state_vector[index + 1:]
+        # and it's just as far from where the search is going, give or take that node, see `Progress`
+        if self._progress is not None:
+            new_graph._progress = self._progress[0].advance(
+                self._progress, index, node_cls, state_vector[index], state_mask
+            )
+        return new_graph
 
     def get_transitions_and_neighbors(self):
-        validations = global_validation_functions.get(self.__class__, [])
-        neighbors = {}
+        stats = current_search_stats.get()
+        if stats is not None:
+            stats.expanding(self)
+            started = time.perf_counter()
+
+        neighbors = dict(self.iter_transitions_and_neighbors())
+
+        if stats is not None:
+            stats.neighbor_time += time.perf_counter() - started
+            for transition, new_graph in neighbors.items():
+                stats.generating(transition, new_graph)
+
+        return neighbors
+
+    def iter_transitions_and_neighbors(self, validate=True):
+        """Generates what `get_transitions_and_neighbors` finds one neighbor at a time. Neighbors are cheap to
+        make, it's validating them that isn't, so searches that only look at some of them can leave that
+        until they do
+
+        Args:
+            validate (bool): only generate neighbors that pass our validations. Without it, they're just what
+                the transitions lead to, and it's up to the caller to check `is_valid` before using one
+                (default: True)
+
+        Yields:
+            Tuple[Tuple[str, Tuple, Tuple], StateGraph]: (node_path, from_state, to_state) and the neighbor
+        """
+        # neighbors share our topology and nodes, so if we're not a search state ourselves we hand them
+        # a snapshot of both that can't change from under them
+        snapshot = self.snapshot()
+        relevant = snapshot._relevant_transitions
+
+        for node_path in snapshot.topology.nodes():
+            helping = relevant[node_path] if relevant is not None else None
+            if helping is not None and not helping:
+                continue
 
-        for node in self.graph.nodes():
             # each node has a path it can take, so this graph can "transition" in the way that
             # each of the nodes does such a transition
-            node_neighbors = node.get_transitions_and_neighbors()
-            for from_state, stuff in node_neighbors.items():
-                for to_state, new_node in stuff.items():
-                    new_graph = self.__class__(
-                        graph=nx.DiGraph(self.graph),
-                        nodes=dict(self.nodes)
-                    )
+            node = snapshot.nodes[node_path]
+            for from_state, to_state, neighbor_mask in node.get_transitions_and_neighbor_masks():
+                if helping is not None and (from_state, to_state) not in helping:
+                    continue
 
-                    # cool so we have a new node! let's populate the graph with the new node
-                    new_graph.nodes[new_node.path_string] = new_node
-                    new_graph.graph.add_node(new_node)
-                    new_graph.graph.add_edges_from([
-                        (new_node, dest)
-                        for _, dest in new_graph.graph.out_edges(node)
-                    ] + [
-                        (source, new_node)
-                        for source, _ in new_graph.graph.in_edges(node)
-                    ])
-                    new_graph.graph.remove_node(node)
-
-                    # make sure we can go there using our validations
-                    valid = True
-                    for validation_func in validations:
-                        try:
-                            validation_func(new_graph)
-                        except ValidationError as e:
-                            valid = False
-                            break
-
-                    if valid:
-                        # phew! now we can associate this "transtition" to the new graph
-                        transition = (node.path_string, from_state, to_state)
-                        neighbors[transition] = new_graph
+                # cool so we have a new node! the new graph is us, with just that node swapped out. it only
+                # gets built if a validation looks at it
+                new_graph = snapshot._with_node_state(node_path, node.__class__, neighbor_mask)
 
-        return neighbors
+                # make sure we can go there using our validations
+                if not validate or new_graph.is_valid():
+                    # phew! now we can associate this "transtition" to the new graph
+                    yield (node_path, from_state, to_state), new_graph
+
+    def get_transitions_and_predecessors(self):
+        """The reverse of `get_transitions_and_neighbors`: finds the graphs that could have transitioned into
+        this one. Transitions can only lead to valid graphs, so an invalid graph has none
+
+        Returns:
+            Dict[Tuple[str, Tuple, Tuple], List[StateGraph]]: (node_path, from_state, to_state) -> graphs that
+                end up as this one by taking that transition
+        """
+        stats = current_search_stats.get()
+        if stats is not None:
+            stats.expanding(self)
+            started = time.perf_counter()
 
-    def take_shortest_path_to(self, expected_state_graph, dry_run=False):
+        predecessors = {}
+        if self.is_valid():
+            snapshot = self.snapshot()
+            relevant = snapshot._relevant_transitions
+            for node_path in snapshot.topology.nodes():
+                helping = relevant[node_path] if relevant is not None else None
+                if helping is not None and not helping:
+                    continue
+
+                node_predecessors = snapshot.nodes[node_path].get_transitions_and_predecessors()
+                for from_state, stuff in node_predecessors.items():
+                    for to_state, new_nodes in stuff.items():
+                        if helping is not None and (from_state, to_state) not in helping:
+                            continue
+
+                        transition = (node_path, from_state, to_state)
+                        predecessors[transition] = [
+                            snapshot._with_node(node_path, new_node) for new_node in new_nodes
+                        ]
+
+        if stats is not None:
+            stats.neighbor_time += time.perf_counter() - started
+            for transition, new_graphs in predecessors.items():
+                for new_graph in new_graphs:
+                    stats.generating(transition, new_graph)
+
+        return predecessors
+
+    def take_shortest_path_to(
+            self,
+            expected_state_graph,
+            dry_run=False,
+            strategy='a_star',
+            decompose=False,
+            max_workers=None,
+            plan_cache=None,
+            **search_options
+    ):
         """Reconcile's our graph to make it look like the expected_state
 
         Args:
-            expected_state_graph (StateGraph): where we want to be
+            expected_state_graph (Union[StateGraph, Goal]): where we want to be, or just what we want of it, see
+                `stateman.goal.Goal`
             dry_run (bool): if we should execute associated functions (default: False)
+            strategy (str): which of `stateman.search.search_strategies` finds the transitions (default: 'a_star')
+            decompose (bool): search each of our `independent_clusters` on its own (default: False)
+            max_workers (int): run the plan in `get_layers`, with up to this many transitions running at the same
+                time. Results then also say which 'layer' each transition ran in (default: None, one at a time)
+            plan_cache (PlanCache): reuse plans from here, checking them first, and put new ones in it
+                (default: None)
+            search_options: passed along to the search, like `heuristic` or `check_heuristic` for 'a_star', or
+                `stats` (see `stateman.stats.SearchStats`) for any of them
         """
-        # validate that the graphs have the same nodes and edges
-        assert self.nodes.keys() == expected_state_graph.nodes.keys()
+        transitions = self._find_transitions(expected_state_graph, strategy, decompose, plan_cache, **search_options)
+        return self._take_transitions(transitions, dry_run, max_workers)
+
+    def _take_transitions(self, transitions, dry_run, max_workers=None):
+        """Runs a plan the way `take_shortest_path_to` does
 
-        transitions = _a_star_valid_state_transitions(self, expected_state_graph)
+        Returns:
+            List[Dict]: results, in plan order
+        """
+        if max_workers is not None:
+            return self._take_transitions_in_layers(transitions, dry_run, max_workers)
 
         if dry_run:
             return [
-                {
-                    'node': node_path,
-                    'from_state': dict(from_state),
-                    'to_state': dict(to_state),
-                    'execution_result': {
-                        'dry_run': True
-                    }
-                }
-                for node_path, from_state, to_state in transitions
+                self._transition_result(*transition, execution_result={'dry_run': True})
+                for transition in transitions
             ]
 
-        results = []
+        return [self._take_transition(*transition) for transition in transitions]
+
+    def iter_shortest_path_to(
+            self,
+            expected_state_graph,
+            dry_run=False,
+            strategy='a_star',
+            decompose=False,
+            plan_cache=None,
+            replan=0,
+            observe=None,
+            **search_options
+    ):
+        """`take_shortest_path_to`, one transition at a time, yielding each result as soon as it's done. The first
+        transition that fails stops the plan instead of running the rest of it, which was planned for a world where
+        it worked. Then we can plan again from wherever that left us and keep going
+
+            for result in graph.iter_shortest_path_to(desired, replan=3, observe=look_around):
+                dashboard.send(result)
+
+        Args:
+            expected_state_graph (Union[StateGraph, Goal]): where we want to be, or just what we want of it, see
+                `stateman.goal.Goal`
+            dry_run (bool): if we should execute associated functions (default: False)
+            strategy (str): which of `stateman.search.search_strategies` finds the transitions (default: 'a_star')
+            decompose (bool): search each of our `independent_clusters` on its own (default: False)
+            plan_cache (PlanCache): reuse plans from here, checking them first, and put new ones in it
+                (default: None)
+            replan (int): most times to plan again after a transition fails (default: 0, stop at the first failure)
+            observe (Callable[[], StateGraph]): looks at what things are like now, to plan again from. Transitions
+                then run on its nodes (default: None, where the plan got us, taking it the failed transition
+                didn't change anything)
+            search_options: passed along to every search, like `heuristic`, `stats`, or a `replanner` for
+                'd_star_lite' that keeps its search between plans (see `stateman.replan.Replanner`)
+
+        Yields:
+            Dict: results, as they're done. They also say which 'attempt' at a plan they're from, counting from 0
+        """
+        state_graph = self
+        for attempt in range(replan + 1):
+            transitions = state_graph._find_transitions(
+                expected_state_graph, strategy, decompose, plan_cache, **search_options
+            )
+            # where the plan should have gotten us so far
+            planned = state_graph.snapshot()
+            for transition in transitions:
+                if dry_run:
+                    result = state_graph._transition_result(*transition, execution_result={'dry_run': True})
+                else:
+                    result = state_graph._take_transition(*transition)
+
+                result['attempt'] = attempt
+                yield result
+                if 'exception' in result:
+                    break
+
+                planned = planned._after_transition(transition)
+            else:
+                return
+
+            state_graph = observe() if observe is not None else planned
+
+    async def take_shortest_path_to_async(
+            self,
+            expected_state_graph,
+            dry_run=False,
+            strategy='a_star',
+            decompose=False,
+            max_concurrency=None,
+            plan_cache=None,
+            **search_options
+    ):
+        """`take_shortest_path_to` for asyncio. The search runs on a worker thread so the event loop stays free
+        while it does, and async validations it comes across run on this loop. The plan then runs in
+        `get_layers`: coroutine transitions are awaited, plain ones are sent to the loop's default executor, and
+        every transition of a layer runs at the same time. Results say which 'layer' each transition ran in
+
+        Args:
+            expected_state_graph (Union[StateGraph, Goal]): where we want to be, or just what we want of it, see
+                `stateman.goal.Goal`
+            dry_run (bool): if we should execute associated functions (default: False)
+            strategy (str): which of `stateman.search.search_strategies` finds the transitions (default: 'a_star')
+            decompose (bool): search each of our `independent_clusters` on its own (default: False)
+            max_concurrency (int): most transitions to have running at once (default: None, a whole layer)
+            plan_cache (PlanCache): reuse plans from here, checking them first, and put new ones in it
+                (default: None)
+            search_options: passed along to the search, like `heuristic` or `check_heuristic` for 'a_star'
+
+        Returns:
+            List[Dict]: results, in plan order
+        """
+        loop = asyncio.get_running_loop()
+        transitions = await loop.run_in_executor(None, lambda: run_with_event_loop(
+            loop, self._find_transitions, expected_state_graph, strategy, decompose, plan_cache, **search_options
+        ))
+
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency is not None else None
+
+        async def take_transition(transition):
+            if semaphore is None:
+                return await self._take_transition_async(*transition)
+            async with semaphore:
+                return await self._take_transition_async(*transition)
+
+        results = [None] * len(transitions)
+        state_graph = self.snapshot()
+        validation_error = None  # plans are allowed to start out from invalid states
+
+        for layer_index, layer in enumerate(self.get_layers(transitions)):
+            pending = {}
+            for index in layer:
+                results[index] = state_graph._skipped_transition_result(transitions[index], validation_error, dry_run)
+                if results[index] is None:
+                    pending[index] = take_transition(transitions[index])
+
+            for index, result in zip(pending, await asyncio.gather(*pending.values())):
+                results[index] = result
+
+            state_graph = state_graph._advance_past_layer(transitions, results, layer, layer_index)
+            if validation_error is None:
+                validation_error = await loop.run_in_executor(
+                    None, run_with_event_loop, loop, state_graph.validation_error
+                )
+
+        return results
+
+    def _find_transitions(self, expected_state_graph, strategy, decompose, plan_cache=None, **search_options):
+        # validate that the graphs have the same nodes and edges
+        assert isinstance(expected_state_graph, Goal) or self.nodes.keys() == expected_state_graph.nodes.keys()
+
+        search = search_strategies[strategy]
+        context = None
+        if plan_cache is not None:
+            context = self._plan_context(expected_state_graph, strategy, decompose, search_options)
+        if context is None:
+            return self._search(expected_state_graph, search, decompose, **search_options)
+
+        transitions = self._cached_plan(plan_cache, context, expected_state_graph)
+        if transitions is not None:
+            return transitions
+
+        transitions = self._search(expected_state_graph, search, decompose, **search_options)
+        self._remember_plan(plan_cache, context, expected_state_graph, transitions)
+        return transitions
+
+    def _plan_context(self, expected_state_graph, strategy, decompose, search_options):
+        """Everything besides where we start that a plan depends on: how we looked for it, and what was registered
+        when we did. Plans are cached and shared by it
+
+        Returns:
+            Tuple: the context, or None if search_options can't be hashed, so plans found with them can't be
+                shared
+        """
+        context = (
+            self.__class__,
+            expected_state_graph.fingerprint(),
+            strategy,
+            decompose,
+            # stats are somewhere to put what happened, not something plans depend on
+            tuple(sorted((key, value) for key, value in search_options.items() if key != 'stats')),
+            get_registry_version(),
+        )
+        try:
+            hash(context)
+        except TypeError:
+            return None
+
+        return context
+
+    def _cached_plan(self, plan_cache, context, expected_state_graph):
+        """List[Tuple[str, Tuple, Tuple]]: the rest of a plan from plan_cache that still works from here, or None"""
+        def check(transitions):
+            trajectory = self.get_trajectory(transitions)
+            return len(trajectory) == len(transitions) + 1 and expected_state_graph.is_satisfied_by(trajectory[-1])
+
+        return plan_cache.get(context, self.fingerprint(), check=check)
+
+    def _remember_plan(self, plan_cache, context, expected_state_graph, transitions):
+        """Puts a plan we found from here in plan_cache"""
+        if not transitions:
+            # already there, or the goal is unreachable. neither is worth remembering
+            return
+
+        trajectory = self.get_trajectory(transitions)
+        if len(trajectory) == len(transitions) + 1 and expected_state_graph.is_satisfied_by(trajectory[-1]):
+            plan_cache.put(context, [state_graph.fingerprint() for state_graph in trajectory], transitions)
+
+    def _search(self, expected_state_graph, search, decompose, **search_options):
+        # searches from both ends only see transitions that could help, see `relevant_transitions`
+        relevant = self.relevant_transitions(expected_state_graph)
+        current_state_graph = copy.copy(self.snapshot())
+        current_state_graph._relevant_transitions = relevant
+        if not isinstance(expected_state_graph, Goal):
+            expected_state_graph = copy.copy(expected_state_graph.snapshot())
+            expected_state_graph._relevant_transitions = relevant
+
+        stats = search_options.get('stats')
+        if stats is not None and search not in unpruned_search_strategies:
+            for node_path, helping in relevant.items():
+                if helping is not None:
+                    transitions = global_transition_functions.get(self.nodes[node_path].__class__, {})
+                    stats.pruned += sum(len(to_states) for to_states in transitions.values()) - len(helping)
+
+        if decompose:
+            return _decomposed_valid_state_transitions(
+                current_state_graph, expected_state_graph, search, **search_options
+            )
+
+        return search(current_state_graph, expected_state_graph, **search_options)
+
+    def get_trajectory(self, transitions):
+        """Follows a plan without running anything, checking each transition can still be taken from where the
+        plan got us and leads somewhere valid. That's one neighbor lookup and one incremental validation per step
+
+        Args:
+            transitions (List[Tuple[str, Tuple, Tuple]]): (node_path, from_state, to_state) plan, in order
+
+        Returns:
+            List[StateGraph]: the graph we start from, then the one after each transition, up to where the plan
+                stopped working
+        """
+        state_graph = self.snapshot()
+        trajectory = [state_graph]
         for node_path, from_state, to_state in transitions:
-            node = self.nodes[node_path]
-            transition_func = global_transition_functions[node.__class__][from_state][to_state]
-            result = {
-                'node': node_path,
-                'from_state': dict(from_state),
-                'to_state': dict(to_state),
-            }
+            if node_path not in state_graph.nodes:
+                break
 
-            try:
-                result['execution_result'] = transition_func(node)
-            except Exception as e:
-                result['exception'] = e
+            node = state_graph.nodes[node_path]
+            neighbor_masks = [
+                neighbor_mask
+                for neighbor_from, neighbor_to, neighbor_mask in node.get_transitions_and_neighbor_masks()
+                if neighbor_from == from_state and neighbor_to == to_state
+            ]
+            if not neighbor_masks:
+                break
+
+            state_graph = state_graph._with_node_state(node_path, node.__class__, neighbor_masks[0])
+            if not state_graph.is_valid():
+                break
+
+            trajectory.append(state_graph)
+
+        return trajectory
+
+    def _transition_result(self, node_path, from_state, to_state, **result):
+        return {
+            'node': node_path,
+            'from_state': dict(from_state),
+            'to_state': dict(to_state),
+            **result
+        }
+
+    def _take_transition(self, node_path, from_state, to_state):
+        node = self.nodes[node_path]
+        transition_func = global_transition_functions[node.__class__][from_state][to_state]
+        result = self._transition_result(node_path, from_state, to_state)
+
+        try:
+            execution_result = transition_func(node)
+            if inspect.isawaitable(execution_result):
+                execution_result = run_coroutine(execution_result)
+            result['execution_result'] = execution_result
+        except Exception as e:
+            result['exception'] = e
+
+        return result
+
+    async def _take_transition_async(self, node_path, from_state, to_state):
+        node = self.nodes[node_path]
+        transition_func = global_transition_functions[node.__class__][from_state][to_state]
+        if not inspect.iscoroutinefunction(transition_func):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._take_transition, node_path, from_state, to_state)
+
+        result = self._transition_result(node_path, from_state, to_state)
+        try:
+            result['execution_result'] = await transition_func(node)
+        except Exception as e:
+            result['exception'] = e
+
+        return result
+
+    def get_partial_order(self, transitions):
+        """Works out which transitions of a plan have to happen before which. Two transitions are kept in order
+        if they're on the same node, on nodes with an edge between them, or on nodes a graph validation looks at
+        together (validations that don't say what they read look at everything). Any two transitions with no
+        path between them can happen at the same time, and every validation still sees its nodes go through the
+        same states as it would have running the plan in order
+
+        Args:
+            transitions (List[Tuple[str, Tuple, Tuple]]): (node_path, from_state, to_state) plan, in order
+
+        Returns:
+            DiGraph: of plan indexes, with a 'transition' attribute, and happens-before edges between them
+        """
+        footprints = [
+            self.validation_footprint(validation_func)
+            for validation_func in self.get_validation_functions()
+        ]
+
+        def conflict(left, right):
+            return left == right or self.topology.has_edge(left, right) or self.topology.has_edge(right, left) or any(
+                footprint is None or (left in footprint and right in footprint)
+                for footprint in footprints
+            )
+
+        partial_order = nx.DiGraph()
+        for index, transition in enumerate(transitions):
+            partial_order.add_node(index, transition=transition)
+            for earlier in range(index):
+                if conflict(transitions[earlier][0], transition[0]):
+                    partial_order.add_edge(earlier, index)
+
+        return partial_order
 
-            results.append(result)
+    def get_layers(self, transitions):
+        """Groups a plan into layers that can each run all at once, see `get_partial_order`
+
+        Args:
+            transitions (List[Tuple[str, Tuple, Tuple]]): (node_path, from_state, to_state) plan, in order
+
+        Returns:
+            List[List[int]]: plan indexes in each layer
+        """
+        return [sorted(layer) for layer in nx.topological_generations(self.get_partial_order(transitions))]
+
+    def _take_transitions_in_layers(self, transitions, dry_run, max_workers):
+        """Runs each of `get_layers` on a pool of threads, waiting for a whole layer to finish before starting
+        the next. We keep track of where the plan should have gotten us, leaving out transitions that failed, and
+        check validations on it between layers. Once that isn't valid anymore, the rest of the plan is skipped with
+        the ValidationError, and so are transitions whose from state doesn't hold anymore
+
+        Returns:
+            List[Dict]: results, in plan order
+        """
+        results = [None] * len(transitions)
+        state_graph = self.snapshot()
+        validation_error = None  # plans are allowed to start out from invalid states
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for layer_index, layer in enumerate(self.get_layers(transitions)):
+                futures = {}
+                for index in layer:
+                    results[index] = state_graph._skipped_transition_result(
+                        transitions[index], validation_error, dry_run
+                    )
+                    if results[index] is None:
+                        futures[index] = executor.submit(self._take_transition, *transitions[index])
+
+                for index, future in futures.items():
+                    results[index] = future.result()
+
+                state_graph = state_graph._advance_past_layer(transitions, results, layer, layer_index)
+                if validation_error is None:
+                    validation_error = state_graph.validation_error()
 
         return results
 
+    def _skipped_transition_result(self, transition, validation_error, dry_run):
+        """Result for a transition of a layered run that shouldn't actually run from where we are
+
+        Returns:
+            Dict: the result, or None if the transition should run
+        """
+        node_path, from_state, to_state = transition
+        if validation_error is not None:
+            return self._transition_result(*transition, exception=validation_error)
+        if not all(self.nodes[node_path].state.get(key) == value for key, value in from_state):
+            return self._transition_result(*transition, exception=ValueError(
+                f"{node_path} must contain this for transitioning: {dict(from_state)}"
+            ))
+        if dry_run:
+            return self._transition_result(*transition, execution_result={'dry_run': True})
+
+        return None
+
+    def _advance_past_layer(self, transitions, results, layer, layer_index):
+        """Moves on to where a layer should've gotten us, leaving out transitions that failed
+
+        Returns:
+            StateGraph: where we should be now
+        """
+        state_graph = self
+        for index in layer:
+            results[index]['layer'] = layer_index
+            if 'exception' not in results[index]:
+                state_graph = state_graph._after_transition(transitions[index])
+
+        return state_graph
+
+    def _after_transition(self, transition):
+        """StateGraph: where taking a transition gets this search state"""
+        node_path, from_state, to_state = transition
+        node = self.nodes[node_path]
+        node_state = {**node.state, **dict(to_state)}
+        node_state = {key: value for key, value in node_state.items() if value is not None}
+        return self._with_node(node_path, node.create(node_path, **node_state))
+
+    def fingerprint(self):
+        """Builds a canonical, hashable key for the state of this graph. Graphs with the same node paths,
+        node states and edges get the same fingerprint, regardless of the order things were added in.
+        Node states are compared by `state_vector`, so a node at a given path is expected to keep its class
+
+        Returns:
+            Tuple: (node_order, state_vector, sorted (left_path, right_path) edges)
+        """
+        return self.node_order(), self.state_vector(), self._edges_key()
+
+    def is_satisfied_by(self, state_graph):
+        """bool: if state_graph is in the same state as us. Searches check this to tell they've got where we are,
+        and a `Goal` can stand in for us when only some of our state matters"""
+        return state_graph.fingerprint() == self.fingerprint()
+
+    def _edges_key(self):
+        """Sorted edges of our topology, which are shared by every state in a search"""
+        cache = self._topology_cache()
+        if 'edges_key' not in cache:
+            cache['edges_key'] = tuple(sorted(self.topology.edges()))
+
+        return cache['edges_key']
+
     def has_same_state(self, other):
         if self.nodes.keys() != other.nodes.keys():
             return False
@@ -210,8 +1111,7 @@ class StateGraph(Validatable):
             if other.nodes[node_path].state != node.state:
                 return False
 
-        if [(left.path_string, right.path_string) for left, right in self.graph.in_edges()] != \
-                [(left.path_string, right.path_string) for left, right in other.graph.in_edges()]:
+        if list(self.topology.in_edges()) != list(other.topology.in_edges()):
             return False
 
         return True
@@ -0,0 +1,69 @@
+from stateman.goal import Goal
+from stateman.utils import get_transition_table
+
+
+# every transition changes the state of exactly one node, which keeps all of these admissible (they never guess
+# more transitions than are needed) and consistent (taking one transition changes the guess by at most one).
+# they all work towards a `Goal` as well as towards a desired graph. the ones that add up a term per node say how
+# to work out a node's term from what it has to get to with a `node_term`, so `stateman.progress.Progress` can keep
+# them up to date as searches go instead of adding them up again for every state
+
+
+def zero(state_graph, desired_state_graph):
+    """Doesn't guess at all, which turns A* into Dijkstra's algorithm"""
+    return 0
+
+
+def mismatch_count(state_graph, desired_state_graph):
+    """Number of nodes not in their desired state. Each of them needs at least one transition"""
+    if isinstance(desired_state_graph, Goal):
+        return len(desired_state_graph.unsatisfied(state_graph))
+
+    return sum(
+        node_mask != desired_mask
+        for node_mask, desired_mask in zip(state_graph.state_vector(), desired_state_graph.state_vector())
+    )
+
+
+def node_distances(state_graph, desired_state_graph):
+    """Yields the fewest transitions each node needs on its own to get to its desired state, ignoring
+    validations. See `TransitionTable.distance`"""
+    if isinstance(desired_state_graph, Goal):
+        yield from desired_state_graph.node_distances(state_graph)
+        return
+
+    node_order = state_graph.node_order()
+    for node_path, node_mask, desired_mask in zip(
+            node_order, state_graph.state_vector(), desired_state_graph.state_vector()
+    ):
+        if node_mask != desired_mask:
+            node_cls = state_graph.nodes[node_path].__class__
+            yield get_transition_table(node_cls).distance(node_mask, desired_mask)
+
+
+def _no_term(target, node_cls, state_mask):
+    return 0
+
+
+def _mismatch_term(target, node_cls, state_mask):
+    return 0 if target.accepts(node_cls, state_mask) else 1
+
+
+def _distance_term(target, node_cls, state_mask):
+    return target.distance(node_cls, state_mask)
+
+
+def max_node_distance(state_graph, desired_state_graph):
+    """The farthest any single node is from its desired state"""
+    return max(node_distances(state_graph, desired_state_graph), default=0)
+
+
+def sum_node_distances(state_graph, desired_state_graph):
+    """How far all nodes are from their desired states put together. Transitions only ever move one node,
+    so none of them can be shared between nodes"""
+    return sum(node_distances(state_graph, desired_state_graph))
+
+
+zero.node_term = _no_term
+mismatch_count.node_term = _mismatch_term
+sum_node_distances.node_term = _distance_term
@@ -1,5 +1,4 @@
-from stateman.utils import Transitionable, Validatable, \
-    global_transition_functions, global_validation_functions, ValidationError
+from stateman.utils import Transitionable, Validatable, global_state_interners, get_transition_table
 
 
 class StateNode(Transitionable, Validatable):
@@ -33,6 +32,15 @@ class StateNode(Transitionable, Validatable):
     def path_string(self):
         return '/' + '/'.join(self.path)
 
+    @property
+    def state_mask(self):
+        """int: our state packed by this class's StateInterner"""
+        return global_state_interners[self.__class__].mask(self.state)
+
+    def memo_key(self):
+        """Tuple[str, int]: our path and state mask"""
+        return self.path_string, self.state_mask
+
     def destroy(self):
         """Defines how to destroy self"""
 
@@ -42,31 +50,37 @@ class StateNode(Transitionable, Validatable):
         Returns:
             Dict: mapping possible transitions to neighbors of this node
         """
-        possible_transitions = global_transition_functions.get(self.__class__, {})
-        validations = global_validation_functions.get(self.__class__, [])
-        current_state = tuple(sorted(self.state.items()))
         neighbors = {}
-
-        for from_state_props, transitions in possible_transitions.items():
-            if all((item in current_state) for item in from_state_props):
-                for transition in transitions:
-                    # who we tryna be
-                    neighbor_state = {**self.state, **dict(transition)}
-                    neighbor_state = {key: value for key, value in neighbor_state.items() if value is not None}
-                    neighbor = self.create(self.path_string, **neighbor_state)
-
-                    # make sure we can go there
-                    valid = True
-                    for validation_func in validations:
-                        try:
-                            validation_func(neighbor)
-                        except ValidationError as e:
-                            valid = False
-                            break
-
-                    if valid:
-                        if from_state_props not in neighbors:
-                            neighbors[from_state_props] = {}
-                        neighbors[from_state_props][transition] = neighbor
+        for from_state_props, transition, neighbor_mask in self.get_transitions_and_neighbor_masks():
+            neighbor = self.create(self.path_string, **global_state_interners[self.__class__].unmask(neighbor_mask))
+            neighbors.setdefault(from_state_props, {})[transition] = neighbor
 
         return neighbors
+
+    def get_transitions_and_neighbor_masks(self):
+        """Like `get_transitions_and_neighbors`, but leaves neighbors as state masks so nobody has to build them
+        until they're needed. These are cached per state in our TransitionTable
+
+        Returns:
+            List[Tuple[Tuple, Tuple, int]]: (from_state, to_state, state mask of the neighbor)
+        """
+        return get_transition_table(self.__class__).valid_neighbors(self)
+
+    def get_transitions_and_predecessors(self):
+        """Gets the transitions that could have led to this particular node, the reverse of
+        `get_transitions_and_neighbors`. Transitions can only lead to valid nodes, so invalid nodes have none
+
+        Returns:
+            Dict: mapping possible transitions to lists of predecessors of this node. Transitions overwrite
+                state, so more than one node could have taken the same transition to get here
+        """
+        predecessors = {}
+        if not self.is_valid():
+            return predecessors
+
+        table = get_transition_table(self.__class__)
+        for from_state_props, transition, predecessor_mask in table.predecessors(self.state_mask):
+            predecessor = self.create(self.path_string, **table.interner.unmask(predecessor_mask))
+            predecessors.setdefault(from_state_props, {}).setdefault(transition, []).append(predecessor)
+
+        return predecessors
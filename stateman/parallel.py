@@ -0,0 +1,137 @@
+import copy
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from stateman.utils import (
+    export_registry, global_state_interners, global_validation_functions, import_registry, registered_classes,
+)
+
+
+# where each worker process builds the states it's sent from, set up once by `_init_worker`
+_worker_start_state_graph = None
+
+
+class ExpansionPool(object):
+    """Worker processes that find the transitions out of search states in parallel, validations and all.
+    Workers get sent where the search started once, and after that each state as just the nodes that changed
+    since, and they send back the transitions. Building the neighbors those lead to is cheap, so that's left to
+    the search
+
+    Forked workers inherit the registries. Workers started any other way rebuild them with `import_registry`,
+    so then every class, transition and validation involved has to be importable, see `export_registry`
+
+    Attributes:
+        start_state_graph (StateGraph): search state everything sent to the workers is relative to
+        processes (int): number of worker processes
+    """
+
+    def __init__(self, start_state_graph, processes=None, mp_context=None):
+        """
+        Args:
+            start_state_graph (StateGraph): where the search starts
+            processes (int): number of worker processes (default: None, one per CPU)
+            mp_context (str): multiprocessing start method, 'fork', 'spawn' or 'forkserver' (default: None,
+                the platform's default)
+        """
+        self.start_state_graph = start_state_graph.snapshot()
+        self.processes = processes or os.cpu_count()
+        self._node_order = self.start_state_graph.node_order()
+        self._node_classes = [self.start_state_graph.nodes[node_path].__class__ for node_path in self._node_order]
+        self._start_vector = self.start_state_graph.state_vector()
+
+        context = multiprocessing.get_context(mp_context)
+        registry = None
+        if context.get_start_method() != 'fork':
+            registry = export_registry(registered_classes([self.start_state_graph]))
+        self._executor = ProcessPoolExecutor(
+            self.processes, mp_context=context, initializer=_init_worker,
+            initargs=self._worker_start(registry is not None) + (registry,),
+        )
+
+    def _worker_start(self, by_reference):
+        """(start state graph, validation indexes). Subgraphs only run some of their class's validations, which
+        get sent as indexes into the class's registered validations, since workers that rebuilt the registries
+        have validations of their own"""
+        start_state_graph = self.start_state_graph
+        validation_indexes = None
+        if start_state_graph._validation_functions is not None:
+            registered = global_validation_functions.get(start_state_graph.__class__, [])
+            validation_indexes = [registered.index(func) for func in start_state_graph._validation_functions]
+
+        # workers only find transitions, so they don't need to keep track of the search's progress
+        start_state_graph = copy.copy(start_state_graph)
+        start_state_graph._progress = None
+        if by_reference:
+            start_state_graph._validation_functions = None
+            start_state_graph._validation_parent = None
+            start_state_graph._validation_cache = None
+
+        return start_state_graph, validation_indexes
+
+    def changes(self, state_graph):
+        """Tuple[Tuple[str, Tuple]]: (node_path, state items) of the nodes that changed since the start"""
+        return tuple(
+            (node_path, tuple(global_state_interners[node_cls].unmask(state_mask).items()))
+            for node_path, node_cls, state_mask, start_mask in zip(
+                self._node_order, self._node_classes, state_graph.state_vector(), self._start_vector
+            )
+            if state_mask != start_mask
+        )
+
+    def expand(self, state_graphs):
+        """Finds the transitions out of states, splitting them up evenly between the workers
+
+        Args:
+            state_graphs (List[StateGraph]): search states from the same search as `start_state_graph`
+
+        Returns:
+            List[List[Tuple[str, Tuple, Tuple]]]: for each state, the (node_path, from_state, to_state)
+                transitions `StateGraph.get_transitions_and_neighbors` would find
+        """
+        changes = [self.changes(state_graph) for state_graph in state_graphs]
+        chunk_size = -(-len(changes) // self.processes) or 1
+        chunks = [changes[index:index + chunk_size] for index in range(0, len(changes), chunk_size)]
+        return list(itertools.chain.from_iterable(self._executor.map(_expand_states, chunks)))
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def _init_worker(start_state_graph, validation_indexes, registry):
+    global _worker_start_state_graph
+    if registry is not None:
+        import_registry(registry)
+    if validation_indexes is not None:
+        registered = global_validation_functions.get(start_state_graph.__class__, [])
+        start_state_graph._validation_functions = [registered[index] for index in validation_indexes]
+
+    _worker_start_state_graph = start_state_graph
+
+
+def _expand_states(changes):
+    """Runs in the workers, see `ExpansionPool.expand`
+
+    Args:
+        changes (List[Tuple[Tuple[str, Tuple]]]): for each state, what `ExpansionPool.changes` said about it
+
+    Returns:
+        List[List[Tuple[str, Tuple, Tuple]]]: transitions out of each state
+    """
+    transitions = []
+    for node_changes in changes:
+        state_graph = _worker_start_state_graph
+        for node_path, state in node_changes:
+            node_cls = state_graph.nodes[node_path].__class__
+            state_graph = state_graph._with_node(node_path, node_cls.create(node_path, **dict(state)))
+
+        transitions.append(list(state_graph.get_transitions_and_neighbors()))
+
+    return transitions
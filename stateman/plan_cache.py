@@ -0,0 +1,123 @@
+from collections import OrderedDict
+
+
+class PlanCache(object):
+    """Bounded cache of plans found by `StateGraph.take_shortest_path_to`. Every state a plan goes through is
+    indexed, so a reconciliation starting from any of them gets the rest of that plan. The rest of a shortest
+    plan is a shortest plan itself, so that's just as good as searching again
+
+    Attributes:
+        maxsize (int): most plans to keep
+        policy (str): which plan goes when we're full: 'lru' (least recently used), 'lfu' (least often used)
+            or 'fifo' (oldest)
+        plans (OrderedDict): (context, start key) -> [state keys along the plan, transitions, uses]
+        index (Dict): (context, state key) -> (plan id, position along that plan)
+        hits (int): lookups that got a plan
+        prefix_hits (int): hits that started somewhere along a plan rather than at its start
+        misses (int): lookups that didn't, including ones whose plan didn't check out anymore
+        stale (int): plans dropped because they didn't check out anymore
+        evictions (int): plans dropped to make room
+    """
+    policies = ('lru', 'lfu', 'fifo')
+
+    def __init__(self, maxsize=128, policy='lru'):
+        if policy not in self.policies:
+            raise ValueError(f"policy must be one of {self.policies}")
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.plans = OrderedDict()
+        self.index = {}
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        """float: share of lookups that got a plan"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, context, state_key, check=None):
+        """Finds the rest of a cached plan going through a state
+
+        Args:
+            context (Hashable): everything besides the current state the plan depends on, like the desired state
+            state_key (Hashable): the current state
+            check (Callable[[List], bool]): tells if the plan still works, plans it says don't are dropped
+                (default: None, trust them)
+
+        Returns:
+            List[Tuple[str, Tuple, Tuple]]: transitions left to take, or None if we don't have any
+        """
+        plan_id, position = self.index.get((context, state_key), (None, None))
+        if plan_id is None:
+            self.misses += 1
+            return None
+
+        plan = self.plans[plan_id]
+        transitions = plan[1][position:]
+        if check is not None and not check(transitions):
+            self.discard(plan_id)
+            self.stale += 1
+            self.misses += 1
+            return None
+
+        plan[2] += 1
+        if self.policy == 'lru':
+            self.plans.move_to_end(plan_id)
+
+        self.hits += 1
+        if position:
+            self.prefix_hits += 1
+
+        return transitions
+
+    def put(self, context, state_keys, transitions):
+        """Caches a plan. Plans that don't do anything would never be found again, see `index`, so they aren't
+        kept
+
+        Args:
+            context (Hashable): see `get`
+            state_keys (List[Hashable]): the state we start in and each one after a transition
+            transitions (List[Tuple[str, Tuple, Tuple]]): the plan
+        """
+        assert len(state_keys) == len(transitions) + 1
+        if not transitions:
+            return
+
+        plan_id = (context, state_keys[0])
+        if plan_id in self.plans:
+            self.discard(plan_id)
+
+        while self.plans and len(self.plans) >= self.maxsize:
+            self.discard(self._victim())
+            self.evictions += 1
+
+        self.plans[plan_id] = [state_keys, list(transitions), 0]
+        # the last state's plan is to do nothing, which doesn't need a cache
+        for position, state_key in enumerate(state_keys[:-1]):
+            self.index[(context, state_key)] = (plan_id, position)
+
+    def _victim(self):
+        if self.policy == 'lfu':
+            return min(self.plans, key=lambda plan_id: self.plans[plan_id][2])
+
+        return next(iter(self.plans))
+
+    def discard(self, plan_id):
+        """Drops a plan, and the states along it that still lead to it"""
+        context = plan_id[0]
+        state_keys = self.plans.pop(plan_id)[0]
+        for state_key in state_keys:
+            if self.index.get((context, state_key), (None,))[0] == plan_id:
+                del self.index[(context, state_key)]
+
+    def clear(self):
+        self.plans.clear()
+        self.index.clear()
+
+    def __len__(self):
+        return len(self.plans)
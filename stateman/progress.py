@@ -0,0 +1,157 @@
+import copy
+
+from stateman.goal import Goal
+from stateman.utils import get_transition_table
+
+
+class Progress(object):
+    """Keeps track of how far the states of one search are from where it's going: how many nodes aren't where
+    they should be, and what the heuristic guesses. A state gets both from the state it came from, by taking
+    away what its changed node used to add and adding what it adds now, so testing for the goal is a counter
+    check and updating the guess takes constant time. See `StateGraph._with_node_state`
+
+    Only heuristics that add up a term per node, which say so with a `node_term` like the ones in
+    `stateman.heuristics`, can be kept up this way. Others get called on the whole state like always
+
+    Attributes:
+        desired_state_graph (Union[StateGraph, Goal]): where the search is going
+        heuristic (Callable[[StateGraph, StateGraph], int]): what guesses how far that is
+        targets (List[object]): for each node in `node_order`, what it has to get to, None if anything will do
+    """
+
+    def __init__(self, current_state_graph, desired_state_graph, heuristic):
+        """
+        Args:
+            current_state_graph (StateGraph): where the search starts
+            desired_state_graph (Union[StateGraph, Goal]): where it's going
+            heuristic (Callable[[StateGraph, StateGraph], int]): guesses how many transitions are left
+        """
+        self.desired_state_graph = desired_state_graph
+        self.heuristic = heuristic
+        self._node_term = getattr(heuristic, 'node_term', None)
+
+        node_order = current_state_graph.node_order()
+        if isinstance(desired_state_graph, Goal):
+            self.targets = [None] * len(node_order)
+            for index, _, _, node_constraints in desired_state_graph.bind(current_state_graph):
+                self.targets[index] = _ConstraintTarget(desired_state_graph, node_constraints)
+            # there's always a state satisfying a goal, as far as what's in the graph goes
+            self._reachable = True
+        else:
+            self.targets = [_StateTarget(desired_mask) for desired_mask in desired_state_graph.state_vector()]
+            self._reachable = desired_state_graph.node_order() == node_order and (
+                desired_state_graph._edges_key() == current_state_graph._edges_key()
+            )
+
+    def start(self, state_graph):
+        """Works out where a search starts from scratch
+
+        Args:
+            state_graph (StateGraph): search state to start from
+
+        Returns:
+            StateGraph: a copy of it that its neighbors work out their progress from
+        """
+        mismatches, total, unreachable = 0, 0, 0
+        node_order = state_graph.node_order()
+        for index, state_mask in enumerate(state_graph.state_vector()):
+            target = self.targets[index]
+            if target is None:
+                continue
+
+            node_cls = state_graph.nodes[node_order[index]].__class__
+            mismatches += not target.accepts(node_cls, state_mask)
+            if self._node_term is not None:
+                term = self._node_term(target, node_cls, state_mask)
+                if term == float('inf'):
+                    unreachable += 1
+                else:
+                    total += term
+
+        state_graph = copy.copy(state_graph)
+        state_graph._progress = (self, mismatches, total, unreachable)
+        return state_graph
+
+    def advance(self, progress, index, node_cls, from_mask, to_mask):
+        """Works out the progress of a state from that of the state it came from
+
+        Args:
+            progress (Tuple): `_progress` of the state it came from
+            index (int): position of the node that changed in `node_order`
+            node_cls (type): its class
+            from_mask (int): its state mask before
+            to_mask (int): and after
+
+        Returns:
+            Tuple: (progress, mismatches, total of finite terms, number of infinite terms)
+        """
+        _, mismatches, total, unreachable = progress
+        target = self.targets[index]
+        if target is None:
+            return progress
+
+        mismatches += target.accepts(node_cls, from_mask) - target.accepts(node_cls, to_mask)
+        if self._node_term is not None:
+            for term, sign in ((self._node_term(target, node_cls, from_mask), -1),
+                               (self._node_term(target, node_cls, to_mask), 1)):
+                if term == float('inf'):
+                    unreachable += sign
+                else:
+                    total += sign * term
+
+        return self, mismatches, total, unreachable
+
+    def _of(self, state_graph):
+        progress = getattr(state_graph, '_progress', None)
+        return progress if progress is not None and progress[0] is self else None
+
+    def is_goal(self, state_graph):
+        """bool: if a state is where the search is going"""
+        progress = self._of(state_graph)
+        if progress is None:
+            return self.desired_state_graph.is_satisfied_by(state_graph)
+
+        return self._reachable and progress[1] == 0
+
+    def estimate(self, state_graph):
+        """Union[int, float]: what the heuristic guesses for a state"""
+        progress = self._of(state_graph)
+        if progress is None or self._node_term is None:
+            return self.heuristic(state_graph, self.desired_state_graph)
+
+        return float('inf') if progress[3] else progress[2]
+
+
+class _StateTarget(object):
+    """A node has to get to one state in particular"""
+
+    def __init__(self, desired_mask):
+        self.desired_mask = desired_mask
+
+    def accepts(self, node_cls, state_mask):
+        return state_mask == self.desired_mask
+
+    def distance(self, node_cls, state_mask):
+        if state_mask == self.desired_mask:
+            return 0
+
+        return get_transition_table(node_cls).distance(state_mask, self.desired_mask)
+
+
+class _ConstraintTarget(object):
+    """A node has to get to any state satisfying some of a `Goal`'s constraints"""
+
+    def __init__(self, goal, node_constraints):
+        self.goal = goal
+        self.node_constraints = node_constraints
+
+    def accepts(self, node_cls, state_mask):
+        return self.goal.accepts(node_cls, state_mask, self.node_constraints)
+
+    def distance(self, node_cls, state_mask):
+        if self.accepts(node_cls, state_mask):
+            return 0
+
+        return get_transition_table(node_cls).distance_to(
+            state_mask, lambda mask: self.accepts(node_cls, mask), self.node_constraints
+        )
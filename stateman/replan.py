@@ -0,0 +1,200 @@
+import copy
+import heapq
+import itertools
+
+from stateman.goal import Goal
+from stateman.utils import get_registry_version, get_transition_table, global_state_interners
+
+
+class Replanner(object):
+    """Keeps one search going across reconciliations towards the same desired state graph, D* Lite style, for
+    when the world moves while a plan runs and we have to plan again from wherever it ended up
+
+    The search goes backward from the desired state graph, see `StateGraph.get_transitions_and_predecessors`,
+    and every state it expands gets its exact distance to the desired state. That distance doesn't depend on
+    where we start, and neither do transitions or validations, so moving the start doesn't make any of it stale.
+    Planning again from a state the search already expanded just follows its pointers. From anywhere else the
+    search picks up where it stopped: states it still has to expand keep the priorities they got for the old
+    start, and `km` makes up for the move like in D* Lite, so only the part of the search the new start needs
+    gets done. Registering transitions or validations changes the state space, so that starts over. So do state
+    values the node classes' `StateInterner`s hadn't seen yet, like in a start nobody saw coming: running
+    transitions backward only tries values that were interned, so states expanded before then might be missing
+    predecessors
+
+    Searches aren't pruned to `StateGraph.relevant_transitions`, since which transitions can help depends on
+    where we start. The heuristic has to satisfy the triangle inequality, like the ones in `stateman.heuristics`
+
+    Pass one to the 'd_star_lite' search strategy:
+
+        replanner = Replanner()
+        results = graph.take_shortest_path_to(desired, strategy='d_star_lite', replanner=replanner)
+        # ...something crashes, and graph is updated to what it looks like now
+        results = graph.take_shortest_path_to(desired, strategy='d_star_lite', replanner=replanner)
+
+    Attributes:
+        heuristic (Callable[[StateGraph, StateGraph], int]): guesses how many transitions there are from a start
+            to a state the search has found (default: None, the desired graph class's `heuristic`)
+        km (int): how far the start has moved since the priorities in the frontier were worked out
+        g (Dict[Tuple, int]): fingerprint -> transitions to the desired state, for the states we've expanded
+        rhs (Dict[Tuple, int]): fingerprint -> fewest transitions to the desired state found so far, for states
+            we haven't expanded yet
+        goes_to (Dict[Tuple, Tuple]): fingerprint -> (next fingerprint, transition) on a shortest way there
+        searches (int): plans we were asked for
+        restarts (int): how many of them started the search over
+    """
+
+    def __init__(self, heuristic=None):
+        self.heuristic = heuristic
+        self.searches = 0
+        self.restarts = 0
+        self.reset()
+
+    def reset(self):
+        """Throws the search away, the next plan starts it over"""
+        self.km = 0
+        self.g = {}
+        self.rhs = {}
+        self.goes_to = {}
+        self._context = None
+        self._interned = {}  # node class -> pairs its StateInterner had when the search started
+        self._heuristic = None
+        self._start = None
+        self._open = {}  # fingerprint -> (state graph, its entry in the frontier)
+        self._frontier = []  # (priority, push order, fingerprint), ties going to the most recently pushed
+        self._pushes = itertools.count()
+
+    def plan(self, current_state_graph, desired_state_graph, max_iterations=1000000, stats=None):
+        """Finds a shortest plan from current_state_graph, reusing what earlier plans found
+
+        Args:
+            current_state_graph (StateGraph): where we are
+            desired_state_graph (StateGraph): where we want to be, which can't be a `Goal`
+            max_iterations (int): maximum number of states to expand this time around
+            stats (SearchStats): counts and times what the search does, see `stateman.stats` (default: None)
+
+        Returns:
+            List[Tuple[str, Tuple, Tuple]]: list of (node_path, from_state, to_state) transitions to make
+        """
+        if isinstance(desired_state_graph, Goal):
+            raise ValueError("Searching backward needs a whole desired state graph to start from, not a Goal")
+
+        self.searches += 1
+        start = current_state_graph.snapshot()
+        start.state_vector()  # interns whatever values the start has
+        context = (desired_state_graph.__class__, desired_state_graph.fingerprint(), get_registry_version())
+        if context != self._context or any(
+            len(global_state_interners[node_cls].pairs) != interned for node_cls, interned in self._interned.items()
+        ):
+            self._restart(context, start, desired_state_graph)
+
+        self._move_to(start)
+        start_key = self._start.fingerprint()
+
+        iterations = 0
+        while start_key not in self.g:
+            if not self._frontier:
+                return []
+
+            entry = self._frontier[0]
+            old_priority, _, key = entry
+            if self._open.get(key, (None, None))[1] is not entry:
+                heapq.heappop(self._frontier)
+                continue
+
+            # it was put in for where we started before, see if that still holds
+            state_graph = self._open[key][0]
+            priority = self._priority(key, state_graph)
+            if old_priority < priority:
+                heapq.heappop(self._frontier)
+                self._push(key, state_graph, priority)
+                continue
+
+            # there's no getting to anything left from where we are
+            if priority[0] == float('inf'):
+                return []
+
+            iterations += 1
+            if iterations == max_iterations:
+                raise Exception(f"Reached maximum number of iterations when exploring states: {max_iterations}")
+
+            heapq.heappop(self._frontier)
+            del self._open[key]
+            self.g[key] = self.rhs.pop(key)
+            cost = self.g[key] + 1
+            for transition, predecessors in state_graph.get_transitions_and_predecessors().items():
+                for predecessor in predecessors:
+                    predecessor_key = predecessor.fingerprint()
+                    if predecessor_key in self.g or self.rhs.get(predecessor_key, cost + 1) <= cost:
+                        if stats is not None:
+                            stats.duplicates += 1
+                        continue
+
+                    self.rhs[predecessor_key] = cost
+                    self.goes_to[predecessor_key] = (key, transition)
+                    self._push(predecessor_key, predecessor)
+
+            if stats is not None:
+                stats.frontier(len(self._frontier))
+
+        transitions = []
+        key = start_key
+        while self.goes_to[key] is not None:
+            key, transition = self.goes_to[key]
+            transitions.append(transition)
+
+        return transitions
+
+    def _restart(self, context, start, desired_state_graph):
+        if self._context is not None:
+            self.restarts += 1
+        self.reset()
+        self._context = context
+        node_classes = {
+            state_graph.nodes[node_path].__class__
+            for state_graph in (start, desired_state_graph) for node_path in state_graph.node_order()
+        }
+        for node_cls in node_classes:
+            get_transition_table(node_cls)
+        self._interned = {node_cls: len(global_state_interners[node_cls].pairs) for node_cls in node_classes}
+
+        # searches that outlive where they started can't leave out transitions that don't help from there
+        goal = copy.copy(desired_state_graph.snapshot())
+        goal._relevant_transitions = None
+        self._heuristic = self.heuristic or goal.heuristic
+        goal_key = goal.fingerprint()
+        self.rhs[goal_key] = 0
+        self.goes_to[goal_key] = None
+        self._open[goal_key] = (goal, None)
+
+    def _move_to(self, start):
+        previous, self._start = self._start, start
+        if previous is None:
+            for key, (state_graph, _) in list(self._open.items()):
+                self._push(key, state_graph)
+            return
+
+        if previous.fingerprint() == start.fingerprint():
+            return
+
+        # the old priorities are still lower bounds give or take how far we moved. if there's no saying how far,
+        # they all get worked out again
+        moved = self._heuristic(previous, start)
+        if moved != float('inf'):
+            self.km += moved
+            return
+
+        self.km = 0
+        self._frontier = []
+        for key, (state_graph, _) in list(self._open.items()):
+            self._push(key, state_graph)
+
+    def _priority(self, key, state_graph):
+        # fewest transitions there could be from the start to the desired state through here, then the ones left
+        return self.rhs[key] + self._heuristic(self._start, state_graph) + self.km, self.rhs[key]
+
+    def _push(self, key, state_graph, priority=None):
+        if priority is None:
+            priority = self._priority(key, state_graph)
+        entry = (priority, -next(self._pushes), key)
+        self._open[key] = (state_graph, entry)
+        heapq.heappush(self._frontier, entry)
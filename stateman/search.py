@@ -0,0 +1,847 @@
+import heapq
+import itertools
+import time
+
+from stateman.goal import Goal
+from stateman.parallel import ExpansionPool
+from stateman.progress import Progress
+from stateman.replan import Replanner
+from stateman.stats import measured
+from stateman.utils import get_transition_table
+
+
+class PriorityItem(object):
+    def __init__(self, priority=0, item=None, order=0):
+        self.priority = priority
+        self.item = item
+        self.order = order
+
+    def __lt__(self, other):
+        return (self.priority, self.order) < (other.priority, other.order)
+
+
+@measured
+def _a_star_valid_state_transitions(
+        current_state_graph,
+        desired_state_graph,
+        max_iterations=1000000,
+        heuristic=None,
+        check_heuristic=False,
+        lazy=False,
+        stats=None
+):
+    """This function uses an A* graph search algorithm to find the minimal set of transitions to a particular
+    state
+
+    shamelessly copied from: https://www.redblobgames.com/pathfinding/a-star/implementation.html#python-astar
+
+    Args:
+        current_state_graph (StateGraph): where we are
+        desired_state (StateGraph): where we want to be
+        max_iterations (int): maximum iterations through the graph to try
+        heuristic (Callable[[StateGraph, StateGraph], int]): guesses how many transitions are left, see
+            `stateman.heuristics` (default: the graph class's `heuristic`)
+        check_heuristic (bool): assert that the heuristic is admissible and consistent as we go (default: False)
+        lazy (bool): push neighbors without validating them, and only validate states as they're popped. Most
+            neighbors never are, so with lots of transitions out of each state this saves most validations.
+            Every neighbor counts as generated in the stats, valid or not (default: False)
+        stats (SearchStats): counts and times what the search does, see `stateman.stats` (default: None)
+
+    Yields:
+        List[Tuple[str, Tuple[str, str]]: list of (node_path, (..transition_to_make..))
+    """
+    if heuristic is None:
+        heuristic = current_state_graph.heuristic
+    current_state_graph = current_state_graph.snapshot()
+    desired_state_graph = desired_state_graph.snapshot()
+    progress = Progress(current_state_graph, desired_state_graph, heuristic)
+    current_state_graph = progress.start(current_state_graph)
+
+    frontier = []  # priority queue of (priority, state) tuples
+    pushes = itertools.count()  # ties go to the most recently pushed state
+    start_key = current_state_graph.fingerprint()
+    heapq.heappush(frontier, PriorityItem(0, (0, start_key, current_state_graph), -next(pushes)))
+
+    # both of these are keyed by fingerprint, so the same state reached by a different order of
+    # transitions is recognized as the same state and isn't explored all over again
+    came_from = {}
+    cost_so_far = {}
+    came_from[start_key] = None
+    cost_so_far[start_key] = 0
+    estimates = {start_key: progress.estimate(current_state_graph)}
+    # state -> whether it's valid, for states pushed without checking
+    valid = {start_key: True}
+
+    iterations = 0
+    while len(frontier) > 0:
+        cost, current_key, current = heapq.heappop(frontier).item
+
+        # we already found a cheaper way here, so this entry is stale
+        if cost > cost_so_far[current_key]:
+            continue
+
+        if lazy:
+            if current_key not in valid:
+                valid[current_key] = current.is_valid()
+            if not valid[current_key]:
+                continue
+
+        iterations += 1
+        if iterations == max_iterations:
+            raise Exception(f"Reached maximum number of iterations when exploring states: {max_iterations}")
+
+        # if we reached our goal, leggo
+        if progress.is_goal(current):
+            last_key = current_key
+            transitions = []
+            while came_from[last_key] is not None:
+                if check_heuristic:
+                    assert estimates[last_key] <= len(transitions), \
+                        f"Heuristic isn't admissible: guessed {estimates[last_key]} transitions, {len(transitions)} were needed"
+                prev_key, transition = came_from[last_key]
+                last_key = prev_key
+                transitions.append(transition)
+
+            return list(reversed(transitions))
+
+        # keep doing the a-star dance
+        if lazy:
+            if stats is not None:
+                stats.expanding(current)
+            neighbors = current.iter_transitions_and_neighbors(validate=False)
+        else:
+            neighbors = current.get_transitions_and_neighbors().items()
+
+        for transition, neighbor in neighbors:
+            if lazy and stats is not None:
+                stats.generating(transition, neighbor)
+
+            neighbor_key = neighbor.fingerprint()
+            new_cost = cost_so_far[current_key] + 1
+            if neighbor_key not in estimates:
+                estimates[neighbor_key] = progress.estimate(neighbor)
+            if check_heuristic:
+                assert estimates[current_key] <= 1 + estimates[neighbor_key], \
+                    f"Heuristic isn't consistent: guessed {estimates[current_key]} before {transition} " \
+                    f"and {estimates[neighbor_key]} after"
+
+            # there's no getting to the desired state from here
+            if estimates[neighbor_key] == float('inf'):
+                continue
+
+            if neighbor_key not in cost_so_far or new_cost < cost_so_far[neighbor_key]:
+                cost_so_far[neighbor_key] = new_cost
+                priority = new_cost + estimates[neighbor_key]
+                heapq.heappush(frontier, PriorityItem(priority, (new_cost, neighbor_key, neighbor), -next(pushes)))
+                came_from[neighbor_key] = (current_key, transition)
+            elif stats is not None:
+                stats.duplicates += 1
+
+        if stats is not None:
+            stats.frontier(len(frontier))
+
+    return []
+
+
+@measured
+def _bidirectional_valid_state_transitions(
+        current_state_graph,
+        desired_state_graph,
+        max_iterations=1000000
+):
+    """Searches forward from where we are and backward from where we want to be at the same time, until the two
+    searches meet in the middle. Going backwards runs the registered transitions in reverse, see
+    `StateGraph.get_transitions_and_predecessors`. Both sides go a whole layer at a time, always growing the
+    smaller one, so the first layer they meet in has a shortest path through it
+
+    Args:
+        current_state_graph (StateGraph): where we are
+        desired_state (StateGraph): where we want to be, which can't be a `Goal`
+        max_iterations (int): maximum number of states to expand, from both sides put together
+
+    Returns:
+        List[Tuple[str, Tuple, Tuple]]: list of (node_path, from_state, to_state) transitions to make
+    """
+    if isinstance(desired_state_graph, Goal):
+        raise ValueError("Searching backward needs a whole desired state graph to start from, not a Goal")
+
+    current_state_graph = current_state_graph.snapshot()
+    desired_state_graph = desired_state_graph.snapshot()
+    # before going backward, so the start's values are among those tried for what transitions overwrote
+    start_key = current_state_graph.fingerprint()
+    desired_key = desired_state_graph.fingerprint()
+    if start_key == desired_key:
+        return []
+
+    # key -> (cost, (previous key, transition)) going forward, and (cost, (next key, transition)) going backward
+    came_from = {start_key: (0, None)}
+    goes_to = {desired_key: (0, None)}
+    forward_layer = [(start_key, current_state_graph)]
+    backward_layer = [(desired_key, desired_state_graph)]
+
+    iterations = 0
+    while forward_layer and backward_layer:
+        forward = len(forward_layer) <= len(backward_layer)
+        if forward:
+            layer, seen, other_seen = forward_layer, came_from, goes_to
+        else:
+            layer, seen, other_seen = backward_layer, goes_to, came_from
+
+        next_layer = []
+        meetings = []
+        for key, state_graph in layer:
+            iterations += 1
+            if iterations == max_iterations:
+                raise Exception(f"Reached maximum number of iterations when exploring states: {max_iterations}")
+
+            cost = seen[key][0] + 1
+            if forward:
+                steps = [
+                    (transition, neighbor)
+                    for transition, neighbor in state_graph.get_transitions_and_neighbors().items()
+                ]
+            else:
+                steps = [
+                    (transition, predecessor)
+                    for transition, predecessors in state_graph.get_transitions_and_predecessors().items()
+                    for predecessor in predecessors
+                ]
+
+            for transition, new_graph in steps:
+                new_key = new_graph.fingerprint()
+                if new_key in seen:
+                    continue
+
+                seen[new_key] = (cost, (key, transition))
+                next_layer.append((new_key, new_graph))
+                if new_key in other_seen:
+                    meetings.append(new_key)
+
+        if meetings:
+            meeting_key = min(meetings, key=lambda key: came_from[key][0] + goes_to[key][0])
+            transitions = []
+            key = meeting_key
+            while came_from[key][1] is not None:
+                key, transition = came_from[key][1]
+                transitions.append(transition)
+            transitions.reverse()
+
+            key = meeting_key
+            while goes_to[key][1] is not None:
+                key, transition = goes_to[key][1]
+                transitions.append(transition)
+
+            return transitions
+
+        if forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    return []
+
+
+def _decomposed_valid_state_transitions(current_state_graph, desired_state_graph, search, **search_options):
+    """Splits the graphs into `StateGraph.independent_clusters`, searches each cluster on its own and strings their
+    plans together. The cost of searching goes from the product of the clusters' state spaces to their sum.
+
+    A graph is only valid when all of its clusters are, so while one cluster is invalid no other cluster can make a
+    move. That cluster has to get its plan done first, and if more than one of them starts out invalid, they can't
+    be planned apart and the whole graph is searched instead
+
+    Args:
+        current_state_graph (StateGraph): where we are
+        desired_state (StateGraph): where we want to be
+        search (Callable): one of `search_strategies`, to run on each cluster
+        search_options: passed along to search
+
+    Returns:
+        List[Tuple[str, Tuple, Tuple]]: list of (node_path, from_state, to_state) transitions to make
+    """
+    clusters = current_state_graph.independent_clusters()
+    if len(clusters) == 1:
+        return search(current_state_graph, desired_state_graph, **search_options)
+
+    valid_clusters = []
+    invalid_clusters = []
+    for cluster in clusters:
+        current_cluster = current_state_graph.subgraph(cluster)
+        desired_cluster = desired_state_graph.subgraph(cluster)
+        if current_cluster.is_valid():
+            valid_clusters.append((current_cluster, desired_cluster))
+        else:
+            invalid_clusters.append((current_cluster, desired_cluster))
+
+    if len(invalid_clusters) > 1 or any(
+            desired_cluster.is_satisfied_by(current_cluster)
+            for current_cluster, desired_cluster in invalid_clusters
+    ):
+        return search(current_state_graph, desired_state_graph, **search_options)
+
+    transitions = []
+    for current_cluster, desired_cluster in invalid_clusters + valid_clusters:
+        if desired_cluster.is_satisfied_by(current_cluster):
+            continue
+
+        cluster_transitions = search(current_cluster, desired_cluster, **search_options)
+        if not cluster_transitions:
+            # one cluster can't get there, so the graph as a whole can't either
+            return []
+        transitions.extend(cluster_transitions)
+
+    return transitions
+
+
+@measured
+def _ida_star_valid_state_transitions(
+        current_state_graph,
+        desired_state_graph,
+        max_iterations=1000000,
+        heuristic=None
+):
+    """Iterative-deepening A*: depth-first searches that give up on any state whose cost so far plus heuristic goes
+    over a threshold, raising the threshold to the smallest estimate that went over it until the desired state turns
+    up. Only the path being looked at is kept around, so memory goes with the length of the plan rather than the
+    number of states, at the price of expanding states again every round
+
+    Args:
+        current_state_graph (StateGraph): where we are
+        desired_state (StateGraph): where we want to be
+        max_iterations (int): maximum number of states to expand, over all rounds put together
+        heuristic (Callable[[StateGraph, StateGraph], int]): guesses how many transitions are left, see
+            `stateman.heuristics` (default: the graph class's `heuristic`)
+
+    Returns:
+        List[Tuple[str, Tuple, Tuple]]: list of (node_path, from_state, to_state) transitions to make
+    """
+    if heuristic is None:
+        heuristic = current_state_graph.heuristic
+    current_state_graph = current_state_graph.snapshot()
+    desired_state_graph = desired_state_graph.snapshot()
+    progress = Progress(current_state_graph, desired_state_graph, heuristic)
+    current_state_graph = progress.start(current_state_graph)
+    start_key = current_state_graph.fingerprint()
+    if progress.is_goal(current_state_graph):
+        return []
+
+    iterations = 0
+
+    def expand(state_graph, cost):
+        """Neighbors worth looking at, most promising first"""
+        nonlocal iterations
+        iterations += 1
+        if iterations == max_iterations:
+            raise Exception(f"Reached maximum number of iterations when exploring states: {max_iterations}")
+
+        children = [
+            (cost + 1 + progress.estimate(neighbor), transition, neighbor)
+            for transition, neighbor in state_graph.get_transitions_and_neighbors().items()
+        ]
+        children.sort(key=lambda child: child[0])
+        return iter(children)
+
+    threshold = progress.estimate(current_state_graph)
+    while threshold != float('inf'):
+        next_threshold = float('inf')
+        transitions = []
+        path_keys = [start_key]
+        on_path = {start_key}  # so we don't go around in circles
+        frames = [expand(current_state_graph, 0)]
+
+        while frames:
+            child = next(frames[-1], None)
+            if child is None:
+                # nothing left to try from here, back up
+                frames.pop()
+                on_path.discard(path_keys.pop())
+                if transitions:
+                    transitions.pop()
+                continue
+
+            estimate, transition, neighbor = child
+            if estimate > threshold:
+                next_threshold = min(next_threshold, estimate)
+                continue
+
+            neighbor_key = neighbor.fingerprint()
+            if neighbor_key in on_path:
+                continue
+
+            transitions.append(transition)
+            if progress.is_goal(neighbor):
+                return transitions
+
+            path_keys.append(neighbor_key)
+            on_path.add(neighbor_key)
+            frames.append(expand(neighbor, len(transitions)))
+
+        threshold = next_threshold
+
+    return []
+
+
+class _SearchTreeNode(object):
+    """A state kept in memory by `_sma_star_valid_state_transitions`
+
+    Attributes:
+        key (Tuple): fingerprint of the state
+        state_graph (StateGraph): the state
+        parent (_SearchTreeNode): the state we got here from
+        transition (Tuple[str, Tuple, Tuple]): how we got here from parent
+        cost (int): transitions taken to get here
+        estimate (float): lower bound on the cost of a plan through here, backed up from the children
+        children (List[_SearchTreeNode]): children still in memory
+        forgotten (float): lowest estimate of the children we had to forget
+        version (int): bumped whenever the estimate changes, which makes old heap entries stale
+        in_open (bool): if we're a leaf waiting to be expanded
+    """
+
+    def __init__(self, key, state_graph, parent=None, transition=None, estimate=0):
+        self.key = key
+        self.state_graph = state_graph
+        self.parent = parent
+        self.transition = transition
+        self.cost = parent.cost + 1 if parent is not None else 0
+        self.estimate = estimate
+        self.children = []
+        self.forgotten = float('inf')
+        self.version = 0
+        self.in_open = False
+
+
+@measured
+def _sma_star_valid_state_transitions(
+        current_state_graph,
+        desired_state_graph,
+        max_iterations=1000000,
+        heuristic=None,
+        max_states=100000
+):
+    """Simplified memory-bounded A*. It works like A*, but once it has `max_states` states in memory, it forgets
+    the leaf that looks worst (highest estimate, shallowest), and its parent remembers the best estimate it forgot.
+    If everything else ends up looking worse than that, the parent gets expanded again. It finds a shortest plan
+    as long as one fits in memory, that is, has fewer than `max_states` transitions
+
+    Args:
+        current_state_graph (StateGraph): where we are
+        desired_state (StateGraph): where we want to be
+        max_iterations (int): maximum number of states to expand
+        heuristic (Callable[[StateGraph, StateGraph], int]): guesses how many transitions are left, see
+            `stateman.heuristics` (default: the graph class's `heuristic`)
+        max_states (int): most states to keep in memory at once, at least 2
+
+    Returns:
+        List[Tuple[str, Tuple, Tuple]]: list of (node_path, from_state, to_state) transitions to make
+    """
+    assert max_states >= 2
+    if heuristic is None:
+        heuristic = current_state_graph.heuristic
+    current_state_graph = current_state_graph.snapshot()
+    desired_state_graph = desired_state_graph.snapshot()
+    progress = Progress(current_state_graph, desired_state_graph, heuristic)
+    current_state_graph = progress.start(current_state_graph)
+
+    # leaves to expand, best first, and leaves to forget, worst first. entries go stale when the version changes
+    best_leaves = []
+    worst_leaves = []
+    pushes = itertools.count()
+
+    def open_leaf(node):
+        node.version += 1
+        node.in_open = True
+        heapq.heappush(best_leaves, PriorityItem((node.estimate, -node.cost), (node, node.version), -next(pushes)))
+        heapq.heappush(worst_leaves, PriorityItem((-node.estimate, node.cost), (node, node.version), next(pushes)))
+
+    def pop_leaf(leaves):
+        while leaves:
+            node, version = heapq.heappop(leaves).item
+            if node.in_open and node.version == version:
+                node.in_open = False
+                return node
+        return None
+
+    def back_up(node):
+        """Estimates of a state are as good as the best of its children's, which can raise our ancestors' too"""
+        while node is not None:
+            estimate = min([child.estimate for child in node.children] + [node.forgotten])
+            if estimate == node.estimate:
+                return
+            node.estimate = estimate
+            if node.in_open:
+                open_leaf(node)
+            node = node.parent
+
+    root = _SearchTreeNode(
+        current_state_graph.fingerprint(), current_state_graph,
+        estimate=progress.estimate(current_state_graph)
+    )
+    open_leaf(root)
+    in_memory = 1
+
+    iterations = 0
+    while True:
+        best = pop_leaf(best_leaves)
+        if best is None or best.estimate == float('inf'):
+            return []
+
+        if progress.is_goal(best.state_graph):
+            transitions = []
+            while best.parent is not None:
+                transitions.append(best.transition)
+                best = best.parent
+            return list(reversed(transitions))
+
+        iterations += 1
+        if iterations == max_iterations:
+            raise Exception(f"Reached maximum number of iterations when exploring states: {max_iterations}")
+
+        # whatever was forgotten below here is about to be generated again
+        best.forgotten = float('inf')
+        path_keys = set()
+        ancestor = best
+        while ancestor is not None:
+            path_keys.add(ancestor.key)
+            ancestor = ancestor.parent
+
+        for transition, neighbor in best.state_graph.get_transitions_and_neighbors().items():
+            neighbor_key = neighbor.fingerprint()
+            if neighbor_key in path_keys:
+                continue
+
+            child = _SearchTreeNode(neighbor_key, neighbor, best, transition)
+            if child.cost >= max_states - 1 and not progress.is_goal(neighbor):
+                # a plan through here would need more memory than we have
+                child.estimate = float('inf')
+            else:
+                # an estimate can't be better than its parent's, which keeps them from going down along a path
+                child.estimate = max(best.estimate, child.cost + progress.estimate(neighbor))
+            best.children.append(child)
+            open_leaf(child)
+            in_memory += 1
+
+        back_up(best)
+        if not best.children:
+            # dead end, which is left for forgetting
+            open_leaf(best)
+
+        while in_memory > max_states:
+            worst = pop_leaf(worst_leaves)
+            parent = worst.parent
+            parent.children.remove(worst)
+            parent.forgotten = min(parent.forgotten, worst.estimate)
+            in_memory -= 1
+            back_up(parent)
+            if not parent.children:
+                # it's a leaf again, and can be expanded again once it looks like the way to go
+                open_leaf(parent)
+
+
+@measured
+def _anytime_valid_state_transitions(
+        current_state_graph,
+        desired_state_graph,
+        max_iterations=1000000,
+        heuristic=None,
+        weight=5,
+        time_budget=None,
+        report=None,
+        stats=None
+):
+    """Anytime weighted A*. Trusting the heuristic `weight` times more than A* does finds some plan quickly, and
+    the search keeps going after that, only looking at states that could still lead to a shorter plan. Once
+    the budget runs out we go with the shortest plan found so far instead of giving up. If the search runs to
+    the end, that plan is a shortest one
+
+    The shortest plan can't be shorter than the lowest cost-so-far plus heuristic of the states left to look at,
+    so the plan we return is at most `bound` times longer than a shortest one
+
+    Args:
+        current_state_graph (StateGraph): where we are
+        desired_state (StateGraph): where we want to be
+        max_iterations (int): maximum number of states to expand
+        heuristic (Callable[[StateGraph, StateGraph], int]): guesses how many transitions are left, see
+            `stateman.heuristics` (default: the graph class's `heuristic`)
+        weight (float): how much more to trust the heuristic than the cost so far, at least 1 (default: 5)
+        time_budget (float): seconds to spend improving the plan, raising if there isn't one by then (default:
+            None, as long as it takes)
+        report (Dict): if given, gets filled in with the plan's 'cost', its suboptimality 'bound', whether
+            it's 'optimal', how many 'solutions' were found along the way, 'iterations' and 'elapsed' seconds
+        stats (SearchStats): counts and times what the search does, see `stateman.stats` (default: None)
+
+    Returns:
+        List[Tuple[str, Tuple, Tuple]]: list of (node_path, from_state, to_state) transitions to make
+    """
+    assert weight >= 1
+    if heuristic is None:
+        heuristic = current_state_graph.heuristic
+    started = time.monotonic()
+    current_state_graph = current_state_graph.snapshot()
+    desired_state_graph = desired_state_graph.snapshot()
+    progress = Progress(current_state_graph, desired_state_graph, heuristic)
+    current_state_graph = progress.start(current_state_graph)
+    start_key = current_state_graph.fingerprint()
+
+    came_from = {start_key: None}
+    cost_so_far = {start_key: 0}
+    estimates = {start_key: progress.estimate(current_state_graph)}
+    frontier = []
+    pushes = itertools.count()
+    start_priority = weight * estimates[start_key]
+    heapq.heappush(frontier, PriorityItem(start_priority, (0, start_key, current_state_graph), -next(pushes)))
+
+    def plan_to(key):
+        transitions = []
+        while came_from[key] is not None:
+            key, transition = came_from[key]
+            transitions.append(transition)
+        return list(reversed(transitions))
+
+    already_there = progress.is_goal(current_state_graph)
+    best_plan = [] if already_there else None
+    best_cost = 0 if already_there else float('inf')
+    solutions = 1 if best_plan is not None else 0
+    iterations = 0
+    finished = True
+    while frontier:
+        cost, current_key, current = frontier[0].item
+        if cost > cost_so_far[current_key] or cost + estimates[current_key] >= best_cost:
+            # stale, or can't lead to a shorter plan than the one we have
+            heapq.heappop(frontier)
+            continue
+
+        out_of_time = time_budget is not None and time.monotonic() - started > time_budget
+        if iterations == max_iterations or out_of_time:
+            if best_plan is None and out_of_time:
+                raise Exception(f"Ran out of time budget before finding any plan: {time_budget}s")
+            if best_plan is None:
+                raise Exception(f"Reached maximum number of iterations when exploring states: {max_iterations}")
+            finished = False
+            break
+
+        heapq.heappop(frontier)
+        iterations += 1
+        for transition, neighbor in current.get_transitions_and_neighbors().items():
+            neighbor_key = neighbor.fingerprint()
+            new_cost = cost + 1
+            if neighbor_key in cost_so_far and new_cost >= cost_so_far[neighbor_key]:
+                if stats is not None:
+                    stats.duplicates += 1
+                continue
+            if neighbor_key not in estimates:
+                estimates[neighbor_key] = progress.estimate(neighbor)
+            if new_cost + estimates[neighbor_key] >= best_cost:
+                continue
+
+            cost_so_far[neighbor_key] = new_cost
+            came_from[neighbor_key] = (current_key, transition)
+            if progress.is_goal(neighbor):
+                # a better plan! states that can't beat it get skipped from now on
+                best_plan = plan_to(neighbor_key)
+                best_cost = new_cost
+                solutions += 1
+                continue
+
+            priority = new_cost + weight * estimates[neighbor_key]
+            heapq.heappush(frontier, PriorityItem(priority, (new_cost, neighbor_key, neighbor), -next(pushes)))
+
+        if stats is not None:
+            stats.frontier(len(frontier))
+
+    if best_plan is None:
+        best_plan = []
+
+    lower_bound = best_cost
+    if not finished:
+        lower_bound = min(
+            [best_cost] + [
+                cost + estimates[key]
+                for cost, key, _ in (entry.item for entry in frontier)
+                if cost == cost_so_far[key]
+            ]
+        )
+
+    if report is not None:
+        report.update({
+            'cost': len(best_plan) if solutions else float('inf'),
+            'bound': 1.0 if lower_bound == best_cost else best_cost / lower_bound if lower_bound else float('inf'),
+            'optimal': lower_bound == best_cost,
+            'solutions': solutions,
+            'iterations': iterations,
+            'elapsed': time.monotonic() - started,
+        })
+
+    return best_plan
+
+
+@measured
+def _parallel_a_star_valid_state_transitions(
+        current_state_graph,
+        desired_state_graph,
+        max_iterations=1000000,
+        heuristic=None,
+        processes=None,
+        batch_size=None,
+        mp_context=None,
+        stats=None
+):
+    """A* that takes the best `batch_size` states off the frontier at a time, and has an `ExpansionPool` of
+    worker processes find the transitions out of them in parallel. Neighbors come back as transitions, so only
+    the heuristic and the bookkeeping are left to this process. A state expanded along with a cheaper way to
+    reach it is expanded again once that's found, and the goal is only taken once every state ahead of it has
+    been expanded, so plans are as short as `a_star`'s
+
+    Worth it when validations are expensive: sending states back and forth costs more than cheap ones do
+
+    Args:
+        current_state_graph (StateGraph): where we are
+        desired_state (StateGraph): where we want to be
+        max_iterations (int): maximum number of states to expand
+        heuristic (Callable[[StateGraph, StateGraph], int]): guesses how many transitions are left, see
+            `stateman.heuristics` (default: the graph class's `heuristic`)
+        processes (int): number of worker processes (default: None, one per CPU)
+        batch_size (int): most states to expand at a time (default: None, 4 per worker process)
+        mp_context (str): multiprocessing start method. Unless it's 'fork', every class, transition and validation
+            involved has to be importable, see `stateman.utils.export_registry` (default: None, the platform's)
+        stats (SearchStats): counts and times what the search does, see `stateman.stats` (default: None)
+
+    Returns:
+        List[Tuple[str, Tuple, Tuple]]: list of (node_path, from_state, to_state) transitions to make
+    """
+    if heuristic is None:
+        heuristic = current_state_graph.heuristic
+    current_state_graph = current_state_graph.snapshot()
+    desired_state_graph = desired_state_graph.snapshot()
+    progress = Progress(current_state_graph, desired_state_graph, heuristic)
+    current_state_graph = progress.start(current_state_graph)
+
+    frontier = []
+    pushes = itertools.count()
+    start_key = current_state_graph.fingerprint()
+    heapq.heappush(frontier, PriorityItem(0, (0, start_key, current_state_graph), -next(pushes)))
+
+    came_from = {start_key: None}
+    cost_so_far = {start_key: 0}
+    estimates = {start_key: progress.estimate(current_state_graph)}
+    node_positions = current_state_graph._node_layout()[1]
+
+    def plan_to(key):
+        transitions = []
+        while came_from[key] is not None:
+            key, transition = came_from[key]
+            transitions.append(transition)
+
+        return list(reversed(transitions))
+
+    iterations = 0
+    with ExpansionPool(current_state_graph, processes, mp_context) as pool:
+        batch_size = batch_size or 4 * pool.processes
+        while len(frontier) > 0:
+            batch = []
+            while frontier and len(batch) < batch_size:
+                entry = heapq.heappop(frontier)
+                cost, current_key, current = entry.item
+                if cost > cost_so_far[current_key]:
+                    continue
+
+                if progress.is_goal(current):
+                    if not batch:
+                        return plan_to(current_key)
+
+                    # the states ahead of it might still lead somewhere cheaper, so it waits for the next batch
+                    heapq.heappush(frontier, entry)
+                    break
+
+                batch.append(entry.item)
+
+            if not batch:
+                break
+
+            iterations += len(batch)
+            if iterations >= max_iterations:
+                raise Exception(f"Reached maximum number of iterations when exploring states: {max_iterations}")
+
+            started = time.perf_counter()
+            batch_transitions = pool.expand([current for _, _, current in batch])
+            if stats is not None:
+                stats.neighbor_time += time.perf_counter() - started
+
+            for (cost, current_key, current), transitions in zip(batch, batch_transitions):
+                if stats is not None:
+                    stats.expanding(current)
+
+                state_vector = current.state_vector()
+                for transition in transitions:
+                    node_path, _, to_state = transition
+                    node_cls = current.nodes[node_path].__class__
+                    neighbor_mask = get_transition_table(node_cls).apply(
+                        state_vector[node_positions[node_path]], dict(to_state)
+                    )
+                    neighbor = current._with_node_state(node_path, node_cls, neighbor_mask)
+                    if stats is not None:
+                        stats.generating(transition, neighbor)
+
+                    neighbor_key = neighbor.fingerprint()
+                    new_cost = cost + 1
+                    if neighbor_key not in estimates:
+                        estimates[neighbor_key] = progress.estimate(neighbor)
+                    if estimates[neighbor_key] == float('inf'):
+                        continue
+
+                    if neighbor_key not in cost_so_far or new_cost < cost_so_far[neighbor_key]:
+                        cost_so_far[neighbor_key] = new_cost
+                        priority = new_cost + estimates[neighbor_key]
+                        heapq.heappush(
+                            frontier, PriorityItem(priority, (new_cost, neighbor_key, neighbor), -next(pushes))
+                        )
+                        came_from[neighbor_key] = (current_key, transition)
+                    elif stats is not None:
+                        stats.duplicates += 1
+
+            if stats is not None:
+                stats.frontier(len(frontier))
+
+    return []
+
+
+@measured
+def _d_star_lite_valid_state_transitions(
+        current_state_graph,
+        desired_state_graph,
+        replanner=None,
+        max_iterations=1000000,
+        stats=None
+):
+    """Searches backward from where we want to be, keeping the search in a `stateman.replan.Replanner` so the
+    next reconciliation towards the same place picks up where this one left off, whatever state we've ended up
+    in by then. On its own it's a backward A*
+
+    Args:
+        current_state_graph (StateGraph): where we are
+        desired_state (StateGraph): where we want to be, which can't be a `Goal`
+        replanner (Replanner): keeps the search between calls, and says which heuristic it uses (default: None, a
+            new one just for this search)
+        max_iterations (int): maximum number of states to expand
+        stats (SearchStats): counts and times what the search does, see `stateman.stats` (default: None)
+
+    Returns:
+        List[Tuple[str, Tuple, Tuple]]: list of (node_path, from_state, to_state) transitions to make
+    """
+    if replanner is None:
+        replanner = Replanner()
+
+    return replanner.plan(current_state_graph, desired_state_graph, max_iterations, stats)
+
+
+# names `StateGraph.take_shortest_path_to` knows its search strategies by
+search_strategies = {
+    'a_star': _a_star_valid_state_transitions,
+    'bidirectional': _bidirectional_valid_state_transitions,
+    'ida_star': _ida_star_valid_state_transitions,
+    'sma_star': _sma_star_valid_state_transitions,
+    'anytime': _anytime_valid_state_transitions,
+    'parallel_a_star': _parallel_a_star_valid_state_transitions,
+    'd_star_lite': _d_star_lite_valid_state_transitions,
+}
+
+# strategies that search every transition, whatever `StateGraph.relevant_transitions` leaves out
+unpruned_search_strategies = {_d_star_lite_valid_state_transitions}
@@ -0,0 +1,190 @@
+import contextvars
+import inspect
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+
+# stats of the search running right now, which code deep down in expanding states reports to
+current_search_stats = contextvars.ContextVar('current_search_stats', default=None)
+
+
+class SearchStats(object):
+    """Counters and timings of searches run with it, plus hooks for following along. Pass one as `stats` to
+    `StateGraph.take_shortest_path_to` or to any of `stateman.search.search_strategies`. The same stats can
+    be passed to several searches, which adds them up
+
+    Attributes:
+        expanded (int): states whose neighbors were generated
+        generated (int): neighbors generated, only counting valid ones unless the search validates them lazily
+        duplicates (int): neighbors skipped because the search had already reached them at least as cheaply
+            (for searches that keep track)
+        peak_frontier (int): most states waiting to be expanded at once (for searches that keep track)
+        pruned (int): transitions of nodes that `StateGraph.relevant_transitions` left out of searches
+        neighbor_time (float): seconds spent generating neighbors, validations included
+        validation_time (float): seconds spent running validations
+        heuristic_time (float): seconds spent in the heuristic
+        total_time (float): seconds spent searching
+        validations (Dict[Callable, List]): validation function -> [calls, seconds]
+        peak_memory (int): most bytes traced by tracemalloc while searching, if trace_memory
+        on_expand (Callable[[StateGraph], None]): called with each state before it's expanded
+        on_generate (Callable[[Tuple[str, Tuple, Tuple], StateGraph], None]): called with each neighbor
+            generated, and the transition that leads to it
+        on_goal (Callable[[List[Tuple[str, Tuple, Tuple]]], None]): called with the plan each search comes back
+            with, which is empty if there wasn't one
+    """
+
+    def __init__(self, on_expand=None, on_generate=None, on_goal=None, trace_memory=False):
+        """
+        Args:
+            trace_memory (bool): trace allocations while searching to fill in `peak_memory`. This makes
+                searches a lot slower (default: False)
+        """
+        self.on_expand = on_expand
+        self.on_generate = on_generate
+        self.on_goal = on_goal
+        self.trace_memory = trace_memory
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.peak_frontier = 0
+        self.pruned = 0
+        self.neighbor_time = 0.0
+        self.validation_time = 0.0
+        self.heuristic_time = 0.0
+        self.total_time = 0.0
+        self.validations = {}
+        self.peak_memory = 0
+        self._depth = 0
+
+    @contextmanager
+    def measure(self):
+        """Makes this the stats everything reports to while in here. Nesting these only counts time once"""
+        token = current_search_stats.set(self)
+        self._depth += 1
+        outermost = self._depth == 1
+        started_tracing = False
+        if outermost and self.trace_memory:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            if outermost:
+                self.total_time += time.perf_counter() - started
+                if self.trace_memory:
+                    self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+                    if started_tracing:
+                        tracemalloc.stop()
+            self._depth -= 1
+            current_search_stats.reset(token)
+
+    def expanding(self, state_graph):
+        self.expanded += 1
+        if self.on_expand is not None:
+            self.on_expand(state_graph)
+
+    def generating(self, transition, state_graph):
+        self.generated += 1
+        if self.on_generate is not None:
+            self.on_generate(transition, state_graph)
+
+    def frontier(self, size):
+        self.peak_frontier = max(self.peak_frontier, size)
+
+    def timed_heuristic(self, heuristic):
+        """Wraps a heuristic so the time spent in it adds up in `heuristic_time`, along with its `node_term` if it
+        has one, since that's what searches call instead when they keep track of their progress"""
+        @wraps(heuristic)
+        def wrapper(state_graph, desired_state_graph):
+            started = time.perf_counter()
+            try:
+                return heuristic(state_graph, desired_state_graph)
+            finally:
+                self.heuristic_time += time.perf_counter() - started
+
+        node_term = getattr(heuristic, 'node_term', None)
+        if node_term is not None:
+            @wraps(node_term)
+            def node_term_wrapper(target, node_cls, state_mask):
+                started = time.perf_counter()
+                try:
+                    return node_term(target, node_cls, state_mask)
+                finally:
+                    self.heuristic_time += time.perf_counter() - started
+
+            wrapper.node_term = node_term_wrapper
+
+        return wrapper
+
+    def as_dict(self):
+        """Dict: the counters and timings, with validations keyed by their qualified names"""
+        validations = {}
+        for validation_func, (calls, seconds) in self.validations.items():
+            name = getattr(validation_func, '__qualname__', repr(validation_func))
+            previous_calls, previous_seconds = validations.get(name, (0, 0.0))
+            validations[name] = (previous_calls + calls, previous_seconds + seconds)
+
+        return {
+            'expanded': self.expanded,
+            'generated': self.generated,
+            'duplicates': self.duplicates,
+            'peak_frontier': self.peak_frontier,
+            'pruned': self.pruned,
+            'neighbor_time': self.neighbor_time,
+            'validation_time': self.validation_time,
+            'heuristic_time': self.heuristic_time,
+            'total_time': self.total_time,
+            'validations': validations,
+            'peak_memory': self.peak_memory,
+        }
+
+
+def run_validation(validation_func, item):
+    """Runs a validation on item, timing it if a search is keeping stats"""
+    stats = current_search_stats.get()
+    if stats is None:
+        return validation_func(item)
+
+    started = time.perf_counter()
+    try:
+        return validation_func(item)
+    finally:
+        seconds = time.perf_counter() - started
+        stats.validation_time += seconds
+        calls_and_seconds = stats.validations.setdefault(validation_func, [0, 0.0])
+        calls_and_seconds[0] += 1
+        calls_and_seconds[1] += seconds
+
+
+def measured(search):
+    """Lets a search strategy take `stats`: it runs with them in `SearchStats.measure`, gets its heuristic timed,
+    and has `on_goal` called with what it found. Strategies that count things on their own take `stats` too"""
+    signature = inspect.signature(search)
+
+    @wraps(search)
+    def wrapper(current_state_graph, desired_state_graph, *args, stats=None, **search_options):
+        if stats is None:
+            return search(current_state_graph, desired_state_graph, *args, **search_options)
+
+        arguments = signature.bind(current_state_graph, desired_state_graph, *args, **search_options).arguments
+        if 'heuristic' in signature.parameters:
+            heuristic = arguments.get('heuristic') or current_state_graph.heuristic
+            arguments['heuristic'] = stats.timed_heuristic(heuristic)
+        if 'stats' in signature.parameters:
+            arguments['stats'] = stats
+
+        with stats.measure():
+            transitions = search(**arguments)
+
+        if stats.on_goal is not None:
+            stats.on_goal(transitions)
+
+        return transitions
+
+    return wrapper
@@ -1,9 +1,546 @@
-from collections import defaultdict
+import asyncio
+import contextvars
+import importlib
+import inspect
+import itertools
+import threading
+from collections import OrderedDict, defaultdict
 from functools import wraps
 
+from stateman.stats import run_validation
 
-global_transition_functions = defaultdict(lambda: defaultdict(dict))
+
+def _transitions_by_from_state():
+    return defaultdict(dict)
+
+
+def _new_state_interner():
+    return StateInterner()
+
+
+# the factories are module level functions rather than lambdas, so the registries can be pickled
+global_transition_functions = defaultdict(_transitions_by_from_state)
 global_validation_functions = defaultdict(list)
+global_state_interners = defaultdict(_new_state_interner)
+global_transition_tables = {}
+global_registry_version = 0
+
+# event loop coroutines found in synchronous code get handed to, see `run_coroutine`
+current_event_loop = contextvars.ContextVar('current_event_loop', default=None)
+
+
+def run_coroutine(coroutine):
+    """Runs a coroutine to completion from synchronous code, e.g. an async validation in the middle of a search.
+    Inside `run_with_event_loop` it goes to that loop (which must be running on another thread), otherwise it
+    gets a loop of its own
+
+    Args:
+        coroutine (Coroutine): what to run
+
+    Returns:
+        object: whatever the coroutine returned
+    """
+    loop = current_event_loop.get()
+    if loop is None:
+        return asyncio.run(coroutine)
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+def run_with_event_loop(loop, func, *args, **kwargs):
+    """Calls func, sending any coroutines `run_coroutine` comes across to `loop`. Meant for worker threads
+
+    Args:
+        loop (asyncio.AbstractEventLoop): running loop to send coroutines to
+        func (Callable): what to call
+    """
+    token = current_event_loop.set(loop)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        current_event_loop.reset(token)
+
+
+class StateInterner(object):
+    """Hands out a bit for every (key, value) state pair seen for a class, so that a whole state can be
+    packed into one int. Two states are equal when their masks are, and the pairs they share are `a & b`.
+    Values are looked up by what they hold, so lists, dicts and sets of hashable values work like any other value,
+    and `unmask` hands back the first one seen. Searches on different threads share interners, so new pairs get
+    their bits under a lock
+
+    Attributes:
+        pairs (List[Tuple[str, object]]): interned pairs, pair `i` is bit `1 << i`
+        bits (Dict[Tuple[str, Hashable], int]): (key, `_hashable` value) -> bit lookup
+        key_bits (Dict[str, int]): key -> bits of every pair with that key
+    """
+
+    def __init__(self):
+        self.pairs = []
+        self.bits = {}
+        self.key_bits = {}
+        self._lock = threading.Lock()
+
+    def bit(self, key, value):
+        """int: the bit for a (key, value) pair, handing out the next one if it's new. Values have to be hashable,
+        or lists, dicts and sets of values that are"""
+        pair = (key, _hashable(value))
+        try:
+            bit = self.bits.get(pair)
+        except TypeError:
+            raise TypeError(
+                f"State values have to be hashable, or lists, dicts or sets of hashable values: {key}={value!r}"
+            ) from None
+
+        if bit is None:
+            with self._lock:
+                bit = self.bits.get(pair)
+                if bit is None:
+                    # the pair goes in `bits` last, so anyone who finds it there can unmask it
+                    bit = 1 << len(self.pairs)
+                    self.pairs.append((key, value))
+                    self.key_bits[key] = self.key_bits.get(key, 0) | bit
+                    self.bits[pair] = bit
+
+        return bit
+
+    def mask(self, state):
+        """Packs a state into an int
+
+        Args:
+            state (Dict[str, object]): state to pack, see `bit` for what values can be
+
+        Returns:
+            int: with a bit set for each (key, value) pair in state
+        """
+        mask = 0
+        for key, value in state.items():
+            mask |= self.bit(key, value)
+
+        return mask
+
+    def apply(self, mask, changes):
+        """Does to a mask what a transition does to a state: `{**state, **changes}`, dropping None values
+
+        Args:
+            mask (int): state packed by `mask`
+            changes (Dict[str, object]): new values for keys, None to remove a key
+
+        Returns:
+            int: mask of the changed state
+        """
+        for key, value in changes.items():
+            mask &= ~self.key_bits.get(key, 0)
+            if value is not None:
+                mask |= self.bit(key, value)
+
+        return mask
+
+    def unmask(self, mask):
+        """Unpacks a mask made by `mask` back into a state dict"""
+        state = {}
+        index = 0
+        while mask:
+            if mask & 1:
+                key, value = self.pairs[index]
+                state[key] = value
+            mask >>= 1
+            index += 1
+
+        return state
+
+
+def _hashable(value):
+    """Stands in for a state value in `StateInterner.bits`: lists, dicts and sets become something hashable that's
+    equal whenever they are, tagged with their type so they don't collide with tuples and frozensets"""
+    if isinstance(value, (list, tuple)):
+        items = tuple(_hashable(item) for item in value)
+        return items if isinstance(value, tuple) else (list, items)
+    if isinstance(value, dict):
+        return dict, frozenset((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, set):
+        return set, frozenset(_hashable(item) for item in value)
+
+    return value
+
+
+class TransitionTable(object):
+    """The transitions registered for a class, compiled down to masks over the class's interned state pairs.
+    A transition applies to a state when `state_mask & from_mask == from_mask`, and which transitions apply
+    to a given state mask is only worked out once
+
+    Attributes:
+        source (Dict): the registry entry from global_transition_functions this was compiled from
+        entries (List[Tuple[int, Tuple, List[Tuple[Tuple, Dict]]]]): (from_mask, from_state, [(to_state, to), ...])
+        dispatch (Dict[int, List]): state mask -> entries that apply to it
+        distances (Dict[Tuple[int, Hashable], int]): (from mask, target) -> number of transitions between them, see
+            `distance_to`
+        neighbors (Dict[Hashable, List[Tuple[Tuple, Tuple, int]]]): state mask, or node `memo_key` when there are
+            node validations -> what `valid_neighbors` found for it
+        neighbor_validations (Tuple[Callable]): node validations `valid_neighbors` were checked with
+        max_dispatch_states (int): most states to keep matching entries for, the oldest are dropped past that
+        max_distances (int): most distances to keep, the oldest are dropped past that
+        max_neighbor_states (int): most states to keep neighbors for, the oldest are dropped past that
+    """
+    max_distance_states = 10000
+    max_dispatch_states = 100000
+    max_distances = 100000
+    max_neighbor_states = 100000
+
+    def __init__(self, cls, transitions):
+        interner = global_state_interners[cls]
+        self.interner = interner
+        self.defaults = dict(getattr(cls, 'state', {}))
+        self.source = transitions
+        self.entries = [
+            (interner.mask(dict(from_state)), from_state, [(to_state, dict(to_state)) for to_state in to_states])
+            for from_state, to_states in (transitions or {}).items()
+        ]
+        # `predecessors` only tries values that were interned, so every value a transition can leave behind is
+        interner.mask(self.defaults)
+        for _, _, to_states in self.entries:
+            for _, to in to_states:
+                interner.mask({key: value for key, value in to.items() if value is not None})
+        self.dispatch = {}
+        self.distances = {}
+        self.neighbors = {}
+        self.neighbor_validations = ()
+        self._lock = threading.Lock()
+
+    def matching(self, state_mask):
+        """Finds the transitions that can be taken from a state
+
+        Args:
+            state_mask (int): state packed by the class's StateInterner
+
+        Returns:
+            List[Tuple[Tuple, List[Tuple[Tuple, Dict]]]]: (from_state, [(to_state, to), ...]) that apply
+        """
+        matching = self.dispatch.get(state_mask)
+        if matching is None:
+            matching = [
+                (from_state, to_states)
+                for from_mask, from_state, to_states in self.entries
+                if state_mask & from_mask == from_mask
+            ]
+            self._remember(self.dispatch, state_mask, matching, self.max_dispatch_states)
+
+        return matching
+
+    def apply(self, state_mask, to):
+        """Mask of the state a transition leads to. Like `StateNode.create`, keys the transition removes fall
+        back to the class's default state"""
+        state_mask = self.interner.apply(state_mask, to)
+        for key, value in self.defaults.items():
+            if not state_mask & self.interner.key_bits.get(key, 0):
+                state_mask |= self.interner.bit(key, value)
+
+        return state_mask
+
+    def valid_neighbors(self, node):
+        """Finds the transitions a node can take that lead to a valid state. Node validations can look at the
+        node's path as well as its state, so with any registered this is worked out once per `memo_key`, like
+        memoized node validations are, and without any once per state. Either way it's worked out again once
+        validations change
+
+        Args:
+            node (StateNode): node of our class
+
+        Returns:
+            List[Tuple[Tuple, Tuple, int]]: (from_state, to_state, state mask it leads to)
+        """
+        validations = tuple(node.get_validation_functions())
+        with self._lock:
+            if validations != self.neighbor_validations:
+                self.neighbors = {}
+                self.neighbor_validations = validations
+
+        state_mask = node.state_mask
+        key = node.memo_key() if validations else state_mask
+        if key is None:
+            return self._valid_neighbors(node, state_mask)
+
+        neighbors = self.neighbors.get(key)
+        if neighbors is None:
+            # validations run outside the lock, another search on another thread might just work them out too
+            neighbors = self._valid_neighbors(node, state_mask)
+            self._remember(self.neighbors, key, neighbors, self.max_neighbor_states)
+
+        return neighbors
+
+    def _remember(self, cache, key, value, maxsize):
+        """Puts a value in one of our caches, dropping the oldest past maxsize. Searches on other threads share
+        them, so that happens under a lock"""
+        with self._lock:
+            if key not in cache and len(cache) >= maxsize:
+                del cache[next(iter(cache))]
+            cache[key] = value
+
+    def _valid_neighbors(self, node, state_mask):
+        neighbors = []
+        for from_state, to_states in self.matching(state_mask):
+            for to_state, to in to_states:
+                neighbor_mask = self.apply(state_mask, to)
+                if node.create(node.path_string, **self.interner.unmask(neighbor_mask)).is_valid():
+                    neighbors.append((from_state, to_state, neighbor_mask))
+
+        return neighbors
+
+    def successors(self, state_mask):
+        """Yields the state masks one transition away from state_mask. Validations aren't considered"""
+        for from_state, to_states in self.matching(state_mask):
+            for to_state, to in to_states:
+                yield self.apply(state_mask, to)
+
+    def predecessors(self, state_mask):
+        """Runs transitions backwards: yields every state one transition could have come from to end up in
+        state_mask. Whatever a transition overwrote could have been any value seen for that key, or nothing,
+        unless the transition's from state pins it down. Values any transition or the default state can lead to
+        are seen when the table is built, anything else only once some state has had it, so searches going
+        backward have to mask where they start from first. Validations aren't considered
+
+        Args:
+            state_mask (int): state packed by the class's StateInterner
+
+        Yields:
+            Tuple[Tuple, Tuple, int]: (from_state, to_state, previous state mask)
+        """
+        key_bits = self.interner.key_bits
+        for from_mask, from_state, to_states in self.entries:
+            from_ = dict(from_state)
+            for to_state, to in to_states:
+                base_mask = state_mask
+                options = []
+                for key in to:
+                    base_mask &= ~key_bits.get(key, 0)
+                    if key in from_:
+                        options.append([self.interner.bit(key, from_[key])])
+                    else:
+                        options.append([0] + list(_single_bits(key_bits.get(key, 0))))
+
+                for bits in itertools.product(*options):
+                    previous_mask = base_mask | sum(bits)
+                    if previous_mask & from_mask == from_mask and self.apply(previous_mask, to) == state_mask:
+                        yield from_state, to_state, previous_mask
+
+    def distance(self, from_mask, to_mask):
+        """Fewest transitions it takes to get from one state to another, ignoring validations. Since validations
+        can only rule transitions out, this never overestimates. If the search has to give up after looking at
+        `max_distance_states` states, the depth it got to is returned, which is still a lower bound
+
+        Args:
+            from_mask (int): state packed by the class's StateInterner
+            to_mask (int): state packed by the class's StateInterner
+
+        Returns:
+            Union[int, float]: number of transitions, or infinity if to_mask can't be reached
+        """
+        return self.distance_to(from_mask, to_mask.__eq__, to_mask)
+
+    def distance_to(self, from_mask, accepts, target_key):
+        """`distance` to the closest state that will do, rather than to one state in particular
+
+        Args:
+            from_mask (int): state packed by the class's StateInterner
+            accepts (Callable[[int], bool]): whether a state mask will do
+            target_key (Hashable): which states will do, to remember distances by. Two calls with the same one have
+                to accept the same states
+
+        Returns:
+            Union[int, float]: number of transitions, or infinity if no state that will do can be reached
+        """
+        key = (from_mask, target_key)
+        distance = self.distances.get(key)
+        if distance is not None:
+            return distance
+
+        distance = float('inf')
+        if accepts(from_mask):
+            distance = 0
+
+        seen = {from_mask}
+        layer = [from_mask]
+        depth = 0
+        while distance > depth and layer:
+            depth += 1
+            next_layer = []
+            for state_mask in layer:
+                for next_mask in self.successors(state_mask):
+                    if accepts(next_mask) or len(seen) >= self.max_distance_states:
+                        distance = depth
+                        break
+                    if next_mask not in seen:
+                        seen.add(next_mask)
+                        next_layer.append(next_mask)
+                if distance == depth:
+                    break
+            layer = next_layer
+
+        self._remember(self.distances, key, distance, self.max_distances)
+        return distance
+
+
+def _single_bits(mask):
+    """Yields each bit set in a mask on its own"""
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit
+
+
+def get_registry_version():
+    """int: goes up every time a transition or validation is registered, so things worked out from the
+    registries can tell they might be out of date"""
+    return global_registry_version
+
+
+def _bump_registry_version():
+    global global_registry_version
+    global_registry_version += 1
+
+
+def get_transition_table(cls):
+    """Gets the compiled TransitionTable for a class, compiling it again if the registry changed since
+
+    Args:
+        cls (class): Transitionable class
+
+    Returns:
+        TransitionTable: for cls
+    """
+    transitions = global_transition_functions.get(cls)
+    table = global_transition_tables.get(cls)
+    if table is None or table.source is not transitions:
+        table = global_transition_tables[cls] = TransitionTable(cls, transitions)
+
+    return table
+
+
+def importable_reference(obj):
+    """Gets a reference another process can import a class or function by
+
+    Args:
+        obj (Union[type, Callable]): defined at the top level of a module, or as an attribute of something that is
+
+    Returns:
+        Tuple[str, str]: (module name, qualified name)
+
+    Raises:
+        ValueError: if obj can't be found again by its reference, like classes defined inside functions
+    """
+    reference = getattr(obj, '__module__', None), getattr(obj, '__qualname__', None)
+    try:
+        found = resolve_reference(reference)
+    except (AttributeError, ImportError, TypeError):
+        found = None
+
+    if found is not obj:
+        raise ValueError(f"{obj!r} can't be imported by reference, define it at the top level of a module")
+
+    return reference
+
+
+def resolve_reference(reference):
+    """Imports what a reference from `importable_reference` points to"""
+    module_name, qualname = reference
+    obj = importlib.import_module(module_name)
+    for name in qualname.split('.'):
+        obj = getattr(obj, name)
+
+    return obj
+
+
+def _function_reference(func):
+    """(module name, qualified name, unwrap). Decorating a function with `register_transition` or
+    `register_validation` leaves the decorated version where the function was defined, so if that's what the
+    reference finds, `unwrap` says to take its __wrapped__"""
+    reference = getattr(func, '__module__', None), getattr(func, '__qualname__', None)
+    try:
+        found = resolve_reference(reference)
+    except (AttributeError, ImportError, TypeError):
+        found = None
+
+    if found is not func and getattr(found, '__wrapped__', None) is not func:
+        raise ValueError(f"{func!r} can't be imported by reference, define it at the top level of a module")
+
+    return reference + (found is not func,)
+
+
+def _resolve_function(reference):
+    module_name, qualname, unwrap = reference
+    func = resolve_reference((module_name, qualname))
+    return func.__wrapped__ if unwrap else func
+
+
+def export_registry(classes=None):
+    """Describes the transitions and validations registered for classes by importable reference, so that
+    `import_registry` can rebuild them in another process, like the workers of a ProcessPoolExecutor that
+    doesn't fork. Every class and function registered has to be defined at the top level of a module
+
+    Args:
+        classes (Iterable[type]): classes to describe (default: None, every class with something registered)
+
+    Returns:
+        List[Tuple]: picklable (class reference, transitions, validations), where transitions are
+            (from_state, to_state, function reference) and validations are (function reference, reads, memo_size)
+
+    Raises:
+        ValueError: if a class or function can't be imported by reference
+    """
+    if classes is None:
+        classes = set(global_transition_functions) | set(global_validation_functions)
+
+    registry = []
+    for cls in sorted(classes, key=lambda cls: (cls.__module__, cls.__qualname__)):
+        transitions = [
+            (from_state, to_state, _function_reference(func))
+            for from_state, to_states in global_transition_functions.get(cls, {}).items()
+            for to_state, func in to_states.items()
+        ]
+        validations = [
+            (
+                _function_reference(validation_func.__wrapped__),
+                validation_func.reads,
+                validation_func.memo.maxsize if validation_func.memo is not None else None,
+            )
+            for validation_func in global_validation_functions.get(cls, [])
+        ]
+        registry.append((importable_reference(cls), transitions, validations))
+
+    return registry
+
+
+def registered_classes(state_graphs):
+    """Finds what of the registries searching some graphs needs, to `export_registry` just that
+
+    Args:
+        state_graphs (Iterable[StateGraph]): graphs to search
+
+    Returns:
+        Set[type]: their graph and node classes that have transitions or validations registered
+    """
+    classes = set()
+    for state_graph in state_graphs:
+        classes.add(state_graph.__class__)
+        classes.update(state_graph.nodes[node_path].__class__ for node_path in state_graph.node_order())
+
+    return {cls for cls in classes if cls in global_transition_functions or cls in global_validation_functions}
+
+
+def import_registry(registry):
+    """Registers what `export_registry` described, replacing whatever the classes had registered before. That
+    includes what importing their modules registered, so importing the same registry twice changes nothing
+
+    Args:
+        registry (List[Tuple]): from `export_registry`
+    """
+    for cls_reference, transitions, validations in registry:
+        cls = resolve_reference(cls_reference)
+        global_transition_functions.pop(cls, None)
+        global_validation_functions.pop(cls, None)
+        global_transition_tables.pop(cls, None)
+        for from_state, to_state, func_reference in transitions:
+            cls.register_transition(from_=dict(from_state), to=dict(to_state))(_resolve_function(func_reference))
+        for func_reference, reads, memo_size in validations:
+            cls.register_validation(_resolve_function(func_reference), reads=reads, memo_size=memo_size)
 
 
 class Transitionable(object):
@@ -22,11 +559,12 @@ class Transitionable(object):
             from_state_key = tuple(sorted(from_.items()))
             to_state_key = tuple(sorted(to.items()))
             global_transition_functions[cls][from_state_key][to_state_key] = func
+            global_transition_tables.pop(cls, None)
+            _bump_registry_version()
 
-            @wraps(func)
-            def new_func(item_self):
-                """This is the replacement method. We're gonna assume the first arg is a node, and in most
-                cases self. if that's not the case, we will throw an error
+            def check(item_self):
+                """We're gonna assume the first arg is a node, and in most cases self. if that's not the case,
+                we will throw an error
 
                 Args:
                     item_self (Transitionable): item we are transitioning
@@ -40,15 +578,27 @@ class Transitionable(object):
                 ):
                     raise ValueError(f"Your {cls.__name__} must contain this for transitioning: {from_}")
 
-                # run function
-                result = func(item_self)
-
-                # update state
+            def update(item_self):
                 state = {**item_self.state, **to}
                 state = {key: value for key, value in state.items() if value is not None}
                 item_self.state = state
 
-                return result
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def new_func(item_self):
+                    """Async replacement method, for transitions that are coroutine functions"""
+                    check(item_self)
+                    result = await func(item_self)
+                    update(item_self)
+                    return result
+            else:
+                @wraps(func)
+                def new_func(item_self):
+                    """This is the replacement method"""
+                    check(item_self)
+                    result = func(item_self)
+                    update(item_self)
+                    return result
 
             return new_func
 
@@ -59,13 +609,86 @@ class ValidationError(Exception):
     pass
 
 
+class ValidationMemo(object):
+    """Bounded LRU of what a validation came back with, keyed on the states it looked at. Passes are kept as
+    None and failures as the ValidationError they raised. Searches on different threads share memos, so they're
+    looked up and changed under a lock
+
+    Attributes:
+        maxsize (int): most outcomes to keep, dropping the least recently used ones past that
+        hits (int): lookups that found an outcome
+        misses (int): lookups that didn't
+        read_sets (Dict[Tuple[str], None]): node paths graph validations have been seen reading, in order
+    """
+    missing = object()
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.outcomes = OrderedDict()
+        self.read_sets = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, keys):
+        """Finds the outcome stored for the first of `keys` we have one for
+
+        Args:
+            keys (Iterable[Hashable]): keys to try. This can be worked out from `read_sets` as it goes
+
+        Returns:
+            object: the outcome, or `ValidationMemo.missing`
+        """
+        with self._lock:
+            for key in keys:
+                outcome = self.outcomes.get(key, self.missing)
+                if outcome is not self.missing:
+                    self.outcomes.move_to_end(key)
+                    self.hits += 1
+                    return outcome
+
+            self.misses += 1
+            return self.missing
+
+    def store(self, key, outcome, read_paths=None):
+        """Remembers an outcome, and for graph validations, the node paths they read to get it"""
+        with self._lock:
+            if read_paths is not None:
+                self.read_sets[read_paths] = None
+            self.outcomes[key] = outcome
+            self.outcomes.move_to_end(key)
+            if len(self.outcomes) > self.maxsize:
+                self.outcomes.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.outcomes.clear()
+            self.read_sets.clear()
+
+    def __len__(self):
+        return len(self.outcomes)
+
+
 class Validatable(object):
     """Behavior that allows validations to happen"""
 
     @classmethod
-    def register_validation(cls, func):
+    def register_validation(cls, func=None, reads=None, memo_size=None):
         """This decorates the function, but also registers the function in the class's transition_functions
-        dictinoary as a transition to the new state"""
+        dictinoary as a transition to the new state
+
+        Args:
+            func (Callable): validation to register. Leave it out to get a decorator that takes it instead
+            reads (Iterable[str]): node paths, or fnmatch patterns of them, the validation looks at. Validations
+                that don't say are assumed to look at every node (default: None)
+            memo_size (int): remember up to this many outcomes in a `ValidationMemo` kept as `memo` on the
+                validation, which `validation_error` checks before running it. Only for validations that just
+                depend on the states of what they look at (default: None, don't remember any)
+        """
+        if func is None:
+            return lambda func: cls.register_validation(func, reads=reads, memo_size=memo_size)
 
         @wraps(func)
         def wrapper(node_self):
@@ -78,11 +701,55 @@ class Validatable(object):
             if not isinstance(node_self, cls):
                 raise ValueError(f"You can only define validations for instances of {cls.__name__}")
 
-            func(node_self)
+            # async validations still have to finish before the search can tell whether the node is valid
+            result = func(node_self)
+            if inspect.isawaitable(result):
+                run_coroutine(result)
 
+        wrapper.reads = tuple(reads) if reads is not None else None
+        wrapper.memo = ValidationMemo(memo_size) if memo_size else None
         global_validation_functions[cls].append(wrapper)
+        _bump_registry_version()
         return wrapper
 
+    def get_validation_functions(self):
+        """List[Callable]: validations `is_valid` runs on us"""
+        return global_validation_functions.get(self.__class__, [])
+
+    def memo_key(self):
+        """Hashable: what memoized validations of ours look up their outcomes by, or None to always run them"""
+        return None
+
+    def validation_error(self):
+        """Runs validations until one raises a ValidationError
+
+        Returns:
+            ValidationError: the first one raised, or None if all validations passed
+        """
+        for validation_func in self.get_validation_functions():
+            memo = getattr(validation_func, 'memo', None)
+            key = self.memo_key() if memo is not None else None
+            error = memo.lookup([key]) if key is not None else ValidationMemo.missing
+
+            if error is ValidationMemo.missing:
+                try:
+                    run_validation(validation_func, self)
+                    error = None
+                except ValidationError as e:
+                    error = e
+
+                if key is not None:
+                    memo.store(key, error)
+
+            if error is not None:
+                return error
+
+        return None
+
+    def is_valid(self):
+        """bool: if all validations pass"""
+        return self.validation_error() is None
+
     def validate(self):
         """returns validation results"""
         results = {}
@@ -0,0 +1,26 @@
+"""A pipeline of jobs for tests that start worker processes. Workers that don't fork import these by reference, so
+they live in a module of their own"""
+from stateman.graph import StateGraph
+from stateman.node import StateNode
+from stateman.utils import ValidationError
+
+
+class Job(StateNode):
+    state = {'running': False}
+
+
+class Pipeline(StateGraph):
+    pass
+
+
+def start_job(node):
+    pass
+
+
+def stop_job(node):
+    pass
+
+
+def sink_runs_after_source(graph):
+    if graph.nodes['/sink'].state['running'] and not graph.nodes['/source'].state['running']:
+        raise ValidationError("the sink can't run without the source")
@@ -79,3 +79,52 @@ def state_graph_cls(clean_transitions, mock_state_node_cls):
     with mock.patch('stateman.graph.StateNode', mock_state_node_cls):
         from stateman.graph import StateGraph
         yield StateGraph
+
+
+@pytest.fixture(scope="function")
+def dummy_data_graph(state_graph_cls, server_node_cls, job_node_cls, dummy_data):
+    """Builds StateGraphs out of the dummy data nodes and edges
+
+    Returns:
+        Callable: taking extra state for every job node, and returning a StateGraph
+    """
+    node_classes = {'server': server_node_cls, 'job': job_node_cls}
+
+    def build(**job_state):
+        sg = state_graph_cls()
+        sg.add_nodes([
+            node_classes[value['type']](
+                path=value['path'],
+                **{**value['state'], **(job_state if value['type'] == 'job' else {})}
+            )
+            for value in dummy_data.NODES.values()
+        ])
+        sg.add_edges(dummy_data.EDGES)
+        return sg
+
+    return build
+
+
+@pytest.fixture(scope="function")
+def pipelines(clean_transitions):
+    """Registers transitions and validations for the pipeline in `tests.mockdata.pipeline`
+
+    Returns:
+        Callable: taking whether /source, /sink and /other are running, and returning a Pipeline
+    """
+    from tests.mockdata.pipeline import Job, Pipeline, start_job, stop_job, sink_runs_after_source
+
+    Job.register_transition(from_={'running': False}, to={'running': True})(start_job)
+    Job.register_transition(from_={'running': True}, to={'running': False})(stop_job)
+    Pipeline.register_validation(sink_runs_after_source, reads=['/source', '/sink'], memo_size=8)
+
+    def build(*running):
+        pipeline = Pipeline()
+        pipeline.add_nodes([
+            Job.create(node_path, running=node_running)
+            for node_path, node_running in zip(('/source', '/sink', '/other'), running)
+        ])
+        pipeline.add_edges([('/source', '/sink')])
+        return pipeline
+
+    return build
@@ -0,0 +1,58 @@
+import pytest
+
+from benchmarks import suite
+from benchmarks.scenarios import Scenario
+from stateman.utils import global_transition_functions, global_validation_functions
+
+
+@pytest.mark.parametrize('topology, edges', [
+    ('chain', [(0, 1), (1, 2), (2, 3)]),
+    ('star', [(0, 1), (0, 2), (0, 3)]),
+    ('tree', [(0, 1), (0, 2), (1, 3)]),
+])
+def test_benchmark_scenarios(topology, edges):
+    scenario = Scenario('test', topology, nodes=4, states=3, fanout=2, validation_density=1.0)
+    assert scenario.edges() == edges
+
+    current, desired = scenario.build()
+    assert len(current.nodes) == 5
+    assert len(current.get_validation_functions()) == 3
+
+    # parents go first, and there's a shortcut straight to the last step
+    plan = current.take_shortest_path_to(desired, **scenario.search_options())
+    assert len(plan) == 4
+    assert [result['node'] for result in plan][0] == f'/{topology}/0'
+
+    node_cls, graph_cls = scenario.classes
+    scenario.unregister()
+    assert node_cls not in global_transition_functions and graph_cls not in global_validation_functions
+    assert scenario.classes == []
+
+
+def test_benchmark_regressions():
+    baselines = {'a': {'plan_length': 3, 'expanded': 10, 'seconds': 1.0, 'peak_memory': 100}}
+    assert suite.find_regressions({'a': dict(baselines['a'], expanded=9, seconds=1.9)}, baselines) == []
+    assert suite.find_regressions({'b': dict(baselines['a'], expanded=90)}, baselines) == []
+
+    regressions = suite.find_regressions(
+        {'a': {'plan_length': 4, 'expanded': 11, 'seconds': 2.5, 'peak_memory': 200}}, baselines
+    )
+    assert [regression.split(':')[1].split()[0] for regression in regressions] == [
+        'plan', 'expanded', 'took', 'peaked'
+    ]
+
+
+def test_benchmark_suite_runs(tmp_path):
+    scenario = Scenario('tiny', 'chain', nodes=2, states=2)
+    registered = len(global_transition_functions), len(global_validation_functions)
+    results = suite.run_suite([scenario], repeat=1)
+    assert (len(global_transition_functions), len(global_validation_functions)) == registered
+    assert results['tiny']['plan_length'] == results['tiny']['expanded'] == 2
+    assert results['tiny']['peak_memory'] > 0
+
+    path = str(tmp_path / 'baselines.json')
+    assert suite.load_baselines(path) == {}
+    suite.save_baselines(results, path)
+    assert suite.load_baselines(path) == results
+    assert suite.find_regressions(results, suite.load_baselines(path)) == []
+    assert 'tiny' in suite.format_results(results, results)
@@ -0,0 +1,46 @@
+import pytest
+
+from stateman.fleet import reconcile_fleet
+from stateman.node import StateNode
+from stateman.plan_cache import PlanCache
+
+
+@pytest.mark.parametrize('mp_context', ['fork', 'spawn'])
+def test_reconcile_fleet(pipelines, mp_context):
+    # workers only need what's registered for the classes in the fleet
+    class Scratch(StateNode):
+        pass
+
+    Scratch.register_transition(from_={}, to={'scratched': True})(lambda node: None)
+
+    # a fleet mostly deployed from the same template, so there are only three searches to do
+    pairs = [(pipelines(False, False, False), pipelines(True, True, True)) for _ in range(6)] + [
+        (pipelines(True, True, False), pipelines(False, False, False)),
+        (pipelines(True, False, True), pipelines(True, True, True)),
+        (pipelines(True, False, True), pipelines(True, True, True)),
+    ]
+    cache = PlanCache()
+    results = dict(reconcile_fleet(
+        pairs, dry_run=True, plan_cache=cache, processes=2, mp_context=mp_context, chunk_size=1
+    ))
+    assert sorted(results) == list(range(len(pairs)))
+    for index, (current, desired) in enumerate(pairs):
+        assert results[index] == current.take_shortest_path_to(desired, dry_run=True)
+    assert [len(results[index]) for index in (0, 6, 7)] == [3, 2, 1]
+    assert (cache.hits, cache.misses, len(cache)) == (0, 3, 3)
+
+    # the next batch gets its plans from the cache, and doesn't need any workers
+    results = dict(reconcile_fleet(pairs[:7], dry_run=True, plan_cache=cache, mp_context=mp_context))
+    assert len(results) == 7 and (cache.hits, cache.misses) == (2, 3)
+
+
+def test_reconcile_fleet_runs_plans(pipelines):
+    results = list(reconcile_fleet(
+        [(pipelines(False, False, False), pipelines(True, True, False))] * 2, processes=1, mp_context='fork',
+        max_workers=2,
+    ))
+    assert [index for index, _ in results] == [0, 1]
+    assert [[(result['node'], result['layer']) for result in node_results] for _, node_results in results] == [
+        [('/source', 0), ('/sink', 1)]
+    ] * 2
+    assert all('exception' not in result for _, node_results in results for result in node_results)
@@ -0,0 +1,120 @@
+import pytest
+
+from stateman import heuristics
+from stateman.goal import Goal
+from stateman.plan_cache import PlanCache
+from stateman.utils import ValidationError
+
+
+@pytest.fixture()
+def pipeline(clean_transitions, state_graph_cls, mock_state_node_cls):
+    """Extract jobs feeding a transform job, all running in the east. Jobs have to be stopped to move, and the
+    transform job can't run without both extract jobs running"""
+
+    class Job(mock_state_node_cls):
+        pass
+
+    @Job.register_transition(from_={'running': False}, to={'running': True})
+    def start_job(node):
+        pass
+
+    @Job.register_transition(from_={'running': True}, to={'running': False})
+    def stop_job(node):
+        pass
+
+    for from_location, to_location in [('America/East', 'America/West'), ('America/East', 'Europe')]:
+        Job.register_transition(
+            from_={'running': False, 'location': from_location}, to={'location': to_location}
+        )(lambda node: None)
+
+    @state_graph_cls.register_validation(reads=['/extract/*', '/transform'])
+    def extract_runs_when_transform_runs(graph):
+        if graph.nodes['/transform'].state['running'] and not (
+            graph.nodes['/extract/likes'].state['running'] and graph.nodes['/extract/comments'].state['running']
+        ):
+            raise ValidationError("extract jobs have to be running when transform is running")
+
+    sg = state_graph_cls()
+    sg.add_nodes([
+        Job(path=node_path, running=True, location='America/East')
+        for node_path in ('/extract/likes', '/extract/comments', '/transform', '/report')
+    ])
+    return sg
+
+
+def plan_of(results):
+    return [(result['node'], result['to_state']) for result in results]
+
+
+@pytest.mark.parametrize('goal, plan_length', [
+    # stop transform so the extract jobs can stop, then move them. nothing says to start anything again
+    ({'/extract/*': {'location': 'America/West'}}, 5),
+    ({'/extract/*': {'location': 'America/West', 'running': True}}, 7),
+    ({'/extract/*': {'location': 'America/West', 'running': True}, '/transform': {'running': True}}, 8),
+    # either will do
+    ({'/report': {'location': {'America/West', 'Europe'}}}, 2),
+    ({'/report': {'location': lambda location: location != 'America/East', 'running': True}}, 3),
+    # already there
+    ({'/report': {'running': True}, '/extract/*': {}}, 0),
+])
+def test_goal_plans(pipeline, goal, plan_length):
+    goal = Goal(goal)
+    plan = pipeline.take_shortest_path_to(goal, dry_run=True, check_heuristic=True)
+    assert len(plan) == plan_length
+    assert goal.is_satisfied_by(pipeline.get_trajectory([
+        (result['node'], tuple(sorted(result['from_state'].items())), tuple(sorted(result['to_state'].items())))
+        for result in plan
+    ])[-1])
+
+
+@pytest.mark.parametrize('strategy, search_options', [
+    ('a_star', {'lazy': True}),
+    ('a_star', {'decompose': True}),
+    ('ida_star', {}),
+    ('sma_star', {}),
+    ('anytime', {'weight': 2}),
+    ('parallel_a_star', {'processes': 2, 'mp_context': 'fork'}),
+])
+def test_goal_with_every_strategy(pipeline, strategy, search_options):
+    goal = Goal({'/extract/likes': {'location': 'Europe'}, '/report': {'running': False}})
+    plan = pipeline.take_shortest_path_to(goal, dry_run=True, strategy=strategy, **search_options)
+    assert len(plan) == 4
+    assert plan_of(plan)[-1] in [('/extract/likes', {'location': 'Europe'}), ('/report', {'running': False})]
+
+
+def test_goal_edge_cases(pipeline):
+    # the south isn't anywhere the jobs go
+    assert pipeline.take_shortest_path_to(Goal({'/report': {'location': 'America/South'}})) == []
+    assert heuristics.sum_node_distances(pipeline, Goal({'/report': {'location': 'America/South'}})) == float('inf')
+
+    with pytest.raises(ValueError, match='backward'):
+        pipeline.take_shortest_path_to(Goal({'/report': {'running': False}}), strategy='bidirectional')
+
+    # a typo doesn't mean we're already there
+    with pytest.raises(ValueError, match=r'/nowhere/\*, /reprot'):
+        pipeline.take_shortest_path_to(Goal({'/reprot': {'running': False}, '/nowhere/*': {'running': False}}))
+    with pytest.raises(ValueError, match='/transform'):
+        Goal({'/transform': {'running': False}}, node_paths=['/report']).is_satisfied_by(pipeline)
+    assert Goal({'/transform': {'running': False}}).subgraph(['/report']).is_satisfied_by(pipeline)
+
+    # keys a node doesn't have are None
+    goal = Goal({'/report': {'color': None}, '/transform': {'color': {'red', None}}})
+    assert goal.is_satisfied_by(pipeline)
+    assert Goal({'/report': {'color': 'red'}}).unsatisfied(pipeline) == ['/report']
+
+    # only what's constrained counts
+    goal = Goal({'/extract/*': {'running': False}})
+    assert goal.constrained_keys(pipeline) == {'/extract/comments': {'running'}, '/extract/likes': {'running'}}
+    assert goal.subgraph(['/extract/likes', '/report']).unsatisfied(pipeline) == ['/extract/likes']
+    assert heuristics.mismatch_count(pipeline, goal) == 2
+    relevant = pipeline.relevant_transitions(goal)
+    assert relevant['/report'] == frozenset()
+    assert relevant['/transform'] is None
+
+
+def test_goal_plans_get_cached(pipeline):
+    cache = PlanCache()
+    plan = pipeline.take_shortest_path_to(Goal({'/report': {'location': 'Europe'}}), dry_run=True, plan_cache=cache)
+    again = pipeline.take_shortest_path_to(Goal({'/report': {'location': 'Europe'}}), dry_run=True, plan_cache=cache)
+    assert plan == again and len(plan) == 2
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,129 @@
+import mock
+import pytest
+
+from stateman import heuristics
+from stateman.goal import Goal
+from stateman.progress import Progress
+from stateman.utils import get_transition_table, global_state_interners
+
+
+def test_heuristics_on_dummy_data(dummy_data_graph):
+    stopped = dummy_data_graph()
+    running = dummy_data_graph(status='running')
+    broken = dummy_data_graph(status='broken')
+
+    # 5 jobs, each a transition away from running
+    assert heuristics.zero(stopped, running) == 0
+    assert heuristics.mismatch_count(stopped, running) == 5
+    assert heuristics.max_node_distance(stopped, running) == 1
+    assert heuristics.sum_node_distances(stopped, running) == 5
+
+    # broken -> stopped -> running
+    assert heuristics.mismatch_count(broken, running) == 5
+    assert heuristics.max_node_distance(broken, running) == 2
+    assert heuristics.sum_node_distances(broken, running) == 10
+
+    # nothing gets a job back to broken
+    assert heuristics.sum_node_distances(stopped, broken) == float('inf')
+
+    # we're already there
+    for heuristic in (heuristics.zero, heuristics.mismatch_count, heuristics.max_node_distance,
+                      heuristics.sum_node_distances):
+        assert heuristic(running, running) == 0
+
+
+def test_transition_table_distance(job_node_cls):
+    table = get_transition_table(job_node_cls)
+    interner = global_state_interners[job_node_cls]
+    stopped = interner.mask({'status': 'stopped'})
+    running = interner.mask({'status': 'running'})
+    broken = interner.mask({'status': 'broken'})
+
+    assert table.distance(stopped, stopped) == 0
+    assert table.distance(stopped, running) == 1
+    assert table.distance(broken, running) == 2
+    assert table.distance(running, broken) == float('inf')
+    assert table.distances[(broken, running)] == 2
+
+
+def test_transition_table_distance_gives_up_with_lower_bound(node_cls):
+    for i in range(100):
+        node_cls.register_transition(from_={'step': i}, to={'step': i + 1})(lambda node: None)
+
+    table = get_transition_table(node_cls)
+    interner = global_state_interners[node_cls]
+    table.max_distance_states = 10
+    distance = table.distance(interner.mask({'step': 0}), interner.mask({'step': 100}))
+    assert distance <= 100
+    assert distance >= 9
+
+
+def test_graph_search_with_each_heuristic(dummy_data_graph):
+    broken = dummy_data_graph(status='broken')
+    running = dummy_data_graph(status='running')
+
+    for heuristic in (heuristics.zero, heuristics.mismatch_count, heuristics.max_node_distance,
+                      heuristics.sum_node_distances):
+        steps = broken.take_shortest_path_to(running, dry_run=True, heuristic=heuristic, check_heuristic=True)
+        assert len(steps) == 10
+
+
+def test_graph_class_picks_its_heuristic(dummy_data_graph, state_graph_cls):
+    broken = dummy_data_graph(status='broken')
+    running = dummy_data_graph(status='running')
+    guesses = []
+
+    def heuristic(state_graph, desired_state_graph):
+        guesses.append(state_graph)
+        return heuristics.mismatch_count(state_graph, desired_state_graph)
+
+    with mock.patch.object(state_graph_cls, 'heuristic', staticmethod(heuristic)):
+        assert len(broken.take_shortest_path_to(running, dry_run=True)) == 10
+
+    assert guesses
+    assert state_graph_cls.heuristic is heuristics.sum_node_distances
+
+
+def test_check_heuristic_catches_bad_heuristics(dummy_data_graph):
+    broken = dummy_data_graph(status='broken')
+    running = dummy_data_graph(status='running')
+
+    # counting pairs that differ overestimates: one transition fixes all of a node's pairs at once
+    def overestimate(state_graph, desired_state_graph):
+        return 10 * heuristics.mismatch_count(state_graph, desired_state_graph)
+
+    with pytest.raises(AssertionError):
+        broken.take_shortest_path_to(running, dry_run=True, heuristic=overestimate, check_heuristic=True)
+
+    # jumps around between neighbors
+    def jumpy(state_graph, desired_state_graph):
+        return 3 * (heuristics.mismatch_count(state_graph, desired_state_graph) % 2)
+
+    with pytest.raises(AssertionError):
+        broken.take_shortest_path_to(running, dry_run=True, heuristic=jumpy, check_heuristic=True)
+
+
+@pytest.mark.parametrize('heuristic', [
+    heuristics.zero, heuristics.mismatch_count, heuristics.max_node_distance, heuristics.sum_node_distances,
+])
+def test_progress_keeps_up_with_the_heuristic(dummy_data_graph, heuristic):
+    broken = dummy_data_graph(status='broken').snapshot()
+    running = dummy_data_graph(status='running').snapshot()
+    for desired in (running, dummy_data_graph(status='broken'),
+                    Goal({'/*': {'status': {'stopped', 'running'}}})):
+        progress = Progress(broken, desired, heuristic)
+        frontier = [progress.start(broken)]
+        # a few transitions out from where we start, worked out a node at a time
+        for _ in range(4):
+            frontier = [
+                neighbor for state_graph in frontier for neighbor in state_graph.get_transitions_and_neighbors().values()
+            ]
+            for state_graph in frontier[:50]:
+                assert progress.estimate(state_graph) == heuristic(state_graph, desired)
+                assert progress.is_goal(state_graph) == desired.is_satisfied_by(state_graph)
+
+    # states the search didn't start don't know their progress, so they get worked out from scratch
+    heuristic = mock.Mock(wraps=heuristics.sum_node_distances, node_term=heuristics.sum_node_distances.node_term)
+    progress = Progress(broken, running, heuristic)
+    assert progress.estimate(broken) == 10 and heuristic.called
+    assert not progress.is_goal(broken)
@@ -0,0 +1,70 @@
+import pickle
+
+import pytest
+
+from stateman.node import StateNode
+from stateman.parallel import ExpansionPool
+from stateman.utils import export_registry, global_transition_functions, global_validation_functions, import_registry
+from tests.mockdata.pipeline import Job, Pipeline, sink_runs_after_source, stop_job
+
+
+def test_registry_round_trips_by_reference(pipelines):
+    registry = pickle.loads(pickle.dumps(export_registry()))
+    assert [cls_reference for cls_reference, _, _ in registry] == [
+        (Job.__module__, 'Job'), (Job.__module__, 'Pipeline'),
+    ]
+
+    transitions = dict(global_transition_functions[Job])
+    import_registry(registry)
+    import_registry(registry)
+    assert global_transition_functions[Job] == transitions
+    [validation] = global_validation_functions[Pipeline]
+    assert validation.__wrapped__ is sink_runs_after_source
+    assert (validation.reads, validation.memo.maxsize) == (('/source', '/sink'), 8)
+
+    # the registries themselves pickle too, now that their defaults aren't lambdas
+    assert pickle.loads(pickle.dumps(global_transition_functions))[Job] == transitions
+
+
+def test_registry_export_needs_importable_functions(pipelines):
+    Job.register_transition(from_={'running': True}, to={'broken': True})(lambda node: None)
+    with pytest.raises(ValueError):
+        export_registry()
+
+    class LocalJob(StateNode):
+        pass
+
+    LocalJob.register_transition(from_={'running': True}, to={'running': False})(stop_job)
+    with pytest.raises(ValueError):
+        export_registry([LocalJob])
+
+
+@pytest.mark.parametrize('mp_context', ['fork', 'spawn'])
+def test_parallel_a_star(pipelines, mp_context):
+    # workers only need what's registered for the classes being searched
+    class Scratch(StateNode):
+        pass
+
+    Scratch.register_transition(from_={}, to={'scratched': True})(lambda node: None)
+
+    stopped, running = pipelines(False, False, False), pipelines(True, True, True)
+    plan = stopped.take_shortest_path_to(
+        running, dry_run=True, strategy='parallel_a_star', processes=2, mp_context=mp_context
+    )
+    assert [result['node'] for result in plan].index('/source') < [result['node'] for result in plan].index('/sink')
+    assert len(plan) == len(stopped.take_shortest_path_to(running, dry_run=True)) == 3
+
+
+def test_expansion_pool_sends_what_changed(pipelines):
+    stopped = pipelines(False, False, False).snapshot()
+    with ExpansionPool(stopped, processes=2, mp_context='fork') as pool:
+        neighbors = stopped.get_transitions_and_neighbors()
+        assert pool.changes(stopped) == ()
+        assert sorted(pool.changes(neighbor) for neighbor in neighbors.values()) == [
+            (('/other', (('running', True),)),), (('/source', (('running', True),)),),
+        ]
+
+        # the sink can't start before the source, whichever process checks
+        assert pool.expand([stopped] + list(neighbors.values())) == [list(neighbors)] + [
+            list(neighbor.get_transitions_and_neighbors()) for neighbor in neighbors.values()
+        ]
@@ -0,0 +1,93 @@
+import pytest
+
+from stateman.plan_cache import PlanCache
+from stateman.utils import ValidationError
+
+
+@pytest.fixture()
+def steps_graphs(clean_transitions, state_graph_cls, mock_state_node_cls):
+    """A single node that counts from 0 to 3 one step at a time, and graphs with it at each step"""
+    blocked = set()
+
+    @state_graph_cls.register_validation(reads=['/counter'])
+    def validate(graph):
+        if graph.nodes['/counter'].state.get('step') in blocked:
+            raise ValidationError('blocked')
+
+    for step in range(3):
+        mock_state_node_cls.register_transition(from_={'step': step}, to={'step': step + 1})(lambda node: None)
+
+    def build(step):
+        sg = state_graph_cls()
+        sg.add_nodes([mock_state_node_cls(path='/counter', name='counter', step=step)])
+        return sg
+
+    build.blocked = blocked
+    return build
+
+
+def test_plan_cache_reuses_plans_and_their_suffixes(steps_graphs):
+    cache = PlanCache()
+    plan = steps_graphs(0).take_shortest_path_to(steps_graphs(3), dry_run=True, plan_cache=cache)
+    assert [result['to_state'] for result in plan] == [{'step': 1}, {'step': 2}, {'step': 3}]
+    assert (cache.hits, cache.misses, len(cache)) == (0, 1, 1)
+
+    assert steps_graphs(0).take_shortest_path_to(steps_graphs(3), dry_run=True, plan_cache=cache) == plan
+    assert (cache.hits, cache.prefix_hits) == (1, 0)
+
+    # somewhere along the way there, we get the rest of the way
+    assert steps_graphs(1).take_shortest_path_to(steps_graphs(3), dry_run=True, plan_cache=cache) == plan[1:]
+    assert (cache.hits, cache.prefix_hits, len(cache)) == (2, 1, 1)
+    assert cache.hit_rate == 2 / 3
+
+    # but not somewhere else
+    assert steps_graphs(1).take_shortest_path_to(steps_graphs(2), dry_run=True, plan_cache=cache) == plan[1:2]
+    assert (cache.misses, len(cache)) == (2, 2)
+
+    # being there already isn't worth a place in the cache
+    assert steps_graphs(3).take_shortest_path_to(steps_graphs(3), dry_run=True, plan_cache=cache) == []
+    assert (cache.misses, len(cache)) == (3, 2)
+
+
+def test_plan_cache_drops_plans_that_stopped_working(steps_graphs):
+    cache = PlanCache()
+    steps_graphs(0).take_shortest_path_to(steps_graphs(3), dry_run=True, plan_cache=cache)
+
+    steps_graphs.blocked.add(2)
+    assert steps_graphs(0).take_shortest_path_to(steps_graphs(3), dry_run=True, plan_cache=cache) == []
+    assert (cache.hits, cache.misses, cache.stale, len(cache)) == (0, 2, 1, 0)
+
+
+def test_plan_cache_forgets_plans_when_registries_change(steps_graphs, mock_state_node_cls):
+    cache = PlanCache()
+    steps_graphs(0).take_shortest_path_to(steps_graphs(3), dry_run=True, plan_cache=cache)
+
+    mock_state_node_cls.register_transition(from_={'step': 0}, to={'step': 3})(lambda node: None)
+    plan = steps_graphs(0).take_shortest_path_to(steps_graphs(3), dry_run=True, plan_cache=cache)
+    assert [result['to_state'] for result in plan] == [{'step': 3}]
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+@pytest.mark.parametrize('policy, survivors', [
+    ('lru', ['a', 'c']),
+    ('fifo', ['b', 'c']),
+    ('lfu', ['a', 'c']),
+])
+def test_plan_cache_eviction(policy, survivors):
+    cache = PlanCache(maxsize=2, policy=policy)
+    cache.put('context', ['a', 'done'], [('/', (), (('to', 'done'),))])
+    cache.put('context', ['b', 'done'], [('/', (), (('to', 'done'),))])
+    assert cache.get('context', 'a') is not None
+
+    cache.put('context', ['c', 'done'], [('/', (), (('to', 'done'),))])
+    assert sorted(start for _, start in cache.plans) == survivors
+    assert cache.evictions == 1
+    assert all(cache.index[('context', start)][0] == ('context', start) for start in survivors)
+    assert len(cache.index) == 2
+
+    # plans that don't do anything can't push the others out
+    cache.put('context', ['done'], [])
+    assert sorted(start for _, start in cache.plans) == survivors
+
+    with pytest.raises(ValueError):
+        PlanCache(policy='random')
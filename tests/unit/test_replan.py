@@ -0,0 +1,127 @@
+import pytest
+
+from stateman.goal import Goal
+from stateman.replan import Replanner
+from stateman.stats import SearchStats
+from stateman.utils import ValidationError
+
+
+@pytest.fixture()
+def etl_graphs(clean_transitions, state_graph_cls, mock_state_node_cls):
+    """The pipeline from the demo, where moving to the west coast takes stopping everything, moving, and starting
+    everything again in the right order. Nodes can be put in other states by path to make the world move"""
+
+    class ETLNode(mock_state_node_cls):
+        pass
+
+    ETLNode.register_transition(from_={'running': False}, to={'running': True})(lambda node: None)
+    ETLNode.register_transition(from_={'running': True}, to={'running': False})(lambda node: None)
+    ETLNode.register_transition(
+        from_={'running': False, 'location': 'America/East'}, to={'location': 'America/West'}
+    )(lambda node: None)
+
+    @state_graph_cls.register_validation(reads=['/extract/*', '/transform'])
+    def extract_runs_when_transform_runs(graph):
+        if graph.nodes['/transform'].state['running'] and not (
+            graph.nodes['/extract/likes'].state['running'] and graph.nodes['/extract/comments'].state['running']
+        ):
+            raise ValidationError("extract jobs have to be running when transform is running")
+
+    def build(location, **node_states):
+        sg = state_graph_cls()
+        sg.add_nodes([
+            ETLNode(path=node_path, **{'running': True, 'location': location, **node_states.get(node_path, {})})
+            for node_path in ('/extract/likes', '/extract/comments', '/transform')
+        ])
+        return sg
+
+    build.node_cls = ETLNode
+    return build
+
+
+def plan(start, desired, replanner):
+    stats = SearchStats()
+    transitions = start._find_transitions(desired, 'd_star_lite', False, replanner=replanner, stats=stats)
+    return transitions, stats.expanded
+
+
+def test_replanner_plans_like_a_star(etl_graphs):
+    east, west = etl_graphs('America/East'), etl_graphs('America/West')
+    replanner = Replanner()
+    results = east.take_shortest_path_to(west, dry_run=True, strategy='d_star_lite', replanner=replanner)
+    assert len(results) == len(east.take_shortest_path_to(west, dry_run=True)) == 9
+    assert east.take_shortest_path_to(west, dry_run=True, strategy='d_star_lite') == results
+    assert (replanner.searches, replanner.restarts) == (1, 0)
+
+    # nothing left to do
+    assert west.take_shortest_path_to(west, strategy='d_star_lite', replanner=replanner) == []
+
+
+def test_replanner_picks_up_where_it_left_off(etl_graphs):
+    east, west = etl_graphs('America/East'), etl_graphs('America/West')
+    replanner = Replanner()
+    transitions, _ = plan(east, west, replanner)
+
+    # partway there, the rest of the plan is already worked out
+    trajectory = east.get_trajectory(transitions)
+    assert plan(trajectory[4], west, replanner) == (transitions[4:], 0)
+
+    # someone moves transform on their own, which isn't on the way from where we were
+    moved = etl_graphs('America/East', **{'/transform': {'location': 'America/West'}})
+    assert moved.fingerprint() not in replanner.g
+    transitions, expanded = plan(moved, west, replanner)
+    from_scratch, expanded_from_scratch = plan(moved, west, Replanner())
+    assert len(transitions) == len(from_scratch) == len(moved.take_shortest_path_to(west, dry_run=True)) == 8
+    assert expanded < expanded_from_scratch
+    assert moved.get_trajectory(transitions)[-1].fingerprint() == west.fingerprint()
+
+    assert plan(moved, west, replanner)[1] == 0
+    assert (replanner.searches, replanner.restarts) == (4, 0)
+
+    # a job ending up somewhere we've never heard of is, since nothing expanded so far tried coming from there
+    assert plan(etl_graphs('America/West', **{'/transform': {'location': 'Europe'}}), west, replanner)[0] == []
+    assert (replanner.searches, replanner.restarts) == (5, 1)
+
+
+def test_replanner_starts_over_for_values_it_has_not_seen(clean_transitions, state_graph_cls, mock_state_node_cls):
+    class Node(mock_state_node_cls):
+        state = {'a': 0}
+
+    Node.register_transition(from_={'a': 0}, to={'a': 1})(lambda node: None)
+    Node.register_transition(from_={}, to={'x': None})(lambda node: None)
+
+    def build(**state):
+        sg = state_graph_cls()
+        sg.add_nodes([Node.create('/node', **state)])
+        return sg
+
+    replanner = Replanner()
+    desired = build(a=1)
+    assert len(plan(build(a=0), desired, replanner)[0]) == 1
+
+    # 'oops' wasn't around to try as what x was before it got removed when the desired state was expanded
+    moved = build(a=1, x='oops')
+    assert plan(moved, desired, replanner)[0] == [('/node', (), (('x', None),))]
+    assert plan(moved, desired, replanner)[0] == plan(moved, desired, Replanner())[0]
+    assert (replanner.searches, replanner.restarts) == (3, 1)
+
+
+def test_replanner_starts_over_when_it_has_to(etl_graphs):
+    east, west = etl_graphs('America/East'), etl_graphs('America/West')
+    replanner = Replanner()
+    plan(east, west, replanner)
+
+    # somewhere else to go
+    assert len(plan(east, etl_graphs('America/East', **{'/transform': {'running': False}}), replanner)[0]) == 1
+    assert replanner.restarts == 1
+
+    # new transitions might make for shorter plans
+    etl_graphs.node_cls.register_transition(
+        from_={'location': 'America/East'}, to={'location': 'America/West'}
+    )(lambda node: None)
+    transitions, expanded = plan(east, west, replanner)
+    assert len(transitions) == 3 and expanded > 0
+    assert replanner.restarts == 2
+
+    with pytest.raises(ValueError, match='backward'):
+        plan(east, Goal({'/transform': {'running': False}}), replanner)
@@ -1,5 +1,13 @@
+import asyncio
+import itertools
+import threading
+
+import mock
 import pytest
 
+from stateman import heuristics
+from stateman.plan_cache import PlanCache
+from stateman.stats import SearchStats
 from stateman.utils import ValidationError
 
 
@@ -226,16 +234,32 @@ def test_graph_handles_no_possible_transitions(mock_state_node_cls, state_graph_
 
 
 def test_graph_only_tries_max_iter_times(mock_state_node_cls, state_graph_cls):
+    from stateman.search import _a_star_valid_state_transitions
+
     @mock_state_node_cls.register_transition(from_={}, to={'blah': 'blah'})
     def transition(node):
         return {'my_response': 'is to say blah'}
 
+    @mock_state_node_cls.register_transition(from_={'blah': 'blah'}, to={'blah': None})
+    def transition_back(node):
+        return {'my_response': 'is to say nothing'}
+
+    # 5 nodes that can each toggle 'blah' make for 32 states, more than we're allowed to look at
     sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(4)])
     sg2 = state_graph_cls()
+    sg2.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(4)])
     sg2.nodes['/'].state['blah'] = 'nonexistent state'
 
+    # no heuristic, so the search can't tell the desired state is unreachable until it has looked everywhere
     with pytest.raises(Exception):
-        sg.take_shortest_path_to(sg2, dry_run=True)
+        _a_star_valid_state_transitions(sg, sg2, max_iterations=10, heuristic=heuristics.zero)
+
+    # but if we're allowed to run out of states, there's just no way to get there
+    assert _a_star_valid_state_transitions(sg, sg2, max_iterations=100, heuristic=heuristics.zero) == []
+
+    # and the default heuristic can tell right away
+    assert _a_star_valid_state_transitions(sg, sg2, max_iterations=2) == []
 
 
 def test_graph_handles_exception_when_searching(mock_state_node_cls, state_graph_cls):
@@ -405,6 +429,11 @@ def test_state_graph_prefers_shortest_route(transition_node_cls, state_graph_cls
     ])
 
     assert sg.take_shortest_path_to(sg2, dry_run=True) == [{
+        'node': '/child2',
+        'from_state': {'name': 'pre-transition'},
+        'to_state': {'name': 'post-transition', 'blah': 'blah'},
+        'execution_result': {'dry_run': True}
+    }, {
         'node': '/child1',
         'from_state': {'name': 'pre-transition'},
         'to_state': {'name': 'post-transition', 'something_else': 'something'},
@@ -414,13 +443,13 @@ def test_state_graph_prefers_shortest_route(transition_node_cls, state_graph_cls
         'from_state': {'something_else': 'something'},
         'to_state': {'something_else': None},
         'execution_result': {'dry_run': True}
-    }, {
+    }]
+    assert sg.take_shortest_path_to(sg2) == [{
         'node': '/child2',
         'from_state': {'name': 'pre-transition'},
         'to_state': {'name': 'post-transition', 'blah': 'blah'},
-        'execution_result': {'dry_run': True}
-    }]
-    assert sg.take_shortest_path_to(sg2) == [{
+        'execution_result': None
+    }, {
         'node': '/child1',
         'from_state': {'name': 'pre-transition'},
         'to_state': {'name': 'post-transition', 'something_else': 'something'},
@@ -430,11 +459,6 @@ def test_state_graph_prefers_shortest_route(transition_node_cls, state_graph_cls
         'from_state': {'something_else': 'something'},
         'to_state': {'something_else': None},
         'execution_result': None
-    }, {
-        'node': '/child2',
-        'from_state': {'name': 'pre-transition'},
-        'to_state': {'name': 'post-transition', 'blah': 'blah'},
-        'execution_result': None
     }]
 
 
@@ -450,28 +474,15 @@ def test_state_graph_prefers_shortest_route_with_validations(transition_node_cls
         transition_node_cls.create('/child2', name='post-transition')
     ])
 
-    # The path is predictably that both nodes do pre-transition
-    assert sg.take_shortest_path_to(sg2, dry_run=True) == [{
-        'node': '/child2',
-        'from_state': {'name': 'pre-transition'},
-        'to_state': {'name': 'post-transition', 'something_else': 'something'},
-        'execution_result': {'dry_run': True}
-    }, {
-        'node': '/child1',
-        'from_state': {'name': 'pre-transition'},
-        'to_state': {'name': 'post-transition', 'something_else': 'something'},
-        'execution_result': {'dry_run': True}
-    }, {
-        'node': '/child1',
-        'from_state': {'something_else': 'something'},
-        'to_state': {'something_else': None},
-        'execution_result': {'dry_run': True}
-    }, {
-        'node': '/child2',
-        'from_state': {'something_else': 'something'},
-        'to_state': {'something_else': None},
-        'execution_result': {'dry_run': True}
-    }]
+    # without validations, any interleaving of the 4 transitions is as short as any other
+    steps = sg.take_shortest_path_to(sg2, dry_run=True)
+    assert len(steps) == 4
+    assert sorted((step['node'], tuple(step['from_state'])) for step in steps) == [
+        ('/child1', ('name',)),
+        ('/child1', ('something_else',)),
+        ('/child2', ('name',)),
+        ('/child2', ('something_else',)),
+    ]
 
     # now let's throw a wrench in the machinery and have a validation
     @state_graph_cls.register_validation
@@ -504,3 +515,1028 @@ def test_state_graph_prefers_shortest_route_with_validations(transition_node_cls
         'to_state': {'something_else': None},
         'execution_result': {'dry_run': True}
     }]
+
+
+def test_state_graph_fingerprint(dummy_data_graph, state_graph_cls, server_node_cls, job_node_cls, dummy_data):
+    sg = dummy_data_graph()
+    sg2 = dummy_data_graph()
+    assert sg.fingerprint() == sg2.fingerprint()
+    assert hash(sg.fingerprint()) == hash(sg2.fingerprint())
+
+    # order nodes, state keys and edges were added in doesn't matter
+    sg3 = state_graph_cls()
+    sg3.add_nodes(reversed([
+        job_node_cls(path=node.path_string, **dict(reversed(list(node.state.items()))))
+        if isinstance(node, job_node_cls) else server_node_cls(path=node.path_string, **node.state)
+        for node_path, node in sg.nodes.items()
+        if node_path != '/'
+    ]))
+    sg3.add_edges(reversed(dummy_data.EDGES))
+    assert sg.fingerprint() == sg3.fingerprint()
+
+    # but states and edges do
+    sg2.nodes['/extract/tweets'].state['status'] = 'running'
+    assert sg.fingerprint() != sg2.fingerprint()
+    sg3.add_edges([('/extract/tweets', '/transform/all_events')])
+    assert sg.fingerprint() != sg3.fingerprint()
+
+
+def test_state_graph_neighbors_share_fingerprints(mock_state_node_cls, state_graph_cls):
+    @mock_state_node_cls.register_transition(from_={}, to={'blah': 'blah'})
+    def transition(node):
+        pass
+
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path='/child', name='child')])
+
+    # transitioning '/' then '/child' is the same as '/child' then '/'
+    root_first = sg.get_transitions_and_neighbors()[('/', (), (('blah', 'blah'),))]
+    child_first = sg.get_transitions_and_neighbors()[('/child', (), (('blah', 'blah'),))]
+    both_root_first = root_first.get_transitions_and_neighbors()[('/child', (), (('blah', 'blah'),))]
+    both_child_first = child_first.get_transitions_and_neighbors()[('/', (), (('blah', 'blah'),))]
+    assert root_first.fingerprint() != child_first.fingerprint()
+    assert both_root_first.fingerprint() == both_child_first.fingerprint()
+
+
+def test_state_graph_search_deduplicates_states(dummy_data_graph, state_graph_cls, dummy_data):
+    current = dummy_data_graph()
+    desired = dummy_data_graph(status='running')
+
+    get_transitions_and_neighbors = state_graph_cls.get_transitions_and_neighbors
+    with mock.patch.object(
+            state_graph_cls, 'get_transitions_and_neighbors',
+            autospec=True, side_effect=get_transitions_and_neighbors
+    ) as expand:
+        steps = current.take_shortest_path_to(desired, dry_run=True)
+
+    assert sorted(step['node'] for step in steps) == sorted(
+        value['path'] for value in dummy_data.NODES.values() if value['type'] == 'job'
+    )
+    assert all(step['to_state'] == {'status': 'running'} for step in steps)
+
+    # 5 jobs that are either stopped or running make 32 distinct states, and none of them
+    # should be expanded more than once
+    assert expand.call_count <= 2 ** 5
+
+
+def test_state_graph_neighbors_share_topology(mock_state_node_cls, state_graph_cls):
+    @mock_state_node_cls.register_transition(from_={}, to={'blah': 'blah'})
+    def transition(node):
+        pass
+
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path='/child', name='child')])
+    sg.add_edges([('/', '/child')])
+    neighbors = sg.get_transitions_and_neighbors()
+    neighbor_root = neighbors[('/', (), (('blah', 'blah'),))]
+    neighbor_child = neighbors[('/child', (), (('blah', 'blah'),))]
+
+    # neighbors share one topology, and the nodes that didn't change
+    assert neighbor_root.topology is neighbor_child.topology
+    assert neighbor_root.nodes['/child'] is sg.nodes['/child']
+    assert neighbor_child.nodes['/'] is sg.nodes['/']
+    assert neighbor_root.nodes['/'] is not sg.nodes['/']
+
+    # and so do their neighbors
+    next_neighbor = neighbor_root.get_transitions_and_neighbors()[('/child', (), (('blah', 'blah'),))]
+    assert next_neighbor.topology is neighbor_root.topology
+    assert next_neighbor.nodes['/'] is neighbor_root.nodes['/']
+    assert dict(next_neighbor.nodes.items()) == {'/': next_neighbor.nodes['/'], '/child': next_neighbor.nodes['/child']}
+
+    # the graph we started from is still ours to change, and neighbors don't see those changes
+    sg.add_nodes([mock_state_node_cls(path='/other', name='other')])
+    sg.add_edges([('/child', '/other')])
+    assert '/other' not in neighbor_root.nodes
+    assert list(neighbor_root.topology.edges()) == [('/', '/child')]
+
+    # and so is a neighbor, which copies what it shares before changing it
+    neighbor_root.add_nodes([mock_state_node_cls(path='/other', name='other')])
+    assert '/other' not in neighbor_child.nodes
+    assert '/other' not in neighbor_child.topology
+    assert list(neighbor_root.graph.edges()) == [(neighbor_root.nodes['/'], neighbor_root.nodes['/child'])]
+
+
+def test_state_graph_node_map_flattens_deep_chains(mock_state_node_cls):
+    from stateman.graph import NodeMap
+
+    nodes = NodeMap({'/': mock_state_node_cls(path='/', name='root')})
+    for i in range(NodeMap.max_depth * 2 + 1):
+        nodes = NodeMap(nodes, '/', mock_state_node_cls(path='/', name=f'root{i}'))
+        assert nodes._depth <= NodeMap.max_depth
+
+    assert nodes['/'].state == {'name': f'root{NodeMap.max_depth * 2}'}
+    assert list(nodes) == ['/']
+    assert len(nodes) == 1
+    with pytest.raises(KeyError):
+        nodes['/child']
+
+
+def test_graph_validations_see_search_state_nodes(mock_state_node_cls, state_graph_cls):
+    seen = []
+
+    @state_graph_cls.register_validation
+    def validate(graph):
+        seen.append((graph.nodes['/'].state.get('blah'), graph.nodes['/child'].state.get('blah')))
+        assert [node.path_string for node in graph.graph.successors(graph.nodes['/'])] == ['/child']
+
+    @mock_state_node_cls.register_transition(from_={}, to={'blah': 'blah'})
+    def transition(node):
+        pass
+
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path='/child', name='child')])
+    sg.add_edges([('/', '/child')])
+    neighbor = sg.get_transitions_and_neighbors()[('/', (), (('blah', 'blah'),))]
+    neighbor.get_transitions_and_neighbors()
+    assert seen == [('blah', None), (None, 'blah'), ('blah', None), ('blah', 'blah')]
+
+
+def test_state_graph_state_vector(dummy_data_graph):
+    from stateman.utils import global_state_interners
+
+    sg = dummy_data_graph()
+    assert sg.node_order() == tuple(sorted(sg.nodes))
+    assert sg.state_vector() == tuple(sg.nodes[node_path].state_mask for node_path in sg.node_order())
+    for node_path, node_mask in zip(sg.node_order(), sg.state_vector()):
+        node = sg.nodes[node_path]
+        assert global_state_interners[node.__class__].unmask(node_mask) == node.state
+
+    # the graph we built can still change, so its vector is never stale
+    sg.nodes['/extract/tweets'].state['status'] = 'running'
+    index = sg.node_order().index('/extract/tweets')
+    assert sg.state_vector()[index] == sg.nodes['/extract/tweets'].state_mask
+
+    # neighbors only swap the int for the node that transitioned
+    neighbors = sg.get_transitions_and_neighbors()
+    neighbor = neighbors[('/extract/likes', (('status', 'stopped'),), (('status', 'running'),))]
+    likes_index = neighbor.node_order().index('/extract/likes')
+    likes_mask = neighbor.nodes['/extract/likes'].state_mask
+    assert neighbor.state_vector() == sg.state_vector()[:likes_index] + (likes_mask,) + sg.state_vector()[likes_index + 1:]
+    assert neighbor.state_vector() == tuple(
+        neighbor.nodes[node_path].state_mask for node_path in neighbor.node_order()
+    )
+
+
+def _follow(state_graph, transitions):
+    for transition in transitions:
+        state_graph = state_graph.get_transitions_and_neighbors()[transition]
+    return state_graph
+
+
+@pytest.fixture()
+def etl_graphs(clean_transitions, state_graph_cls, mock_state_node_cls):
+    """The pipeline from the demo: moving to the west coast takes stopping everything, moving, and starting
+    everything again in the right order"""
+
+    class ETLNode(mock_state_node_cls):
+        pass
+
+    @ETLNode.register_transition(from_={'running': False}, to={'running': True})
+    def start_job(node):
+        pass
+
+    @ETLNode.register_transition(from_={'running': True}, to={'running': False})
+    def stop_job(node):
+        pass
+
+    @ETLNode.register_transition(from_={'running': False, 'location': 'America/East'}, to={'location': 'America/West'})
+    def move_to_cali(node):
+        pass
+
+    @state_graph_cls.register_validation
+    def extract_runs_when_transform_runs(graph):
+        if graph.nodes['/transform'].state['running'] and not (
+            graph.nodes['/extract/likes'].state['running'] and graph.nodes['/extract/comments'].state['running']
+        ):
+            raise ValidationError("extract jobs have to be running when transform is running")
+
+    def build(location):
+        sg = state_graph_cls()
+        sg.add_nodes([
+            ETLNode(path=node_path, running=True, location=location)
+            for node_path in ('/extract/likes', '/extract/comments', '/transform')
+        ])
+        return sg
+
+    return build('America/East'), build('America/West')
+
+
+def test_state_graph_finds_predecessors(etl_graphs):
+    east, west = etl_graphs
+
+    # every predecessor gets back to where we are by taking its transition
+    predecessors = west.get_transitions_and_predecessors()
+    assert predecessors
+    for transition, graphs in predecessors.items():
+        for predecessor in graphs:
+            assert _follow(predecessor, [transition]).fingerprint() == west.fingerprint()
+
+    # any of the jobs could have been the last one started, even if that means we came from an invalid state
+    assert {node_path for node_path, from_state, to_state in predecessors} == {
+        '/extract/likes', '/extract/comments', '/transform'
+    }
+
+    # but we can't have come from anywhere if we're invalid ourselves
+    west.nodes['/extract/likes'].state['running'] = False
+    assert west.get_transitions_and_predecessors() == {}
+
+
+def test_state_graph_bidirectional_search(etl_graphs):
+    east, west = etl_graphs
+    a_star = east.take_shortest_path_to(west, dry_run=True)
+    bidirectional = east.take_shortest_path_to(west, dry_run=True, strategy='bidirectional')
+    assert len(a_star) == len(bidirectional) == 9
+
+    transitions = [
+        (step['node'], tuple(sorted(step['from_state'].items())), tuple(sorted(step['to_state'].items())))
+        for step in bidirectional
+    ]
+    assert _follow(east, transitions).fingerprint() == west.fingerprint()
+
+    # transform stops first and starts last
+    assert bidirectional[0]['node'] == '/transform'
+    assert bidirectional[-1]['node'] == '/transform'
+
+
+def test_state_graph_bidirectional_search_edge_cases(mock_state_node_cls, state_graph_cls):
+    from stateman.search import _bidirectional_valid_state_transitions
+
+    @mock_state_node_cls.register_transition(from_={'something': 'blah'}, to={'blah': 'blah'})
+    def transition(node):
+        pass
+
+    sg = state_graph_cls()
+    sg2 = state_graph_cls()
+    assert sg.take_shortest_path_to(sg2, dry_run=True, strategy='bidirectional') == []
+
+    # can't get there from here
+    sg2.nodes['/'].state['blah'] = 'blah'
+    assert sg.take_shortest_path_to(sg2, dry_run=True, strategy='bidirectional') == []
+
+    # but we can from here
+    sg.nodes['/'].state['something'] = 'blah'
+    sg2.nodes['/'].state['something'] = 'blah'
+    assert _bidirectional_valid_state_transitions(sg, sg2) == [('/', (('something', 'blah'),), (('blah', 'blah'),))]
+
+
+def test_state_graph_bidirectional_search_tries_values_nothing_has_had_yet(mock_state_node_cls, state_graph_cls):
+    class Node(mock_state_node_cls):
+        state = {'a': 0}
+
+    Node.register_transition(from_={'a': 0}, to={'a': 2})(lambda node: None)
+    Node.register_transition(from_={'a': 2}, to={'k': 'mid'})(lambda node: None)
+    Node.register_transition(from_={'a': 2}, to={'a': 1})(lambda node: None)
+    Node.register_transition(from_={'a': 1}, to={'k': 'done'})(lambda node: None)
+    for side in range(3):
+        Node.register_transition(from_={'a': 0}, to={'z': side})(lambda node: None)
+
+    @Node.register_validation
+    def needs_k(node):
+        if node.state['a'] == 1 and 'k' not in node.state:
+            raise ValidationError("a can't be 1 without k")
+
+    def build(**state):
+        sg = state_graph_cls()
+        sg.add_nodes([Node.create('/node', **state)])
+        return sg
+
+    # coming back from the desired state, k could only have been 'mid' before 'done' if some state had had it
+    plan = build(a=0).take_shortest_path_to(build(a=1, k='done'), dry_run=True, strategy='bidirectional')
+    assert [step['to_state'] for step in plan] == [{'a': 2}, {'k': 'mid'}, {'a': 1}, {'k': 'done'}]
+
+
+@pytest.fixture()
+def pipelines(clean_transitions, state_graph_cls, mock_state_node_cls):
+    """Builds graphs with any number of copies of the demo pipeline, each with its own validation"""
+
+    class ETLNode(mock_state_node_cls):
+        pass
+
+    @ETLNode.register_transition(from_={'running': False}, to={'running': True})
+    def start_job(node):
+        pass
+
+    @ETLNode.register_transition(from_={'running': True}, to={'running': False})
+    def stop_job(node):
+        pass
+
+    @ETLNode.register_transition(from_={'running': False, 'location': 'America/East'}, to={'location': 'America/West'})
+    def move_to_cali(node):
+        pass
+
+    def register_pipeline_validation(name):
+        @state_graph_cls.register_validation(reads=[f'/{name}/*'])
+        def extract_runs_when_transform_runs(graph):
+            if graph.nodes[f'/{name}/transform'].state['running'] and not (
+                graph.nodes[f'/{name}/extract/likes'].state['running'] and graph.nodes[f'/{name}/extract/comments'].state['running']
+            ):
+                raise ValidationError("extract jobs have to be running when transform is running")
+
+    def build(names, location, **transform_state):
+        sg = state_graph_cls()
+        for name in names:
+            sg.add_nodes([
+                ETLNode(path=f'/{name}/extract/likes', running=True, location=location),
+                ETLNode(path=f'/{name}/extract/comments', running=True, location=location),
+                ETLNode(path=f'/{name}/transform', **{'running': True, 'location': location, **transform_state}),
+            ])
+            sg.add_edges([
+                (f'/{name}/extract/likes', f'/{name}/transform'),
+                (f'/{name}/extract/comments', f'/{name}/transform'),
+            ])
+        return sg
+
+    build.register_pipeline_validation = register_pipeline_validation
+    return build
+
+
+def test_state_graph_independent_clusters(pipelines, state_graph_cls):
+    pipelines.register_pipeline_validation('a')
+    pipelines.register_pipeline_validation('b')
+    sg = pipelines(['a', 'b'], 'America/East')
+
+    validation_a, validation_b = state_graph_cls.get_validation_functions(sg)
+    assert sg.validation_footprint(validation_a) == {'/a/extract/likes', '/a/extract/comments', '/a/transform'}
+    assert sg.independent_clusters() == [
+        ('/',),
+        ('/a/extract/comments', '/a/extract/likes', '/a/transform'),
+        ('/b/extract/comments', '/b/extract/likes', '/b/transform'),
+    ]
+
+    # subgraphs only keep their own nodes, edges and validations
+    subgraph = sg.subgraph(('/a/extract/comments', '/a/extract/likes', '/a/transform'))
+    assert set(subgraph.nodes) == {'/a/extract/comments', '/a/extract/likes', '/a/transform'}
+    assert subgraph.nodes['/a/transform'] is sg.nodes['/a/transform']
+    assert sorted(subgraph.topology.edges()) == [
+        ('/a/extract/comments', '/a/transform'),
+        ('/a/extract/likes', '/a/transform'),
+    ]
+    assert subgraph.get_validation_functions() == [validation_a]
+    assert subgraph.snapshot().get_validation_functions() == [validation_a]
+
+    # a validation that could look anywhere ties everything together
+    @state_graph_cls.register_validation
+    def validate(graph):
+        pass
+
+    assert sg.independent_clusters() == [sg.node_order()]
+
+
+def test_state_graph_decomposed_search(pipelines, state_graph_cls):
+    pipelines.register_pipeline_validation('a')
+    pipelines.register_pipeline_validation('b')
+    east = pipelines(['a', 'b'], 'America/East')
+    west = pipelines(['a', 'b'], 'America/West')
+
+    get_transitions_and_neighbors = state_graph_cls.get_transitions_and_neighbors
+    with mock.patch.object(
+            state_graph_cls, 'get_transitions_and_neighbors',
+            autospec=True, side_effect=get_transitions_and_neighbors
+    ) as expand:
+        monolithic = east.take_shortest_path_to(west, dry_run=True)
+        monolithic_expansions = expand.call_count
+        expand.reset_mock()
+        decomposed = east.take_shortest_path_to(west, dry_run=True, decompose=True)
+        decomposed_expansions = expand.call_count
+
+    assert len(monolithic) == len(decomposed) == 18
+    assert decomposed_expansions < monolithic_expansions
+
+    # pipeline a gets done, then pipeline b
+    assert [step['node'].split('/')[1] for step in decomposed] == ['a'] * 9 + ['b'] * 9
+
+    # and it all works with other strategies too
+    assert len(east.take_shortest_path_to(west, dry_run=True, decompose=True, strategy='bidirectional')) == 18
+
+
+def test_state_graph_decomposed_search_with_invalid_clusters(pipelines, state_graph_cls):
+    pipelines.register_pipeline_validation('a')
+    pipelines.register_pipeline_validation('b')
+
+    # pipeline b's transform is running without its extracts, so nothing else can happen until that's fixed
+    current = pipelines(['a', 'b'], 'America/East', running=False)
+    current.nodes['/b/transform'].state['running'] = True
+    current.nodes['/b/extract/likes'].state['running'] = False
+    desired = pipelines(['a', 'b'], 'America/East')
+    steps = current.take_shortest_path_to(desired, dry_run=True, decompose=True)
+    assert [step['node'] for step in steps] == ['/b/extract/likes', '/a/transform']
+    assert steps == current.take_shortest_path_to(desired, dry_run=True)
+
+    # if both are broken, there's no way out
+    current.nodes['/a/transform'].state['running'] = True
+    current.nodes['/a/extract/likes'].state['running'] = False
+    assert current.take_shortest_path_to(desired, dry_run=True, decompose=True) == []
+    assert current.take_shortest_path_to(desired, dry_run=True) == []
+
+
+def test_state_graph_partial_order(pipelines, state_graph_cls):
+    pipelines.register_pipeline_validation('a')
+    pipelines.register_pipeline_validation('b')
+    east = pipelines(['a', 'b'], 'America/East')
+    west = pipelines(['a', 'b'], 'America/West')
+
+    steps = east.take_shortest_path_to(west, dry_run=True, decompose=True)
+    transitions = [
+        (step['node'], tuple(sorted(step['from_state'].items())), tuple(sorted(step['to_state'].items())))
+        for step in steps
+    ]
+    partial_order = east.get_partial_order(transitions)
+    assert [partial_order.nodes[index]['transition'] for index in range(len(transitions))] == transitions
+
+    # the two pipelines don't have to wait on each other, but everything in a pipeline happens in order
+    for earlier, later in partial_order.edges():
+        assert earlier < later
+        assert transitions[earlier][0].split('/')[1] == transitions[later][0].split('/')[1]
+    layers = east.get_layers(transitions)
+    assert len(layers) == 9
+    assert all(
+        sorted(transitions[index][0].split('/')[1] for index in layer) == ['a', 'b']
+        for layer in layers
+    )
+
+    results = east.take_shortest_path_to(west, dry_run=True, decompose=True, max_workers=2)
+    assert [{key: value for key, value in result.items() if key != 'layer'} for result in results] == steps
+    assert [result['layer'] for result in results] == list(range(9)) * 2
+
+    # a validation that looks at everything puts everything in order
+    @state_graph_cls.register_validation
+    def validate(graph):
+        pass
+
+    assert east.get_layers(transitions) == [[index] for index in range(len(transitions))]
+
+
+def test_state_graph_partial_order_follows_edges(mock_state_node_cls, state_graph_cls):
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(3)])
+    sg.add_edges([('/child0', '/child1')])
+    transitions = [
+        ('/child1', (), (('blah', 'blah'),)),
+        ('/child2', (), (('blah', 'blah'),)),
+        ('/child0', (), (('blah', 'blah'),)),
+        ('/child2', (('blah', 'blah'),), (('blah', None),)),
+    ]
+    assert sorted(sg.get_partial_order(transitions).edges()) == [(0, 2), (1, 3)]
+    assert sg.get_layers(transitions) == [[0, 1], [2, 3]]
+
+
+def test_state_graph_runs_layers_concurrently(mock_state_node_cls, state_graph_cls):
+    barrier = threading.Barrier(3, timeout=5)
+
+    @mock_state_node_cls.register_transition(from_={}, to={'blah': 'blah'})
+    def transition(node):
+        # all three have to be running at once to get past this
+        barrier.wait()
+        return node.path_string
+
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(2)])
+    sg2 = state_graph_cls()
+    sg2.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child', blah='blah') for i in range(2)])
+    sg2.nodes['/'].state['blah'] = 'blah'
+
+    results = sg.take_shortest_path_to(sg2, max_workers=3)
+    assert len(results) == 3
+    assert all('exception' not in result for result in results)
+    assert sorted(result['execution_result'] for result in results) == ['/', '/child0', '/child1']
+    assert [result['layer'] for result in results] == [0, 0, 0]
+
+
+def test_state_graph_layers_stop_after_failures(mock_state_node_cls, state_graph_cls):
+    @mock_state_node_cls.register_transition(from_={'name': 'child'}, to={'name': 'grown up'})
+    def grow_up(node):
+        if node.path_string == '/child0':
+            raise Exception('not yet')
+
+    @mock_state_node_cls.register_transition(from_={'name': 'grown up'}, to={'name': 'old'})
+    def grow_old(node):
+        pass
+
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(2)])
+    sg2 = state_graph_cls()
+    sg2.add_nodes([mock_state_node_cls(path=f'/child{i}', name='old') for i in range(2)])
+
+    # child0 never grew up, so it can't grow old either
+    results = {
+        (result['node'], result['layer']): result
+        for result in sg.take_shortest_path_to(sg2, max_workers=2)
+    }
+    assert sorted(results) == [('/child0', 0), ('/child0', 1), ('/child1', 0), ('/child1', 1)]
+    assert str(results[('/child0', 0)]['exception']) == 'not yet'
+    assert isinstance(results[('/child0', 1)]['exception'], ValueError)
+    assert 'exception' not in results[('/child1', 0)]
+    assert 'exception' not in results[('/child1', 1)]
+
+    # and once we're somewhere invalid, nothing else runs
+    @state_graph_cls.register_validation(reads=['/child0', '/child1'])
+    def validate(graph):
+        if graph.nodes['/child0'].state['name'] == 'child' and graph.nodes['/child1'].state['name'] != 'child':
+            raise ValidationError("child1 can't grow up before child0")
+
+    results = sg.take_shortest_path_to(sg2, max_workers=2)
+    assert [(result['node'], result['to_state'], result['layer']) for result in results[:2]] == [
+        ('/child0', {'name': 'grown up'}, 0),
+        ('/child1', {'name': 'grown up'}, 1),
+    ]
+    assert str(results[0]['exception']) == 'not yet'
+    assert 'exception' not in results[1]
+    assert [type(result['exception']) for result in results[2:]] == [ValidationError, ValidationError]
+
+
+def test_state_graph_streams_results_and_replans(mock_state_node_cls, state_graph_cls):
+    calls = []
+    failures = ['not yet']
+
+    @mock_state_node_cls.register_transition(from_={'name': 'child'}, to={'name': 'grown up'})
+    def grow_up(node):
+        calls.append(node.path_string)
+        if node.path_string == '/child0' and failures:
+            raise Exception(failures.pop())
+
+    @mock_state_node_cls.register_transition(from_={'name': 'grown up'}, to={'name': 'old'})
+    def grow_old(node):
+        calls.append(node.path_string)
+
+    def build(*names):
+        sg = state_graph_cls()
+        sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name=name) for i, name in enumerate(names)])
+        return sg
+
+    sg, sg2 = build('child', 'child'), build('old', 'old')
+    transitions = sg._find_transitions(sg2, 'a_star', False)
+    failing = [transition[0] for transition in transitions].index('/child0')
+
+    # results come out as each transition is done, not once they all are
+    results = sg.iter_shortest_path_to(sg2)
+    first = next(results)
+    assert len(calls) == 1 and first['attempt'] == 0
+
+    # and nothing runs after the first failure
+    results = [first] + list(results)
+    assert len(results) == len(calls) == failing + 1
+    assert str(results[-1]['exception']) == 'not yet'
+
+    # or we plan again from where that left us
+    calls.clear()
+    failures.append('not yet')
+    results = list(sg.iter_shortest_path_to(sg2, replan=1))
+    assert [result['attempt'] for result in results] == [0] * (failing + 1) + [1] * (len(transitions) - failing)
+    assert all('exception' not in result for result in results[failing + 1:])
+    assert calls.count('/child0') == 3
+
+    # from what things actually look like by then, if we can tell
+    calls.clear()
+    failures.append('not yet')
+    results = list(sg.iter_shortest_path_to(sg2, replan=1, observe=lambda: build('old', 'grown up')))
+    assert [(result['node'], result['attempt']) for result in results[failing + 1:]] == [('/child1', 1)]
+
+    # dry runs don't fail
+    assert len(list(sg.iter_shortest_path_to(sg2, dry_run=True))) == len(transitions) == 4
+
+
+def test_state_graph_async_reconciliation(mock_state_node_cls, state_graph_cls):
+    running = set()
+    overlapped = []
+
+    @mock_state_node_cls.register_transition(from_={}, to={'blah': 'blah'})
+    async def transition(node):
+        running.add(node.path_string)
+        await asyncio.sleep(0.01)
+        overlapped.append(len(running))
+        running.discard(node.path_string)
+        return node.path_string
+
+    @mock_state_node_cls.register_transition(from_={'blah': 'blah'}, to={'blah': None})
+    def untransition(node):
+        # plain transitions don't get to block the event loop
+        return threading.current_thread() is threading.main_thread()
+
+    loop_threads = []
+
+    @mock_state_node_cls.register_validation
+    async def validate(node):
+        loop_threads.append(threading.current_thread())
+
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(3)])
+    sg2 = state_graph_cls()
+    sg2.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child', blah='blah') for i in range(3)])
+
+    results = asyncio.run(sg.take_shortest_path_to_async(sg2))
+    assert sorted(result['execution_result'] for result in results) == ['/child0', '/child1', '/child2']
+    assert [result['layer'] for result in results] == [0, 0, 0]
+    assert max(overlapped) == 3
+    # async validations run on the event loop, even when the search calls them from its worker thread
+    assert set(loop_threads) == {threading.main_thread()}
+
+    overlapped.clear()
+    results = asyncio.run(sg.take_shortest_path_to_async(sg2, max_concurrency=1))
+    assert len(results) == 3
+    assert max(overlapped) == 1
+
+    results = asyncio.run(sg2.take_shortest_path_to_async(sg))
+    assert [result['execution_result'] for result in results] == [False, False, False]
+
+    # the synchronous api runs coroutines too
+    results = sg.take_shortest_path_to(sg2)
+    assert sorted(result['execution_result'] for result in results) == ['/child0', '/child1', '/child2']
+
+
+def test_state_graph_async_reconciliation_failures(mock_state_node_cls, state_graph_cls):
+    @mock_state_node_cls.register_transition(from_={'name': 'child'}, to={'name': 'grown up'})
+    async def grow_up(node):
+        if node.path_string == '/child0':
+            raise Exception('not yet')
+
+    @mock_state_node_cls.register_transition(from_={'name': 'grown up'}, to={'name': 'old'})
+    async def grow_old(node):
+        pass
+
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(2)])
+    sg2 = state_graph_cls()
+    sg2.add_nodes([mock_state_node_cls(path=f'/child{i}', name='old') for i in range(2)])
+
+    results = {
+        (result['node'], result['layer']): result
+        for result in asyncio.run(sg.take_shortest_path_to_async(sg2))
+    }
+    assert str(results[('/child0', 0)]['exception']) == 'not yet'
+    assert isinstance(results[('/child0', 1)]['exception'], ValueError)
+    assert 'exception' not in results[('/child1', 1)]
+
+    results = asyncio.run(sg.take_shortest_path_to_async(sg2, dry_run=True))
+    assert [result['execution_result'] for result in results] == [{'dry_run': True}] * 4
+    assert sg.nodes['/child0'].state['name'] == 'child'
+
+
+def test_state_graph_validations_only_rerun_for_nodes_they_read(mock_state_node_cls, state_graph_cls):
+    calls = {'declared': 0, 'tracked': 0}
+
+    @state_graph_cls.register_validation(reads=['/child0'])
+    def validate_declared(graph):
+        calls['declared'] += 1
+
+    @state_graph_cls.register_validation
+    def validate_tracked(graph):
+        calls['tracked'] += 1
+        if graph.nodes['/child1'].state.get('blah') == 'bad':
+            raise ValidationError('child1 is bad')
+
+    @mock_state_node_cls.register_transition(from_={}, to={'blah': 'blah'})
+    def transition(node):
+        pass
+
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(3)])
+    start = sg.snapshot()
+    assert start.is_valid()
+    assert calls == {'declared': 1, 'tracked': 1}
+
+    # each neighbor changes one node, so each validation only runs again for the one node it read
+    neighbors = start.get_transitions_and_neighbors()
+    assert len(neighbors) == 4
+    assert calls == {'declared': 2, 'tracked': 2}
+    assert start._validation_outcomes()[1][1] == frozenset(['/child1'])
+
+    # and failures are carried along too
+    sg.nodes['/child1'].state['blah'] = 'bad'
+    start = sg.snapshot()
+    assert str(start.validation_error()) == 'child1 is bad'
+    neighbors = start.get_transitions_and_neighbors()
+    assert list(neighbors) == [('/child1', (), (('blah', 'blah'),))]
+    assert calls == {'declared': 4, 'tracked': 4}
+
+
+def test_state_graph_tracks_reads_through_the_graph(mock_state_node_cls, state_graph_cls):
+    def running(graph):
+        return {node.path_string: node.state.get('running') for node in graph.graph.nodes()}
+
+    @state_graph_cls.register_validation
+    def validate_nothing_broken(graph):
+        if any(state == 'broken' for state in running(graph).values()):
+            raise ValidationError('something is broken')
+
+    @state_graph_cls.register_validation
+    def validate_sink_needs_source(graph):
+        states = running(graph)
+        if states['/sink'] and not states['/source']:
+            raise ValidationError("the sink can't run without the source")
+
+    mock_state_node_cls.register_transition(from_={'running': False}, to={'running': True})(lambda node: None)
+
+    def build(source, sink):
+        sg = state_graph_cls()
+        sg.add_nodes([
+            mock_state_node_cls(path='/source', running=source), mock_state_node_cls(path='/sink', running=sink)
+        ])
+        return sg
+
+    # both validations read everything through the graph, and each gets to say so
+    start = build(False, False).snapshot()
+    assert [reads for _, reads in start._validation_outcomes()] == [frozenset(['/', '/source', '/sink'])] * 2
+    assert start.take_shortest_path_to(build(False, True), dry_run=True) == []
+
+
+def test_state_graph_memoized_validations(mock_state_node_cls, state_graph_cls):
+    calls = {'declared': 0, 'tracked': 0}
+
+    @state_graph_cls.register_validation(reads=['/child0'], memo_size=100)
+    def validate_declared(graph):
+        calls['declared'] += 1
+
+    @state_graph_cls.register_validation(memo_size=100)
+    def validate_tracked(graph):
+        calls['tracked'] += 1
+        if graph.nodes['/child1'].state.get('blah') == 'blah':
+            raise ValidationError('child1 is blah')
+
+    @mock_state_node_cls.register_transition(from_={}, to={'blah': 'blah'})
+    def transition(node):
+        pass
+
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(3)])
+    neighbors = sg.get_transitions_and_neighbors()
+    assert len(neighbors) == 3
+    assert calls == {'declared': 2, 'tracked': 2}
+
+    # a different branch looking at the same states gets the outcomes, failures included, from the memos
+    for neighbor in neighbors.values():
+        neighbor.get_transitions_and_neighbors()
+    assert calls == {'declared': 2, 'tracked': 2}
+    assert validate_tracked.memo.read_sets == {('/child1',): None}
+    assert validate_tracked.memo.misses == 2
+    assert validate_tracked.memo.hits > 0
+
+    new_sg = state_graph_cls()
+    new_sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(3)])
+    new_sg.nodes['/child1'].state['blah'] = 'blah'
+    assert str(new_sg.validation_error()) == 'child1 is blah'
+    assert calls == {'declared': 2, 'tracked': 2}
+
+
+def test_state_graph_builds_neighbor_nodes_lazily(mock_state_node_cls, state_graph_cls):
+    @mock_state_node_cls.register_transition(from_={}, to={'blah': 'blah'})
+    def transition(node):
+        pass
+
+    sg = state_graph_cls()
+    sg.add_nodes([mock_state_node_cls(path=f'/child{i}', name='child') for i in range(2)])
+    neighbors = sg.get_transitions_and_neighbors()
+    neighbor = neighbors[('/child0', (), (('blah', 'blah'),))]
+
+    # nothing's looked at the new node yet
+    assert neighbor.nodes._node is None
+    assert neighbor.state_vector()[neighbor.node_order().index('/child0')] == neighbor.nodes._node_state[1]
+    assert neighbor.nodes['/child0'].state == {'name': 'child', 'blah': 'blah'}
+    assert neighbor.nodes['/child0'] is neighbor.nodes._node
+
+
+@pytest.mark.parametrize('strategy, search_options', [
+    ('ida_star', {}),
+    ('sma_star', {}),
+    ('sma_star', {'max_states': 12}),
+])
+def test_state_graph_memory_bounded_search(etl_graphs, strategy, search_options):
+    east, west = etl_graphs
+    plan = east.take_shortest_path_to(west, dry_run=True, strategy=strategy, **search_options)
+    assert len(plan) == 9
+
+    transitions = [
+        (step['node'], tuple(sorted(step['from_state'].items())), tuple(sorted(step['to_state'].items())))
+        for step in plan
+    ]
+    assert _follow(east, transitions).fingerprint() == west.fingerprint()
+    assert east.take_shortest_path_to(east, strategy=strategy, **search_options) == []
+
+
+@pytest.mark.parametrize('strategy, search_options', [
+    ('ida_star', {}),
+    ('sma_star', {}),
+])
+def test_state_graph_memory_bounded_search_edge_cases(etl_graphs, strategy, search_options):
+    east, west = etl_graphs
+
+    # nothing moves us back east
+    assert west.take_shortest_path_to(east, strategy=strategy, **search_options) == []
+
+    # even with zero guessing
+    plan = east.take_shortest_path_to(west, dry_run=True, strategy=strategy, heuristic=heuristics.zero)
+    assert len(plan) == 9
+
+    with pytest.raises(Exception, match='maximum number of iterations'):
+        east.take_shortest_path_to(west, strategy=strategy, max_iterations=5, **search_options)
+
+
+def test_state_graph_sma_star_runs_out_of_memory(etl_graphs):
+    east, west = etl_graphs
+
+    # a plan of 9 transitions needs 10 states in memory at once
+    assert len(east.take_shortest_path_to(west, strategy='sma_star', max_states=10)) == 9
+    assert east.take_shortest_path_to(west, strategy='sma_star', max_states=9) == []
+
+
+@pytest.fixture()
+def detour_graphs(clean_transitions, state_graph_cls, mock_state_node_cls):
+    """Two ways to the goal: a short one through s1 and s2, and a long one through l1 to l4 that a (still
+    admissible) heuristic makes look better"""
+    routes = [['start', 's1', 's2', 'goal'], ['start', 'l1', 'l2', 'l3', 'l4', 'goal']]
+    for route in routes:
+        for from_step, to_step in zip(route, route[1:]):
+            mock_state_node_cls.register_transition(from_={'step': from_step}, to={'step': to_step})(
+                lambda node: None
+            )
+
+    guesses = {'start': 3, 's1': 2, 's2': 1, 'l1': 1, 'l2': 1, 'l3': 1, 'l4': 1, 'goal': 0}
+
+    def heuristic(state_graph, desired_state_graph):
+        return guesses[state_graph.nodes['/a'].state['step']]
+
+    def build(step):
+        sg = state_graph_cls()
+        sg.add_nodes([mock_state_node_cls(path='/a', name='a', step=step)])
+        return sg
+
+    return build('start'), build('goal'), heuristic
+
+
+def test_state_graph_anytime_search_improves_its_plan(detour_graphs):
+    start, goal, heuristic = detour_graphs
+
+    report = {}
+    plan = start.take_shortest_path_to(goal, dry_run=True, strategy='anytime', heuristic=heuristic, report=report)
+    assert [step['to_state']['step'] for step in plan] == ['s1', 's2', 'goal']
+    assert report['solutions'] == 2
+    assert (report['cost'], report['bound'], report['optimal']) == (3, 1.0, True)
+
+    # out of budget right after the detour: we still get it, and know it's at most 5/3 as long as it has to be
+    report = {}
+    plan = start.take_shortest_path_to(
+        goal, dry_run=True, strategy='anytime', heuristic=heuristic, max_iterations=5, report=report
+    )
+    assert [step['to_state']['step'] for step in plan] == ['l1', 'l2', 'l3', 'l4', 'goal']
+    assert (report['cost'], report['bound'], report['optimal']) == (5, 5 / 3, False)
+
+    # before any plan there's nothing to go with
+    with pytest.raises(Exception, match='maximum number of iterations'):
+        start.take_shortest_path_to(goal, strategy='anytime', heuristic=heuristic, max_iterations=4)
+
+    # the clock works the same way. each look at it is a second later here
+    with mock.patch('stateman.search.time.monotonic', side_effect=itertools.count()):
+        plan = start.take_shortest_path_to(goal, strategy='anytime', heuristic=heuristic, time_budget=5.5)
+    assert len(plan) == 5
+    with mock.patch('stateman.search.time.monotonic', side_effect=itertools.count()):
+        with pytest.raises(Exception, match='time budget'):
+            start.take_shortest_path_to(goal, strategy='anytime', heuristic=heuristic, time_budget=2.5)
+
+    # without any weight, it's just A*
+    report = {}
+    plan = start.take_shortest_path_to(goal, strategy='anytime', heuristic=heuristic, weight=1, report=report)
+    assert (len(plan), report['solutions']) == (3, 1)
+
+    report = {}
+    assert goal.take_shortest_path_to(start, strategy='anytime', report=report) == []
+    assert report['solutions'] == 0
+    assert start.take_shortest_path_to(start, strategy='anytime') == []
+
+
+def test_state_graph_search_stats(etl_graphs):
+    east, west = etl_graphs
+    expanded, generated, goals = [], [], []
+    stats = SearchStats(
+        on_expand=expanded.append,
+        on_generate=lambda transition, state_graph: generated.append(transition),
+        on_goal=goals.append,
+        trace_memory=True,
+    )
+
+    plan = east.take_shortest_path_to(west, stats=stats)
+    assert len(plan) == 9
+    assert [[transition[0] for transition in goal] for goal in goals] == [[result['node'] for result in plan]]
+    assert stats.expanded == len(expanded) > 0
+    assert stats.generated == len(generated) >= stats.expanded
+    assert stats.duplicates > 0
+    assert stats.peak_frontier > 0
+    assert stats.peak_memory > 0
+    assert stats.total_time >= stats.neighbor_time >= stats.validation_time > 0
+    assert stats.heuristic_time > 0
+
+    # the graph validation ran once per neighbor that changed transform or an extract job, which is all of them
+    summary = stats.as_dict()
+    (name, (calls, seconds)), = summary['validations'].items()
+    assert name.endswith('extract_runs_when_transform_runs')
+    assert calls > 0 and seconds > 0
+
+    # stats add up across searches, and every strategy takes them
+    for strategy in ('bidirectional', 'ida_star', 'sma_star', 'anytime'):
+        expanded_before = stats.expanded
+        assert len(east.take_shortest_path_to(west, strategy=strategy, stats=stats)) == 9
+        assert stats.expanded > expanded_before
+    assert len(goals) == 5
+
+    # they don't keep the plan cache from working either
+    cache = PlanCache()
+    east.take_shortest_path_to(west, plan_cache=cache, stats=SearchStats())
+    east.take_shortest_path_to(west, plan_cache=cache, stats=SearchStats())
+    assert cache.hits == 1
+
+
+@pytest.mark.parametrize('search_options', [
+    {'processes': 2},
+    {'processes': 3, 'batch_size': 1},
+    {'processes': 2, 'decompose': True},
+])
+def test_state_graph_parallel_search(etl_graphs, search_options):
+    east, west = etl_graphs
+
+    # the node classes here are local to the fixture, which forked workers don't mind
+    stats = SearchStats()
+    plan = east.take_shortest_path_to(
+        west, dry_run=True, strategy='parallel_a_star', mp_context='fork', stats=stats, **search_options
+    )
+    assert len(plan) == 9
+    assert stats.expanded >= 9 and stats.generated > 0
+
+    transitions = [
+        (step['node'], tuple(sorted(step['from_state'].items())), tuple(sorted(step['to_state'].items())))
+        for step in plan
+    ]
+    assert _follow(east, transitions).fingerprint() == west.fingerprint()
+    assert west.take_shortest_path_to(east, strategy='parallel_a_star', mp_context='fork', processes=2) == []
+
+    with pytest.raises(Exception, match='maximum number of iterations'):
+        east.take_shortest_path_to(west, strategy='parallel_a_star', mp_context='fork', max_iterations=5)
+
+
+def test_state_graph_lazy_search(etl_graphs):
+    east, west = etl_graphs
+    eager_stats, lazy_stats = SearchStats(), SearchStats()
+    eager = east.take_shortest_path_to(west, dry_run=True, stats=eager_stats)
+    lazy = east.take_shortest_path_to(west, dry_run=True, lazy=True, stats=lazy_stats)
+    assert len(lazy) == len(eager) == 9
+
+    # neighbors that never got popped never got validated
+    def validation_calls(stats):
+        return sum(calls for calls, _ in stats.as_dict()['validations'].values())
+
+    assert validation_calls(lazy_stats) < validation_calls(eager_stats)
+    assert lazy_stats.generated > eager_stats.generated
+
+    transitions = [
+        (step['node'], tuple(sorted(step['from_state'].items())), tuple(sorted(step['to_state'].items())))
+        for step in lazy
+    ]
+    assert _follow(east, transitions).fingerprint() == west.fingerprint()
+    assert west.take_shortest_path_to(east, lazy=True) == []
+
+    # neighbors come out one at a time, and can skip validating
+    neighbors = east.iter_transitions_and_neighbors(validate=False)
+    assert not isinstance(neighbors, dict)
+    candidates = dict(neighbors)
+    assert {
+        transition for transition, neighbor in candidates.items() if neighbor.is_valid()
+    } == set(east.get_transitions_and_neighbors())
+
+
+def test_state_graph_prunes_transitions_that_cant_help(state_graph_cls, transition_node_cls):
+    # nothing ever wants a color
+    transition_node_cls.register_transition(from_={'name': 'pre-transition'}, to={'color': 'red'})(lambda node: None)
+
+    def build(name):
+        sg = state_graph_cls()
+        sg.add_nodes([
+            transition_node_cls(path='/moving', name=name),
+            transition_node_cls(path='/still', name='pre-transition'),
+        ])
+        return sg
+
+    start, goal = build('pre-transition'), build('post-transition')
+    relevant = start.relevant_transitions(goal)
+    assert relevant['/still'] == frozenset()
+    # 'something_else' and 'blah' come along with getting there, so what takes them away again stays
+    assert {to_state for _, to_state in relevant['/moving']} == {
+        (('name', 'post-transition'), ('something_else', 'something')),
+        (('something_else', None),),
+        (('blah', 'blah'),),
+        (('blah', 'blah'), ('name', 'post-transition')),
+    }
+
+    stats = SearchStats()
+    plan = start.take_shortest_path_to(goal, dry_run=True, stats=stats)
+    assert [step['to_state'] for step in plan] == [
+        {'name': 'post-transition', 'something_else': 'something'}, {'something_else': None},
+    ]
+    assert stats.pruned == 6
+
+    # searches that can outlive where they started don't prune anything
+    stats = SearchStats()
+    assert len(start.take_shortest_path_to(goal, dry_run=True, strategy='d_star_lite', stats=stats)) == 2
+    assert stats.pruned == 0
+
+    # once a validation looks at both, the still node might have to make way
+    state_graph_cls.register_validation(lambda graph: None, reads=['/moving', '/still'])
+    stats = SearchStats()
+    assert len(start.take_shortest_path_to(goal, dry_run=True, strategy='bidirectional', stats=stats)) == 2
+    assert stats.pruned == 0
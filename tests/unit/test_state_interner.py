@@ -0,0 +1,93 @@
+import sys
+import threading
+
+import pytest
+
+from stateman.utils import StateInterner, ValidationMemo, global_state_interners
+
+
+def test_interner_hands_out_one_bit_per_pair():
+    interner = StateInterner()
+    assert interner.bit('status', 'up') == 1
+    assert interner.bit('status', 'down') == 2
+    assert interner.bit('datacenter', 'boston') == 4
+    assert interner.bit('status', 'up') == 1
+    assert interner.pairs == [('status', 'up'), ('status', 'down'), ('datacenter', 'boston')]
+
+
+def test_interner_masks_states():
+    interner = StateInterner()
+    up_in_boston = interner.mask({'status': 'up', 'datacenter': 'boston'})
+    down_in_boston = interner.mask({'datacenter': 'boston', 'status': 'down'})
+
+    # order of keys doesn't matter, values do
+    assert up_in_boston == interner.mask({'datacenter': 'boston', 'status': 'up'})
+    assert up_in_boston != down_in_boston
+    assert interner.mask({}) == 0
+
+    # shared pairs are a mask AND away
+    assert interner.unmask(up_in_boston & down_in_boston) == {'datacenter': 'boston'}
+    assert interner.unmask(up_in_boston) == {'status': 'up', 'datacenter': 'boston'}
+    assert interner.unmask(0) == {}
+
+
+def test_node_state_mask_is_interned_per_class(server_node_cls, job_node_cls):
+    server = server_node_cls.create('/server')
+    job = job_node_cls.create('/job')
+    assert server.state_mask == global_state_interners[server_node_cls].mask({'status': 'up'})
+    assert job.state_mask == global_state_interners[job_node_cls].mask({'status': 'stopped'})
+    assert global_state_interners[server_node_cls] is not global_state_interners[job_node_cls]
+
+    server.state['datacenter'] = 'boston'
+    assert global_state_interners[server_node_cls].unmask(server.state_mask) == {'status': 'up', 'datacenter': 'boston'}
+
+
+def test_interner_takes_containers(clean_transitions, state_graph_cls, mock_state_node_cls):
+    interner = StateInterner()
+    tagged = interner.mask({'tags': ['x', 'y'], 'labels': {'team': ['data']}, 'zones': {'a'}})
+    assert tagged == interner.mask({'zones': {'a'}, 'labels': {'team': ['data']}, 'tags': ['x', 'y']})
+    assert interner.mask({'tags': ('x', 'y')}) != interner.mask({'tags': ['x', 'y']})
+    assert interner.unmask(tagged) == {'tags': ['x', 'y'], 'labels': {'team': ['data']}, 'zones': {'a'}}
+    with pytest.raises(TypeError, match='tags'):
+        interner.mask({'tags': [bytearray(b'x')]})
+
+    # so nodes with them can be planned for
+    mock_state_node_cls.register_transition(from_={'running': False}, to={'running': True})(lambda node: None)
+    sg, sg2 = state_graph_cls(), state_graph_cls()
+    sg.add_nodes([mock_state_node_cls.create('/a', tags=['x', 'y'], running=False)])
+    sg2.add_nodes([mock_state_node_cls.create('/a', tags=['x', 'y'], running=True)])
+    assert [result['to_state'] for result in sg.take_shortest_path_to(sg2, dry_run=True)] == [{'running': True}]
+
+
+def test_interner_and_memo_can_be_shared_between_threads():
+    interner = StateInterner()
+    memo = ValidationMemo(maxsize=8)
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def search(thread):
+        barrier.wait()
+        try:
+            for i in range(200):
+                interner.bit('status', (thread, i))
+                memo.store(('key', thread, i), None, read_paths=('/', str(thread)))
+                memo.lookup(('key', thread, j) for j in range(i - 8, i + 1))
+        except Exception as e:
+            errors.append(e)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=search, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    # every pair got a bit of its own, and unmasks back to itself
+    assert not errors
+    assert len(interner.pairs) == len(set(interner.bits.values())) == 8 * 200
+    assert all(interner.unmask(bit) == dict([pair]) for pair, bit in interner.bits.items())
+    assert len(memo) == 8
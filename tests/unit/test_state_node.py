@@ -130,3 +130,101 @@ def test_node_respects_validations(transition_node_cls):
             }
         }
     })
+
+
+def test_node_finds_previous_transitions(transition_node_cls):
+    node = transition_node_cls.create('/sample/node', name='post-transition', blah='blah')
+    predecessors = node.get_transitions_and_predecessors()
+    assert {
+        from_state: {to_state: [predecessor.state for predecessor in stuff[to_state]] for to_state in stuff}
+        for from_state, stuff in predecessors.items()
+    } == {
+        # 'blah' could have been 'blah' already, it's a key we've seen
+        (('name', 'pre-transition'),): {
+            (('blah', 'blah'), ('name', 'post-transition')): [
+                {'name': 'pre-transition'},
+                {'name': 'pre-transition', 'blah': 'blah'},
+            ],
+        },
+        (('name', 'post-transition'),): {
+            (('blah', 'blah'),): [
+                {'name': 'post-transition'},
+                {'name': 'post-transition', 'blah': 'blah'},
+            ],
+        },
+        # and we could always have just dropped 'something_else'
+        (('something_else', 'something'),): {
+            (('something_else', None),): [
+                {'name': 'post-transition', 'blah': 'blah', 'something_else': 'something'},
+            ],
+        },
+    }
+    for stuff in predecessors.values():
+        for to_state, nodes in stuff.items():
+            for predecessor in nodes:
+                assert predecessor.path == node.path
+                assert predecessor.get_transitions_and_neighbors()
+
+    # invalid nodes can't be transitioned into
+    @transition_node_cls.register_validation
+    def mock_validate(node):
+        if 'blah' in node.state:
+            raise ValidationError()
+
+    assert node.get_transitions_and_predecessors() == {}
+
+
+def test_node_neighbors_are_cached_per_state(transition_node_cls):
+    calls = []
+
+    @transition_node_cls.register_validation
+    def mock_validate(node):
+        calls.append(node.path_string)
+
+    node = transition_node_cls.create(path='/node/for/test')
+    neighbor_masks = node.get_transitions_and_neighbor_masks()
+    validated = len(calls)
+    assert validated == len(neighbor_masks) > 0
+
+    # the same node in the same state gets the same neighbors without validating them again
+    again = transition_node_cls.create(path='/node/for/test')
+    assert again.get_transitions_and_neighbor_masks() is neighbor_masks
+    assert len(calls) == validated
+
+    # validations can look at the path, so a node somewhere else gets its own
+    other = transition_node_cls.create(path='/some/other/node')
+    assert other.get_transitions_and_neighbor_masks() == neighbor_masks
+    assert {
+        neighbor.path_string for stuff in other.get_transitions_and_neighbors().values() for neighbor in stuff.values()
+    } == {'/some/other/node'}
+    assert len(calls) == validated * 2
+
+    # until validations change
+    @transition_node_cls.register_validation
+    def mock_validate_2(node):
+        if node.state.get('blah') == 'blah':
+            raise ValidationError()
+
+    new_neighbor_masks = node.get_transitions_and_neighbor_masks()
+    assert len(calls) == validated * 3
+    assert len(new_neighbor_masks) < len(neighbor_masks)
+
+
+def test_node_neighbors_respect_validations_on_the_path(clean_transitions, state_graph_cls, mock_state_node_cls):
+    class Server(mock_state_node_cls):
+        pass
+
+    Server.register_transition(from_={'up': True}, to={'up': False})(lambda node: None)
+
+    @Server.register_validation
+    def prod_stays_up(node):
+        if node.path_string == '/prod' and not node.state['up']:
+            raise ValidationError('prod has to stay up')
+
+    def build(up):
+        sg = state_graph_cls()
+        sg.add_nodes([Server(path=node_path, up=up) for node_path in ('/dev', '/prod')])
+        return sg
+
+    # dev going down first doesn't let prod go down too
+    assert build(True).take_shortest_path_to(build(False), dry_run=True) == []
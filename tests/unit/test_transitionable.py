@@ -1,7 +1,9 @@
+import asyncio
+
 import pytest
 
 from stateman.node import StateNode
-from stateman.utils import global_transition_functions
+from stateman.utils import global_transition_functions, global_state_interners, get_transition_table
 
 
 @pytest.fixture()
@@ -77,6 +79,21 @@ def test_node_allows_empty_from(node_cls):
     assert node.state == {'name': 'pre-transition', 'transitioned': True}
 
 
+def test_node_async_transition(node_cls):
+    @node_cls.register_transition(from_={'name': 'pre-transition'}, to={'name': 'post-transition'})
+    async def transition(node):
+        await asyncio.sleep(0)
+        # state only changes once we're done
+        return node.state['name']
+
+    node = node_cls.create('/')
+    assert asyncio.run(transition(node)) == 'pre-transition'
+    assert node.state == {'name': 'post-transition'}
+
+    with pytest.raises(ValueError):
+        asyncio.run(transition(node))
+
+
 def test_node_doesnt_allow_empty_to(node_cls):
     with pytest.raises(ValueError):
         @node_cls.register_transition(from_={'name': 'pre-transition'}, to={})
@@ -117,3 +134,102 @@ def test_node_transition_functions_errors(node_cls, transition_func):
 
     with pytest.raises(ValueError):
         transition_func(node)
+
+
+def test_transition_table_compiles_preconditions(node_cls, transition_func, transition_func2):
+    table = get_transition_table(node_cls)
+    interner = global_state_interners[node_cls]
+    from_1 = (('name', 'pre-transition'),)
+    from_2 = (('something_else', 'something'),)
+    to_1 = (('name', 'post-transition'), ('something_else', 'something'))
+    to_2 = (('something_else', None),)
+
+    assert table.source is global_transition_functions[node_cls]
+    assert table.entries == [
+        (interner.mask({'name': 'pre-transition'}), from_1, [(to_1, dict(to_1))]),
+        (interner.mask({'something_else': 'something'}), from_2, [(to_2, dict(to_2))]),
+    ]
+
+    assert table.matching(interner.mask({'name': 'pre-transition'})) == [(from_1, [(to_1, dict(to_1))])]
+    assert table.matching(interner.mask({'name': 'post-transition', 'something_else': 'something'})) == [
+        (from_2, [(to_2, dict(to_2))])
+    ]
+    assert table.matching(interner.mask({'name': 'pre-transition', 'something_else': 'something'})) == [
+        (from_1, [(to_1, dict(to_1))]),
+        (from_2, [(to_2, dict(to_2))]),
+    ]
+    assert table.matching(interner.mask({'name': 'post-transition'})) == []
+    assert table.matching(0) == []
+
+    # each state is only matched once
+    assert interner.mask({'name': 'pre-transition'}) in table.dispatch
+    assert get_transition_table(node_cls) is table
+
+
+def test_transition_table_rebuilt_when_registry_changes(node_cls, transition_func):
+    table = get_transition_table(node_cls)
+    mask = global_state_interners[node_cls].mask({'name': 'pre-transition', 'cat': 'leopard'})
+    assert len(table.matching(mask)) == 1
+
+    @node_cls.register_transition(from_={'cat': 'leopard'}, to={'cat': 'tiger'})
+    def transition(node):
+        pass
+
+    new_table = get_transition_table(node_cls)
+    assert new_table is not table
+    assert [from_state for from_state, _ in new_table.matching(mask)] == [
+        (('name', 'pre-transition'),),
+        (('cat', 'leopard'),),
+    ]
+
+    # or when it's swept out from under us
+    global_transition_functions.pop(node_cls)
+    assert get_transition_table(node_cls).matching(mask) == []
+
+
+def test_transition_table_with_many_transitions(node_cls):
+    for i in range(60):
+        node_cls.register_transition(from_={'step': i}, to={'step': i + 1})(lambda node: None)
+
+    table = get_transition_table(node_cls)
+    table.max_dispatch_states = table.max_distances = 10
+    interner = global_state_interners[node_cls]
+    last = interner.mask({'name': 'pre-transition', 'step': 60})
+    for i in range(60):
+        assert table.matching(interner.mask({'name': 'pre-transition', 'step': i})) == [
+            ((('step', i),), [((('step', i + 1),), {'step': i + 1})])
+        ]
+        assert table.distance(interner.mask({'name': 'pre-transition', 'step': i}), last) == 60 - i
+
+    # long-lived tables only keep the most recent states
+    assert len(table.dispatch) == len(table.distances) == 10
+    assert interner.mask({'name': 'pre-transition', 'step': 59}) in table.dispatch
+
+
+def test_transition_table_runs_transitions_backwards(node_cls, transition_func, transition_func2):
+    table = get_transition_table(node_cls)
+    interner = global_state_interners[node_cls]
+    from_1 = (('name', 'pre-transition'),)
+    from_2 = (('something_else', 'something'),)
+    to_1 = (('name', 'post-transition'), ('something_else', 'something'))
+    to_2 = (('something_else', None),)
+
+    post = interner.mask({'name': 'post-transition', 'something_else': 'something'})
+    assert list(table.predecessors(post)) == [
+        (from_1, to_1, interner.mask({'name': 'pre-transition'})),
+        (from_1, to_1, interner.mask({'name': 'pre-transition', 'something_else': 'something'})),
+    ]
+
+    # 'something_else' could have been anything we've seen, as long as it was 'something'
+    interner.bit('something_else', 'something else entirely')
+    done = interner.mask({'name': 'post-transition'})
+    assert list(table.predecessors(done)) == [(from_2, to_2, post)]
+
+    # and running them forward again gets us back
+    for from_state, to_state, previous_mask in table.predecessors(post):
+        assert post in table.successors(previous_mask)
+
+    # the only way back to the start is dropping 'something_else'
+    assert list(table.predecessors(interner.mask({'name': 'pre-transition'}))) == [
+        (from_2, to_2, interner.mask({'name': 'pre-transition', 'something_else': 'something'}))
+    ]
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from stateman.node import StateNode
@@ -63,3 +65,63 @@ def test_node_total_validation(node_cls, validation_success_func):
     # node.validation should collect up the exceptions
     with pytest.raises(Exception):
         node.validate()
+
+
+def test_validation_reads(node_cls):
+    @node_cls.register_validation
+    def validate_anything(node):
+        pass
+
+    @node_cls.register_validation(reads=['/extract/*', '/transform'])
+    def validate_some(node):
+        pass
+
+    assert validate_anything.reads is None
+    assert validate_some.reads == ('/extract/*', '/transform')
+    assert global_validation_functions[node_cls][-1] is validate_some
+
+    node = node_cls.create('/')
+    validate_some(node)
+    assert node.get_validation_functions() == [validate_anything, validate_some]
+
+
+def test_node_async_validation(node_cls):
+    @node_cls.register_validation
+    async def validate(node):
+        await asyncio.sleep(0)
+        if node.state['name'] == 'broken':
+            raise ValidationError('broken')
+
+    assert node_cls.create('/').is_valid()
+    assert str(node_cls.create('/', name='broken').validation_error()) == 'broken'
+
+
+def test_node_memoized_validation(node_cls):
+    calls = []
+
+    @node_cls.register_validation(memo_size=2)
+    def validate(node):
+        calls.append(node.state['name'])
+        if node.state['name'] == 'broken':
+            raise ValidationError('broken')
+
+    for _ in range(3):
+        assert node_cls.create('/').is_valid()
+        assert str(node_cls.create('/', name='broken').validation_error()) == 'broken'
+
+    # failures are remembered too
+    assert calls == ['pre-transition', 'broken']
+    assert (validate.memo.hits, validate.memo.misses, len(validate.memo)) == (4, 2, 2)
+
+    # the least recently used outcome goes first
+    assert node_cls.create('/other').is_valid()
+    assert len(validate.memo) == 2
+    assert node_cls.create('/').is_valid()
+    assert calls == ['pre-transition', 'broken', 'pre-transition', 'pre-transition']
+
+    # calling the validation yourself always runs it
+    validate(node_cls.create('/'))
+    assert len(calls) == 5
+
+    validate.memo.clear()
+    assert (validate.memo.hits, validate.memo.misses, len(validate.memo)) == (0, 0, 0)